@@ -1,7 +1,7 @@
 from typing import Literal, List, Any
 from langchain_core.tools import tool
 from langgraph.graph import StateGraph, START, END
-#from langchain_core.messages import add_messages
+from langgraph.graph.message import add_messages
 from typing_extensions import TypedDict, Annotated
 
 from langchain_core.prompts.chat import ChatPromptTemplate
@@ -12,18 +12,22 @@ from groq import BadRequestError
 
 from prompt_library.prompt import system_prompt
 from utils.llms import LLMModel
+from agents.routing import AGENT_NODES, CONFIDENCE_THRESHOLD, router, stats
 
 # TOOLS NEW IMPORTS
 from toolkit.toolkits import (
     check_availability_by_doctor,
     check_availability_by_specialization,
+    find_next_available,
     set_appointment,
+    set_appointments_bulk,
     cancel_appointment,
     reschedule_appointment,
     create_patient,
     get_patient,
     update_patient,
     check_patient_id,
+    search_patients,
     get_patient_appointments
 )
 
@@ -43,39 +47,109 @@ class Router(BaseModel):
 
     reasoning: str = "No reasoning provided."   # default
 
-# ----------------------------------------------------
-# ADD_MESSAGES FALLBACK (because LangGraph version missing)
-# ----------------------------------------------------
-def add_messages(existing, new):
-    """
-    Simple replacement for langgraph add_messages.
-    Combines existing and new messages safely.
-    """
-    if existing is None:
-        existing = []
-    if new is None:
-        new = []
-
-    # Convert LangChain messages or dicts to list
-    if not isinstance(existing, list):
-        existing = [existing]
-    if not isinstance(new, list):
-        new = [new]
-
-    return existing + new
-
-
 # --------------------------------------------------------------
 # GLOBAL STATE WITH CONVERSATION CONTEXT
 # --------------------------------------------------------------
 class AgentState(TypedDict):
-    messages: list[Any]
+    messages: Annotated[list[Any], add_messages]   # nodes return new messages; a session's turns accumulate
     id_number: int
     next: str
     query: str
     current_reasoning: str
     pending_action: str  # Track multi-step actions (e.g., "booking", "cancellation")
     pending_data: dict   # Store data collected during multi-step conversations
+    handoffs: int        # Workers that handed the current turn back to the supervisor
+
+
+# --------------------------------------------------------------
+# COMPLETION POLICY
+# --------------------------------------------------------------
+# A worker's answer ends the turn: the supervisor is not asked again only
+# to decide FINISH. A worker hands the turn back to the supervisor when its
+# ReAct agent calls transfer_to_supervisor (the request belongs to another
+# worker), at most MAX_HANDOFFS times per turn; after that, its answer ends
+# the turn too.
+HANDOFF_TOOL = "transfer_to_supervisor"
+MAX_HANDOFFS = 1
+
+
+@tool(HANDOFF_TOOL, return_direct=True)
+def transfer_to_supervisor(reason: str) -> str:
+    """Hand the request back to the supervisor when another agent must handle it (availability, appointments,
+    patient records or general questions). Give the reason in one sentence."""
+    return reason
+
+
+# --------------------------------------------------------------
+# REACT SUB-AGENTS (prompt + tools of each worker node)
+# --------------------------------------------------------------
+# Compiled once per DoctorAppointmentAgent (see _sub_agent), not on every turn.
+SUB_AGENTS = {
+    "check_suggest_availability_sup_agent": (
+        """
+            You are the specialized agent responsible for checking doctor availability 
+            AND suggesting new availability based on user needs.
+            You can use:
+            - check_availability_by_doctor
+            - check_availability_by_specialization
+            - find_next_available (earliest free slots over several days, in one call)
+            """,
+        [check_availability_by_doctor, check_availability_by_specialization, find_next_available],
+    ),
+    "appointment_management_sup_agent": (
+        """
+            You manage all appointment operations:
+            - Set appointment
+            - Set several appointments at once (set_appointments_bulk, e.g. a family or a treatment plan)
+            - Cancel appointment
+            - Reschedule appointment
+            - List the patient's appointments (get_patient_appointments)
+            Ask politely for missing information.
+            """,
+        [set_appointment, set_appointments_bulk, cancel_appointment, reschedule_appointment,
+         get_patient_appointments],
+    ),
+    "faq_sup_agent": (
+        """
+            You answer any FAQ question about:
+            - Doctors
+            - Services
+            - Hospital procedures
+            You DO NOT manage appointments.
+            """,
+        [],   # no tools for FAQ
+    ),
+    "patient_management_sup_agent": (
+        """
+            You manage patient info:
+            - create patient
+            - retrieve patient
+            - update patient
+            - check patient ID existence
+            - find a patient from a partial name, phone number or email
+            
+            You can use the following tools:
+            - create_patient: Create a new patient record
+            - get_patient: Retrieve patient information by ID
+            - update_patient: Update patient information
+            - check_patient_id: Check if a patient ID exists
+            - search_patients: Find patients by part of their name, telephone or email (returns their IDs)
+            """,
+        [create_patient, get_patient, update_patient, check_patient_id, search_patients],
+    ),
+}
+
+
+def build_sub_agent(llm_model, name: str):
+    """Compile the ReAct agent of a worker node (prompt template + tool schemas bound to the model)."""
+    sys_msg, tools = SUB_AGENTS[name]
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", sys_msg + f"If the request is not yours, call {HANDOFF_TOOL} instead of answering."),
+            ("placeholder", "{messages}")
+        ]
+    )
+    return create_react_agent(model=llm_model, tools=tools + [transfer_to_supervisor], prompt=prompt)
 
 
 # --------------------------------------------------------------
@@ -86,6 +160,42 @@ class DoctorAppointmentAgent:
     def __init__(self):
         llm_model = LLMModel()
         self.llm_model = llm_model.get_model()
+        self._sub_agents = {}
+
+    def _sub_agent(self, name: str):
+        """The compiled ReAct agent of a worker node, built on first use (workflow() prebuilds them)."""
+        agent = self._sub_agents.get(name)
+        if agent is None:
+            agent = self._sub_agents[name] = build_sub_agent(self.llm_model, name)
+        return agent
+
+    def _run_sub_agent(self, name: str, state: AgentState):
+        """Run the ReAct agent of a worker node: (answer, reason of the handoff or None)."""
+        result = self._sub_agent(name).invoke(state)
+        last = result["messages"][-1]
+        if getattr(last, "type", "") == "tool" and last.name == HANDOFF_TOOL:
+            return "", last.content
+        return last.content, None
+
+    def _complete(self, name: str, state: AgentState, content: str, handoff=None, **update):
+        """End the turn with the worker's answer, or hand it back to the supervisor (see COMPLETION POLICY)."""
+        handoffs = state.get("handoffs", 0)
+        if handoff and handoffs < MAX_HANDOFFS:
+            return Command(
+                update={
+                    "handoffs": handoffs + 1,
+                    "current_reasoning": f"{name} handed the request back: {handoff}",
+                    **update,
+                },
+                goto="supervisor",
+            )
+        return Command(
+            update={
+                "messages": [AIMessage(content=content, name=name)],
+                **update,
+            },
+            goto=END,
+        )
 
     # ----------------------------------------------------------
     # SUPERVISOR NODE WITH MULTI-STEP CONVERSATION SUPPORT
@@ -183,63 +293,15 @@ class DoctorAppointmentAgent:
                                 }
                             )
             
-            # Multilingual keyword-based routing for new user messages
-            # English keywords
-            english_keywords = {
-                'appointment': ['appointment', 'book', 'reschedule', 'cancel', 'schedule', 'rdv'],
-                'availability': ['available', 'availability', 'schedule', 'time', 'slot'],
-                'patient': ['patient', 'create patient', 'my info', 'information', 'update', 'profile'],
-                'faq': ['service', 'faq', 'question', 'help', 'what', 'how', 'when', 'where']
-            }
-            
-            # French keywords
-            french_keywords = {
-                'appointment': ['rendez-vous', 'réserver', 'prendre rdv', 'annuler', 'reporter'],
-                'availability': ['disponible', 'disponibilité', 'horaire', 'créneau'],
-                'patient': ['patient', 'créer patient', 'mes informations', 'profil', 'mettre à jour'],
-                'faq': ['service', 'question', 'aide', 'quoi', 'comment', 'quand', 'où', 'prix']
-            }
-            
-            # Arabic keywords (transliterated)
-            arabic_keywords = {
-                'appointment': ['موعد', 'حجز', 'تأجيل', 'إلغاء'],
-                'availability': ['متاح', 'توفر', 'جدول', 'وقت'],
-                'patient': ['مريض', 'معلومات', 'تحديث', 'ملف'],
-                'faq': ['خدمة', 'سؤال', 'مساعدة', 'ماذا', 'كيف', 'متى', 'أين', 'سعر']
-            }
-            
-            # Check all language keywords
-            goto = "faq_sup_agent"
-            reasoning = "Default routing to FAQ agent"
-            
-            # Check appointment keywords
-            appointment_keywords = (english_keywords['appointment'] + 
-                                  french_keywords['appointment'] + 
-                                  arabic_keywords['appointment'])
-            if any(keyword in user_message_lower for keyword in appointment_keywords):
-                goto = "appointment_management_sup_agent"
-                reasoning = "User mentioned appointment-related terms"
-            
-            # Check availability keywords (only if not already set to appointment)
-            elif any(keyword in user_message_lower for keyword in (english_keywords['availability'] + 
-                                                                  french_keywords['availability'] + 
-                                                                  arabic_keywords['availability'])):
-                goto = "check_suggest_availability_sup_agent"
-                reasoning = "User asked about availability"
-            
-            # Check patient keywords (only if not already set)
-            elif any(keyword in user_message_lower for keyword in (english_keywords['patient'] + 
-                                                                  french_keywords['patient'] + 
-                                                                  arabic_keywords['patient'])):
-                goto = "patient_management_sup_agent"
-                reasoning = "User asked about patient information"
-            
-            # Check FAQ keywords (only if not already set)
-            elif any(keyword in user_message_lower for keyword in (english_keywords['faq'] + 
-                                                                  french_keywords['faq'] + 
-                                                                  arabic_keywords['faq'])):
-                goto = "faq_sup_agent"
-                reasoning = "User asked a general question"
+            # Multilingual keyword-based routing for new user messages (see agents/routing.py)
+            intent = router.best(user_message)
+            goto = AGENT_NODES.get(intent, "faq_sup_agent")
+            reasoning = {
+                "appointment": "User mentioned appointment-related terms",
+                "availability": "User asked about availability",
+                "patient": "User asked about patient information",
+                "faq": "User asked a general question",
+            }.get(intent, "Default routing to FAQ agent")
             
             return Command(
                 goto=goto,
@@ -252,6 +314,24 @@ class DoctorAppointmentAgent:
                 }
             )
         
+        # Unambiguous messages are routed locally, only the others cost an LLM call (see agents/routing.py);
+        # a request handed back by a worker always goes to the LLM
+        if not state.get("handoffs"):
+            intent, confidence = router.classify(user_message)
+            if intent and confidence >= CONFIDENCE_THRESHOLD:
+                stats.record(local=True)
+                goto = AGENT_NODES[intent]
+                print(f"DEBUG: Routing locally to {goto} (confidence {confidence:.2f})", file=sys.stderr)
+                return Command(
+                    goto=goto,
+                    update={
+                        "next": goto,
+                        "current_reasoning": f"Unambiguous {intent} request (confidence {confidence:.2f})",
+                        "query": user_message
+                    }
+                )
+        stats.record(local=False)
+        
         # Otherwise, use the LLM with structured output
         try:
             # Convert state messages to the format expected by the LLM
@@ -281,6 +361,10 @@ class DoctorAppointmentAgent:
                     # Already in dict format
                     llm_messages.append(msg)
 
+            # a worker handed the request back: route it to another one
+            if state.get("handoffs"):
+                llm_messages.append({"role": "system", "content": state.get("current_reasoning", "")})
+
             response = self.llm_model.with_structured_output(Router).invoke(llm_messages)
             
             goto = response.next
@@ -303,18 +387,12 @@ class DoctorAppointmentAgent:
             print(f"DEBUG: LLM failed with error: {e}, using keyword routing", file=sys.stderr)
             
             # Keyword-based routing fallback
-            if any(word in user_message_lower for word in ['appointment', 'book', 'reschedule', 'cancel', 'schedule']):
-                goto = "appointment_management_sup_agent"
-                reasoning = f"LLM failed, keyword routing to appointment agent"
-            elif any(word in user_message_lower for word in ['available', 'availability', 'schedule', 'time', 'slot']):
-                goto = "check_suggest_availability_sup_agent"
-                reasoning = f"LLM failed, keyword routing to availability agent"
-            elif any(word in user_message_lower for word in ['patient', 'create patient', 'my info', 'information', 'update']):
-                goto = "patient_management_sup_agent"
-                reasoning = f"LLM failed, keyword routing to patient agent"
+            intent = router.best(user_message)
+            goto = AGENT_NODES.get(intent, "faq_sup_agent")
+            if intent in ("appointment", "availability", "patient"):
+                reasoning = f"LLM failed, keyword routing to {intent} agent"
             else:
                 # Default to FAQ
-                goto = "faq_sup_agent"
                 reasoning = f"LLM failed, default routing to FAQ agent"
             
             return Command(
@@ -332,6 +410,8 @@ class DoctorAppointmentAgent:
     def check_suggest_availability_sup_agent(self, state: AgentState):
         import sys
         
+        handoff = None  # reason given by the ReAct agent when it hands the request back
+        
         # Check if we're using mock LLM
         using_mock = False
         try:
@@ -382,31 +462,9 @@ class DoctorAppointmentAgent:
                 content = "I can check doctor availability. Please specify which doctor you're interested in (e.g., Dr. Mohamed Tajmouati)."
         
         else:
-            # Use create_react_agent for real LLM
-            sys_msg = """
-            You are the specialized agent responsible for checking doctor availability 
-            AND suggesting new availability based on user needs.
-            You can use:
-            - check_availability_by_doctor
-            - check_availability_by_specialization
-            """
-
-            system_prompt = ChatPromptTemplate.from_messages(
-                [
-                    ("system", sys_msg),
-                    ("placeholder", "{messages}")
-                ]
-            )
-
+            # prebuilt ReAct agent (compiled once, see SUB_AGENTS)
             try:
-                agent = create_react_agent(
-                    model=self.llm_model,
-                    tools=[check_availability_by_doctor, check_availability_by_specialization],
-                    prompt=system_prompt
-                )
-
-                result = agent.invoke(state)
-                content = result["messages"][-1].content
+                content, handoff = self._run_sub_agent("check_suggest_availability_sup_agent", state)
                 
                 # If content is empty, provide a default response
                 if not content or content.strip() == "":
@@ -419,15 +477,7 @@ class DoctorAppointmentAgent:
                 print(f"DEBUG: Check availability agent failed with error: {e}", file=sys.stderr)
                 content = "I can help you check doctor availability. Please tell me which doctor or specialization you're interested in."
 
-        return Command(
-            update={
-                "messages": state["messages"] + [
-                    AIMessage(content=content,
-                              name="check_suggest_availability_sup_agent")
-                ]
-            },
-            goto="supervisor",
-        )
+        return self._complete("check_suggest_availability_sup_agent", state, content, handoff)
 
     # ----------------------------------------------------------
     # NODE 2 — APPOINTMENT MANAGEMENT WITH MULTI-STEP SUPPORT
@@ -436,6 +486,8 @@ class DoctorAppointmentAgent:
         import sys
         import re
         
+        handoff = None  # reason given by the ReAct agent when it hands the request back
+        
         # Check if we're using mock LLM
         using_mock = False
         try:
@@ -515,18 +567,8 @@ class DoctorAppointmentAgent:
                     content = "I can help you book an appointment. I need: 1) Doctor name, 2) Preferred date (DD-MM-YYYY), 3) Preferred time (HH:MM)."
                 
                 # Update state with new pending data
-                update_data = {
-                    "messages": state["messages"] + [
-                        AIMessage(content=content, name="appointment_management_sup_agent")
-                    ],
-                    "pending_action": pending_action,
-                    "pending_data": pending_data
-                }
-                
-                return Command(
-                    update=update_data,
-                    goto="supervisor",
-                )
+                return self._complete("appointment_management_sup_agent", state, content,
+                                      pending_action=pending_action, pending_data=pending_data)
             
             # Handle different appointment requests (new conversation)
             if any(word in user_message_lower for word in ['book', 'schedule', 'appointment', 'rendez-vous', 'rdv']):
@@ -549,31 +591,9 @@ class DoctorAppointmentAgent:
                 content = f"I can help you with appointment management for patient ID {patient_id}. Would you like to: 1) Book an appointment, 2) Cancel an appointment, or 3) Reschedule an appointment?"
         
         else:
-            # Use create_react_agent for real LLM
-            sys_msg = """
-            You manage all appointment operations:
-            - Set appointment
-            - Cancel appointment
-            - Reschedule appointment
-            Ask politely for missing information.
-            """
-
-            system_prompt = ChatPromptTemplate.from_messages(
-                [
-                    ("system", sys_msg),
-                    ("placeholder", "{messages}")
-                ]
-            )
-
+            # prebuilt ReAct agent (compiled once, see SUB_AGENTS)
             try:
-                agent = create_react_agent(
-                    model=self.llm_model,
-                    tools=[set_appointment, cancel_appointment, reschedule_appointment],
-                    prompt=system_prompt
-                )
-
-                result = agent.invoke(state)
-                content = result["messages"][-1].content
+                content, handoff = self._run_sub_agent("appointment_management_sup_agent", state)
                 
                 # If content is empty, provide a default response
                 if not content or content.strip() == "":
@@ -593,15 +613,7 @@ class DoctorAppointmentAgent:
                 print(f"DEBUG: Appointment management agent failed with error: {e}", file=sys.stderr)
                 content = "I can help you with appointment management. Would you like to book, cancel, or reschedule an appointment?"
 
-        return Command(
-            update={
-                "messages": state["messages"] + [
-                    AIMessage(content=content,
-                              name="appointment_management_sup_agent")
-                ]
-            },
-            goto="supervisor",
-        )
+        return self._complete("appointment_management_sup_agent", state, content, handoff)
     
     # Helper methods for extracting information from user messages
     def _extract_doctor_name(self, message: str):
@@ -662,6 +674,8 @@ class DoctorAppointmentAgent:
     def faq_sup_agent(self, state: AgentState):
         import sys
         
+        handoff = None  # reason given by the ReAct agent when it hands the request back
+        
         # Check if we're using mock LLM
         using_mock = False
         try:
@@ -701,31 +715,9 @@ class DoctorAppointmentAgent:
                 content = "I'm here to help with questions about our medical services, doctors, and hospital procedures. Please tell me what you'd like to know."
         
         else:
-            # Use create_react_agent for real LLM
-            sys_msg = """
-            You answer any FAQ question about:
-            - Doctors
-            - Services
-            - Hospital procedures
-            You DO NOT manage appointments.
-            """
-
-            system_prompt = ChatPromptTemplate.from_messages(
-                [
-                    ("system", sys_msg),
-                    ("placeholder", "{messages}")
-                ]
-            )
-
+            # prebuilt ReAct agent (compiled once, see SUB_AGENTS)
             try:
-                agent = create_react_agent(
-                    model=self.llm_model,
-                    tools=[],   # no tools for FAQ
-                    prompt=system_prompt
-                )
-
-                result = agent.invoke(state)
-                content = result["messages"][-1].content
+                content, handoff = self._run_sub_agent("faq_sup_agent", state)
                 
                 # If content is empty, provide a default response
                 if not content or content.strip() == "":
@@ -736,15 +728,7 @@ class DoctorAppointmentAgent:
                 print(f"DEBUG: FAQ agent failed with error: {e}", file=sys.stderr)
                 content = "I'm here to help with questions about our medical services, doctors, and hospital procedures. Please tell me what you'd like to know."
 
-        return Command(
-            update={
-                "messages": state["messages"] + [
-                    AIMessage(content=content,
-                              name="faq_sup_agent")
-                ]
-            },
-            goto="supervisor",
-        )
+        return self._complete("faq_sup_agent", state, content, handoff)
 
     # ----------------------------------------------------------
     # NODE 4 — PATIENT MANAGEMENT
@@ -752,6 +736,8 @@ class DoctorAppointmentAgent:
     def patient_management_sup_agent(self, state: AgentState):
         import sys
         
+        handoff = None  # reason given by the ReAct agent when it hands the request back
+        
         # Check if we're using mock LLM
         using_mock = False
         try:
@@ -815,37 +801,9 @@ class DoctorAppointmentAgent:
                 content = f"I can help you with patient management for ID {patient_id}. Would you like to: 1) Get your information, 2) Get your appointments, 3) Check if your ID exists, 4) Create a new patient, or 5) Update your information?"
         
         else:
-            # Use create_react_agent for real LLM
-            sys_msg = """
-            You manage patient info:
-            - create patient
-            - retrieve patient
-            - update patient
-            - check patient ID existence
-            
-            You can use the following tools:
-            - create_patient: Create a new patient record
-            - get_patient: Retrieve patient information by ID
-            - update_patient: Update patient information
-            - check_patient_id: Check if a patient ID exists
-            """
-
-            system_prompt = ChatPromptTemplate.from_messages(
-                [
-                    ("system", sys_msg),
-                    ("placeholder", "{messages}")
-                ]
-            )
-
+            # prebuilt ReAct agent (compiled once, see SUB_AGENTS)
             try:
-                agent = create_react_agent(
-                    model=self.llm_model,
-                    tools=[create_patient, get_patient, update_patient, check_patient_id],
-                    prompt=system_prompt
-                )
-
-                result = agent.invoke(state)
-                content = result["messages"][-1].content
+                content, handoff = self._run_sub_agent("patient_management_sup_agent", state)
                 
                 # If content is empty, provide a default response
                 if not content or content.strip() == "":
@@ -865,20 +823,14 @@ class DoctorAppointmentAgent:
                 print(f"DEBUG: Patient management agent failed with error: {e}", file=sys.stderr)
                 content = "I can help you with patient management. Would you like to create, retrieve, update patient information, or check if a patient ID exists?"
 
-        return Command(
-            update={
-                "messages": state["messages"] + [
-                    AIMessage(content=content,
-                              name="patient_management_sup_agent")
-                ]
-            },
-            goto="supervisor",
-        )
+        return self._complete("patient_management_sup_agent", state, content, handoff)
 
     # ----------------------------------------------------------
     # BUILD WORKFLOW GRAPH
     # ----------------------------------------------------------
-    def workflow(self):
+    def workflow(self, checkpointer=None):
+        """Build and compile the graph; with a checkpointer, the state of each thread_id is persisted."""
+        import sys
 
         self.graph = StateGraph(AgentState)
 
@@ -894,5 +846,14 @@ class DoctorAppointmentAgent:
 
         self.graph.add_edge(START, "supervisor")
 
-        self.app = self.graph.compile()
+        # compile the sub-agents now rather than on the first turns
+        if not (hasattr(self.llm_model, '_llm_type') and self.llm_model._llm_type == 'mock'):
+            for name in SUB_AGENTS:
+                try:
+                    self._sub_agent(name)
+                except Exception as e:
+                    # the node retries on use and answers with its default message if it fails again
+                    print(f"DEBUG: Could not build {name}: {e}", file=sys.stderr)
+
+        self.app = self.graph.compile(checkpointer=checkpointer)
         return self.app
@@ -26,6 +26,7 @@ import datetime
 import json
 
 from utils.llms import LLMModel
+from agents.routing import router
 from toolkit.toolkits import (
     check_availability_by_doctor,
     check_availability_by_specialization,
@@ -115,21 +116,16 @@ class OrchestratorAgent:
         
         last_msg = state["messages"][-1]
         user_message = last_msg.content if hasattr(last_msg, 'content') else str(last_msg)
-        user_message_lower = user_message.lower()
         
-        # Simple intent analysis (would be enhanced with LLM)
-        if any(word in user_message_lower for word in ['hello', 'hi', 'bonjour', 'salut']):
-            return {"niveau": "faq", "agent": "faq_support", "reasoning": "Greeting"}
-        elif any(word in user_message_lower for word in ['patient', 'mon info', 'créer', 'mettre à jour']):
-            return {"niveau": "patient", "agent": "patient_management", "reasoning": "Patient data request"}
-        elif any(word in user_message_lower for word in ['disponible', 'disponibilité', 'horaire', 'créneau']):
-            return {"niveau": "availability", "agent": "availability_checker", "reasoning": "Availability check"}
-        elif any(word in user_message_lower for word in ['rendez-vous', 'rdv', 'book', 'réserver', 'annuler', 'reporter']):
-            return {"niveau": "appointment", "agent": "appointment_operations", "reasoning": "Appointment operation"}
-        elif any(word in user_message_lower for word in ['service', 'question', 'quoi', 'comment', 'prix']):
-            return {"niveau": "faq", "agent": "faq_support", "reasoning": "FAQ question"}
-        else:
-            return {"niveau": "faq", "agent": "faq_support", "reasoning": "Default to FAQ"}
+        # Keyword intent analysis, one pass over the message (would be enhanced with LLM)
+        intent = router.best(user_message)
+        return {
+            "greeting": {"niveau": "faq", "agent": "faq_support", "reasoning": "Greeting"},
+            "patient": {"niveau": "patient", "agent": "patient_management", "reasoning": "Patient data request"},
+            "availability": {"niveau": "availability", "agent": "availability_checker", "reasoning": "Availability check"},
+            "appointment": {"niveau": "appointment", "agent": "appointment_operations", "reasoning": "Appointment operation"},
+            "faq": {"niveau": "faq", "agent": "faq_support", "reasoning": "FAQ question"},
+        }.get(intent, {"niveau": "faq", "agent": "faq_support", "reasoning": "Default to FAQ"})
     
     def route(self, state: HierarchicalAgentState) -> Command:
         """Route to appropriate agent based on intent analysis"""
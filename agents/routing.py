@@ -0,0 +1,263 @@
+"""
+Keyword intent routing shared by the supervisors.
+
+The English, French and Arabic keywords of every intent are normalized
+once into a table of patterns with their weights per intent. Up to
+SCAN_LIMIT patterns, a message is scored by testing each pattern against
+it: at the 76 patterns of the bot, this costs about as much as an
+automaton (5 us per message on top of the normalization) and keeps the
+hot path simple. The scan grows with the vocabulary, so a larger one is
+compiled into a single Aho-Corasick automaton instead: scoring is then one
+pass over the characters of the message, whatever the number of keywords
+(the same 15 us per message for 100 or 1,000 keywords, where the scan
+takes 100 us). bench_routing.py measures both.
+
+Keywords written in Latin script match at the start of a word ("book"
+matches "booking", not "facebook"; "profil" also matches "profile", so
+only the shorter form is listed). Arabic keywords match anywhere in a
+word, since articles and prepositions are attached to it ("موعد" in
+"الموعد"). Case, accents and Arabic diacritics are ignored. Generic words
+only count half.
+
+With a real LLM, the supervisor routes a message itself when the
+router's confidence reaches ROUTER_CONFIDENCE (default 0.6), and only
+sends the ambiguous ones to the LLM. The confidence is the lead of the
+best intent over the second one, relative to the best score plus 0.5:
+- a single keyword scores 0.67
+- two keywords of the same intent score 0.8
+- a generic word alone scores 0.5
+- an appointment keyword beside an availability keyword scores 0
+`stats` counts how many routing decisions did not need the LLM.
+"""
+import os
+import re
+import threading
+import unicodedata
+from collections import deque
+from typing import Optional
+
+
+# intents in order of priority (a tie goes to the first one)
+INTENTS = ["appointment", "availability", "patient", "faq", "greeting"]
+
+KEYWORDS = {
+    "appointment": {
+        "en": ["appointment", "book", "reschedule", "cancel", "schedule", "rdv"],
+        "fr": ["rendez-vous", "réserver", "prendre rdv", "annuler", "reporter"],
+        "ar": ["موعد", "حجز", "تأجيل", "إلغاء"],
+    },
+    "availability": {
+        "en": ["available", "availability", "schedule", "time", "slot"],
+        "fr": ["disponible", "disponibilité", "horaire", "créneau"],
+        "ar": ["متاح", "توفر", "جدول", "وقت"],
+    },
+    "patient": {
+        "en": ["patient", "create patient", "my info", "information", "update"],
+        "fr": ["patient", "créer patient", "créer", "mon info", "mes informations", "profil", "mettre à jour"],
+        "ar": ["مريض", "معلومات", "تحديث", "ملف"],
+    },
+    "faq": {
+        "en": ["service", "faq", "question", "help", "what", "how", "when", "where"],
+        "fr": ["service", "question", "aide", "quoi", "comment", "quand", "où", "prix"],
+        "ar": ["خدمة", "سؤال", "مساعدة", "ماذا", "كيف", "متى", "أين", "سعر"],
+    },
+    "greeting": {
+        "en": ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"],
+        "fr": ["bonjour", "salut", "bonsoir", "coucou"],
+        "ar": ["مرحبا", "السلام عليكم"],
+    },
+}
+
+# hints rather than intents: they count half
+WEAK_KEYWORDS = {
+    "schedule", "time", "update", "information", "help", "what", "how", "when", "where",
+    "quoi", "comment", "quand", "où", "aide", "créer",
+    "وقت", "معلومات", "تحديث", "ماذا", "كيف", "متى", "أين",
+}
+WEAK_WEIGHT = 0.5
+GREETING_WEIGHT = 0.5         # any other intent in the message wins
+CONFIDENCE_PRIOR = 0.5        # evidence needed before a lead counts (see classify)
+CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE", "0.6"))
+SCAN_LIMIT = 100              # patterns; beyond, the automaton is faster (bench_routing.py)
+
+
+_SEPARATORS = re.compile(r"\W+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase without accents, punctuation and spaces collapsed to single spaces, padded with a space."""
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    return " " + _SEPARATORS.sub(" ", text).strip() + " "
+
+
+def _is_arabic(keyword: str) -> bool:
+    return unicodedata.name(keyword[0], "").startswith("ARABIC")
+
+
+def keyword_weights(keywords: dict = KEYWORDS) -> dict[str, dict[str, float]]:
+    """{intent: {keyword: weight}} from the keywords of each language."""
+    weights = {}
+    for intent, languages in keywords.items():
+        base = GREETING_WEIGHT if intent == "greeting" else 1.0
+        weights[intent] = {
+            keyword: base * (WEAK_WEIGHT if keyword in WEAK_KEYWORDS else 1.0)
+            for words in languages.values() for keyword in words
+        }
+    return weights
+
+
+class KeywordRouter:
+
+    def __init__(self, weights: dict[str, dict[str, float]], intents: Optional[list[str]] = None,
+                 automaton: Optional[bool] = None):
+        """`automaton`: compile the keywords (True) or scan them (False); by default, above SCAN_LIMIT."""
+        self.intents = intents or list(weights)
+        # normalized pattern -> {intent: weight}
+        patterns: dict[str, dict[str, float]] = {}
+        for intent, keywords in weights.items():
+            for keyword, weight in keywords.items():
+                pattern = normalize(keyword).strip()
+                if not _is_arabic(pattern):
+                    pattern = " " + pattern          # start of a word
+                found = patterns.setdefault(pattern, {})
+                found[intent] = max(found.get(intent, 0.0), weight)
+        self._patterns = [(pattern, tuple(found.items())) for pattern, found in patterns.items()]
+
+        if automaton is None:
+            automaton = len(self._patterns) > SCAN_LIMIT
+        self.automaton = automaton
+        # state -> {character: state}, failure link and {intent: weight} of the keywords ending there
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[dict[str, float]] = [{}]
+        self._matches: list[Optional[tuple]] = []       # _output as (intent, weight) pairs, None if empty
+        if automaton:
+            for pattern, found in patterns.items():
+                self._output[self._add(pattern)] = dict(found)
+            self._link()
+
+    def __len__(self) -> int:
+        """Number of states of the automaton (1 when the keywords are scanned)."""
+        return len(self._goto)
+
+    def _add(self, pattern: str) -> int:
+        state = 0
+        for char in pattern:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append({})
+            state = following
+        return state
+
+    def _link(self):
+        """Failure links (breadth first); each state also outputs the keywords of its failure state."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[following] = self._goto[fail].get(char, 0)
+                inherited = self._output[self._fail[following]]
+                if inherited:
+                    merged = dict(inherited)
+                    for intent, weight in self._output[following].items():
+                        merged[intent] = max(merged.get(intent, 0.0), weight)
+                    self._output[following] = merged
+        self._matches = [tuple(output.items()) or None for output in self._output]
+
+    def scores(self, message: str) -> dict[str, float]:
+        """Sum of the weights of the keywords found in the message, per intent (intents found only)."""
+        message = normalize(message)
+        if self.automaton:
+            return self._run(message)
+        scores: dict[str, float] = {}
+        for pattern, found in self._patterns:
+            if pattern not in message:
+                continue
+            # every occurrence counts, overlapping ones too (as in the automaton)
+            count, start = 0, message.find(pattern)
+            while start >= 0:
+                count += 1
+                start = message.find(pattern, start + 1)
+            for intent, weight in found:
+                scores[intent] = scores.get(intent, 0.0) + count * weight
+        return scores
+
+    def _run(self, message: str) -> dict[str, float]:
+        goto, fail, matches = self._goto, self._fail, self._matches
+        scores: dict[str, float] = {}
+        state = 0
+        for char in message:
+            following = goto[state].get(char)
+            while following is None and state:
+                state = fail[state]
+                following = goto[state].get(char)
+            state = following or 0
+            if matches[state]:
+                for intent, weight in matches[state]:
+                    scores[intent] = scores.get(intent, 0.0) + weight
+        return scores
+
+    def best(self, message: str) -> Optional[str]:
+        """The intent with the highest score (ties go to the first intent), None without any keyword."""
+        scores = self.scores(message)
+        if not scores:
+            return None
+        return max(self.intents, key=lambda intent: (scores.get(intent, 0.0), -self.intents.index(intent)))
+
+    def classify(self, message: str) -> tuple[Optional[str], float]:
+        """(best intent, confidence in [0, 1)): the lead over the second intent relative to the best score."""
+        scores = self.scores(message)
+        if not scores:
+            return None, 0.0
+        ranked = sorted(scores.values(), reverse=True) + [0.0]
+        best = max(self.intents, key=lambda intent: (scores.get(intent, 0.0), -self.intents.index(intent)))
+        return best, (ranked[0] - ranked[1]) / (ranked[0] + CONFIDENCE_PRIOR)
+
+
+class RoutingStats:
+    """Routing decisions of the supervisor: made locally or by the LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.llm = 0
+
+    def record(self, local: bool):
+        with self._lock:
+            if local:
+                self.local += 1
+            else:
+                self.llm += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.local + self.llm
+            return {
+                "routed_locally": self.local,
+                "routed_by_llm": self.llm,
+                "llm_calls_avoided": self.local / total if total else 0.0,
+            }
+
+
+# compiled once, shared by DoctorAppointmentAgent and OrchestratorAgent
+router = KeywordRouter(keyword_weights(), INTENTS)
+stats = RoutingStats()
+
+# worker node of DoctorAppointmentAgent for each intent (greetings are answered by the FAQ agent)
+AGENT_NODES = {
+    "appointment": "appointment_management_sup_agent",
+    "availability": "check_suggest_availability_sup_agent",
+    "patient": "patient_management_sup_agent",
+    "faq": "faq_sup_agent",
+    "greeting": "faq_sup_agent",
+}
@@ -0,0 +1,273 @@
+"""
+SQLite checkpointer for the conversation state of /execute.
+
+The graph state of a session (messages, pending_action / pending_data of
+a multi-step booking, ...) is saved after every step under the session
+ID sent by the client, so a follow-up turn resumes its own conversation
+and a restart of the API does not lose bookings in progress.
+
+Compared to a generic checkpointer, only what a session needs is kept:
+- one row per session: the latest checkpoint replaces the previous one
+  (no history), so loading a session is one primary-key lookup
+- checkpoints are serialized by LangGraph's serializer (msgpack) and
+  zlib-compressed above COMPRESS_OVER bytes
+- sessions idle for more than SESSION_TTL seconds (default 86400) are
+  ignored when loaded and deleted by a sweep run at most once a minute
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+
+SESSIONS_FILE = "sessions.db"
+COMPRESS_OVER = 1024            # bytes; smaller blobs are stored as they are
+SWEEP_EVERY = 60                # seconds between two deletions of idle sessions
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns)
+);
+CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+
+CREATE TABLE IF NOT EXISTS session_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SQLiteSessionSaver(BaseCheckpointSaver[int]):
+
+    def __init__(self, db_path: str, ttl: Optional[float] = None):
+        super().__init__()
+        self.db_path = db_path
+        self.ttl = ttl if ttl is not None else float(os.getenv("SESSION_TTL", "86400"))
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        self.connection().executescript(SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        """Connection of the calling thread (created on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ----------------------------------------------------------
+    # SERIALIZATION
+    # ----------------------------------------------------------
+    def _dump(self, value: Any) -> tuple[str, bytes]:
+        kind, data = self.serde.dumps_typed(value)
+        if len(data) > COMPRESS_OVER:
+            return kind + "+zlib", zlib.compress(data)
+        return kind, data
+
+    def _load(self, kind: str, data: bytes) -> Any:
+        if kind.endswith("+zlib"):
+            kind, data = kind[:-len("+zlib")], zlib.decompress(data)
+        return self.serde.loads_typed((kind, data))
+
+    # ----------------------------------------------------------
+    # READS
+    # ----------------------------------------------------------
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        row = self.connection().execute(
+            "SELECT checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata, "
+            "updated_at FROM sessions WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ).fetchone()
+        if row is None or row[6] < time.time() - self.ttl:
+            return None
+        checkpoint_id, parent_id, checkpoint_type, checkpoint, metadata_type, metadata, _ = row
+        requested = get_checkpoint_id(config)
+        if requested and requested != checkpoint_id:
+            return None     # older checkpoints are not kept
+
+        writes = self.connection().execute(
+            "SELECT task_id, idx, channel, value_type, value, task_path FROM session_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        writes.sort(key=lambda write: writes_sort_key(write[5], write[0], write[1]))
+
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint=self._load(checkpoint_type, checkpoint),
+            metadata=self._load(metadata_type, metadata),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id,
+                }}
+                if parent_id else None
+            ),
+            pending_writes=[
+                (task_id, channel, self._load(value_type, value))
+                for task_id, _, channel, value_type, value, _ in writes
+            ],
+        )
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """The latest checkpoint of the session(s): no history is kept."""
+        if config is not None:
+            keys = [(config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", ""))]
+        else:
+            keys = self.connection().execute("SELECT thread_id, checkpoint_ns FROM sessions").fetchall()
+        for thread_id, checkpoint_ns in keys:
+            if limit is not None and limit <= 0:
+                return
+            found = self.get_tuple({"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": get_checkpoint_id(config) if config else None,
+            }})
+            if found is None:
+                continue
+            if before and get_checkpoint_id(before) and found.config["configurable"]["checkpoint_id"] >= get_checkpoint_id(before):
+                continue
+            if filter and any(found.metadata.get(key) != value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield found
+
+    # ----------------------------------------------------------
+    # WRITES
+    # ----------------------------------------------------------
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_blob = self._dump(checkpoint)
+        metadata_type, metadata_blob = self._dump(get_checkpoint_metadata(config, metadata))
+        now = time.time()
+
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 checkpoint_type, checkpoint_blob, metadata_type, metadata_blob, now),
+            )
+            # the writes of the replaced checkpoint are not needed any more
+            conn.execute(
+                "DELETE FROM session_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?",
+                (thread_id, checkpoint_ns, checkpoint["id"]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if now - self._last_sweep > SWEEP_EVERY:
+            self._last_sweep = now
+            self.evict_idle(now)
+
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # special channels (errors, interrupts...) replace their previous write, the others are kept
+        rows = {"REPLACE": [], "IGNORE": []}
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_blob = self._dump(value)
+            rows["REPLACE" if channel in WRITES_IDX_MAP else "IGNORE"].append(
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                 channel, value_type, value_blob, task_path)
+            )
+        conn = self.connection()
+        for conflict, values in rows.items():
+            if values:
+                conn.executemany(f"INSERT OR {conflict} INTO session_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+
+    def delete_thread(self, thread_id: str) -> None:
+        conn = self.connection()
+        conn.execute("DELETE FROM sessions WHERE thread_id = ?", (thread_id,))
+        conn.execute("DELETE FROM session_writes WHERE thread_id = ?", (thread_id,))
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Delete the sessions idle for more than the TTL; returns how many were deleted."""
+        cutoff = (now or time.time()) - self.ttl
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM session_writes WHERE (thread_id, checkpoint_ns) IN "
+                "(SELECT thread_id, checkpoint_ns FROM sessions WHERE updated_at < ?)",
+                (cutoff,),
+            )
+            deleted = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return deleted
+
+    # ----------------------------------------------------------
+    # ASYNC (the graph runs with ainvoke): SQLite calls run off the event loop
+    # ----------------------------------------------------------
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for item in await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of the availability tools for growing calendars.
+
+The 4,280 slots of notebook/availability.csv are repeated with shifted
+dates until the table has the requested size, then
+check_availability_by_doctor and check_availability_by_specialization
+are called for random (doctor, day) / (specialization, day) pairs.
+For comparison, the previous implementation (pandas filter + iterrows on
+an already loaded DataFrame) is timed on the same table.
+
+Usage:
+    python bench_availability.py
+    python bench_availability.py --sizes 10000 100000 --calls 500
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import toolkit.toolkits as toolkits
+from toolkit.storage import CSVStorage, set_storage
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SEED_FILE = os.path.join(ROOT, "notebook", "availability.csv")
+OTHER_FILES = ["rendez_vous.csv", "patients.csv", "doctors.csv"]
+
+
+def build_table(size: int) -> pd.DataFrame:
+    """`size` slots in the doctor_availability.csv layout, seeded from the notebook data."""
+    seed = pd.read_csv(SEED_FILE, dtype=str, keep_default_na=False)
+    seed_dates = pd.to_datetime(seed["date_slot"], format="%d-%m-%Y %H:%M")
+    span = (seed_dates.max().normalize() - seed_dates.min().normalize()).days + 7
+
+    copies = -(-size // len(seed))
+    shifts = np.repeat(np.arange(copies) * span, len(seed))[:size]
+    dates = pd.to_datetime(np.tile(seed_dates.to_numpy(), copies)[:size]) + pd.to_timedelta(shifts, unit="D")
+    return pd.DataFrame({
+        "date_availability": dates.strftime("%d-%m-%Y %H:%M"),
+        "specialization": np.tile(seed["specialization"].to_numpy(), copies)[:size],
+        "doctor_name": np.tile(seed["doctor_name"].to_numpy(), copies)[:size],
+        "is_available": np.tile(seed["is_available"].to_numpy(), copies)[:size],
+        "id_patient": np.tile(seed["patient_to_attend"].to_numpy(), copies)[:size],
+    })
+
+
+# previous implementation, kept for comparison (without its per-call read_csv)
+def legacy_by_doctor(df, desired_date, doctor_name):
+    day_rows = df[
+        (df["date_availability"].str.startswith(desired_date)) &
+        (df["doctor_name"].str.lower() == doctor_name.lower())
+    ]
+    available_slots = day_rows[day_rows["is_available"] == "True"]
+    output = f"Available time slots for Dr {doctor_name} on {desired_date}:\n"
+    for _, slot in available_slots.iterrows():
+        output += f"- {slot['date_availability'].split(' ')[1]}\n"
+    return output
+
+
+def legacy_by_specialization(df, desired_date, specialization):
+    rows = df[
+        (df["date_availability"].str.startswith(desired_date)) &
+        (df["specialization"].str.lower() == specialization.lower()) &
+        (df["is_available"] == "True")
+    ]
+    doctors_data = {}
+    for _, row in rows.iterrows():
+        doctors_data.setdefault(row["doctor_name"], []).append(row["date_availability"].split(" ")[1])
+    output = f"Available {specialization} doctors for {desired_date}:\n\n"
+    for doctor_name, time_slots in doctors_data.items():
+        output += f"Dr {doctor_name}:\n"
+        for time_slot in sorted(time_slots):
+            output += f"  - {time_slot}\n"
+    return output
+
+
+def per_call_us(function, queries) -> tuple[float, float]:
+    """(median, p95) latency in microseconds."""
+    timings = []
+    for args in queries:
+        started = time.perf_counter()
+        function(*args)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run(size: int, calls: int, legacy_calls: int):
+    df = build_table(size)
+    days = df["date_availability"].str[:10].unique().tolist()
+    doctors = df["doctor_name"].unique().tolist()
+    specializations = df["specialization"].unique().tolist()
+    rng = random.Random(size)
+    doctor_queries = [(rng.choice(days), rng.choice(doctors)) for _ in range(calls)]
+    specialization_queries = [(rng.choice(days), rng.choice(specializations)) for _ in range(calls)]
+
+    data_path = tempfile.mkdtemp(prefix="bench_availability_") + os.sep
+    try:
+        df.to_csv(os.path.join(data_path, "doctor_availability.csv"), index=False)
+        for file_name in OTHER_FILES:
+            shutil.copy(os.path.join(ROOT, "data", file_name), os.path.join(data_path, file_name))
+
+        started = time.perf_counter()
+        storage = CSVStorage(data_path)
+        load_s = time.perf_counter() - started
+        toolkits.DATA_PATH = data_path
+        set_storage(data_path, storage)
+
+        print(f"\n{size:,} slots (loaded in {load_s:.2f}s)")
+        results = [
+            ("check_availability_by_doctor", toolkits.check_availability_by_doctor.func, doctor_queries),
+            ("check_availability_by_specialization", toolkits.check_availability_by_specialization.func,
+             specialization_queries),
+            ("  previous by_doctor", lambda *args: legacy_by_doctor(df, *args), doctor_queries[:legacy_calls]),
+            ("  previous by_specialization", lambda *args: legacy_by_specialization(df, *args),
+             specialization_queries[:legacy_calls]),
+        ]
+        for name, function, queries in results:
+            median, p95 = per_call_us(function, queries)
+            print(f"  {name:<40} median {median:>10.1f} us   p95 {p95:>10.1f} us")
+
+        storage.journal.close()
+        set_storage(data_path, None)
+    finally:
+        shutil.rmtree(data_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Availability tools latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--legacy-calls", type=int, default=20)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.calls, args.legacy_calls)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Per-query latency of the patient search index for growing patient bases.
+
+Synthetic patients are generated from first and last names seen in
+data/patients.csv (with numbered variants, so that names repeat like in a
+real patient base), random telephones and unique emails. The index is
+built once, then typical reception queries are timed: partial names,
+phone number fragments, email fragments and typos.
+
+Usage:
+    python bench_patient_search.py
+    python bench_patient_search.py --sizes 100000 --calls 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from toolkit.patient_search import PatientSearchIndex
+
+
+FIRST_NAMES = ["Ahmed", "Fatima", "Karim", "Sophie", "Youssef", "Leila", "Mohammed", "Amina", "Rachid", "Sara",
+               "Omar", "Nadia", "Hassan", "Khadija", "Said", "Zineb", "Imane", "Yassine", "Hamza", "Salma"]
+LAST_NAMES = ["Benali", "Zohra", "Alami", "Martin", "Nouri", "Berrada", "Cherif", "Saidi", "El Fassi", "Belhaj",
+              "Tazi", "Idrissi", "Bennani", "Lahlou", "Chraibi", "Kettani", "Sqalli", "Amrani", "Filali", "Naciri"]
+QUERIES = ["karim alami", "alami", "Ka", "fassi", "2126123", "0612 34", "user12345", "sara.bel", "benali ahmd"]
+
+
+def build_patients(size: int) -> list[dict]:
+    rng = random.Random(size)
+    first_names = [f"{name}{i or ''}" for name in FIRST_NAMES for i in range(5)]
+    last_names = [f"{name}{suffix}" for name in LAST_NAMES for suffix in ["", "i", "a", "ou", "e", "an", "el"]]
+    return [
+        {
+            "ID": patient_id,
+            "nom": f"{rng.choice(first_names)} {rng.choice(last_names)}",
+            "email": f"user{patient_id}.{rng.randrange(10 ** 6)}@email.com",
+            "telephone": f"2126{rng.randrange(10 ** 8):08d}",
+        }
+        for patient_id in range(1, size + 1)
+    ]
+
+
+def run(size: int, calls: int):
+    patients = build_patients(size)
+    started = time.perf_counter()
+    index = PatientSearchIndex(patients)
+    print(f"\n{size:,} patients (index built in {time.perf_counter() - started:.1f}s)")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            found = index.search(query, 5)
+            timings.append((time.perf_counter() - started) * 1e3)
+        print(f"  {query!r:<16} median {statistics.median(timings):>7.2f} ms   max {max(timings):>7.2f} ms"
+              f"   top: {', '.join(patients[patient_id - 1]['nom'] for patient_id in found[:2])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Patient search latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.calls)
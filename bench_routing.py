@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Keyword routing cost for growing vocabularies.
+
+The vocabulary of agents/routing.py is extended with synthetic keywords
+(made-up words, so the routing of the sample messages does not change),
+then typical messages are scored both ways KeywordRouter can: scanning
+every keyword, and the compiled automaton. SCAN_LIMIT in
+agents/routing.py is where the automaton starts to win.
+
+Usage:
+    python bench_routing.py
+    python bench_routing.py --sizes 100 10000 --calls 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.routing import INTENTS, SCAN_LIMIT, KeywordRouter, keyword_weights
+
+
+MESSAGES = [
+    "réserver avec Dr Adil demain 10:00",
+    "Is Dr. Adil Tajmouati available on 15-12-2024?",
+    "mettre à jour mon numéro de téléphone",
+    "What are your working hours?",
+    "أريد إلغاء الموعد",
+]
+
+
+def vocabulary(size: int) -> dict[str, dict[str, float]]:
+    rng = random.Random(size)
+    weights = keyword_weights()
+    while sum(len(keywords) for keywords in weights.values()) < size:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 12))) + "q"
+        weights[rng.choice(INTENTS)][word] = 1.0
+    return weights
+
+
+def median_us(route, calls: int) -> float:
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        for message in MESSAGES:
+            route(message)
+        timings.append((time.perf_counter() - started) * 1e6 / len(MESSAGES))
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keyword routing benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, SCAN_LIMIT, 1_000, 10_000])
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        weights = vocabulary(size)
+        scanned = KeywordRouter(weights, INTENTS, automaton=False)
+        started = time.perf_counter()
+        compiled = KeywordRouter(weights, INTENTS, automaton=True)
+        built = (time.perf_counter() - started) * 1e3
+        print(f"{size:>7,} keywords   scan {median_us(scanned.best, args.calls):8.1f} us/message   "
+              f"automaton {median_us(compiled.best, args.calls):7.1f} us/message "
+              f"({len(compiled):,} states built in {built:.0f} ms)")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Per-turn overhead of the ReAct sub-agents of DoctorAppointmentAgent.
+
+Each worker node is run with a fake chat model that answers at once (no
+tool call, no network), so what is timed is the agent machinery around
+the LLM: building the prompt template, binding the tool schemas and
+compiling the ReAct graph, then running it. "rebuilt" compiles the
+sub-agent on every turn (what the nodes used to do), "prebuilt" reuses
+the agent compiled by workflow().
+
+Usage:
+    python bench_sub_agents.py
+    python bench_sub_agents.py --turns 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from itertools import cycle
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agents.agent import SUB_AGENTS, DoctorAppointmentAgent
+
+
+class FakeToolModel(GenericFakeChatModel):
+    """Fake chat model accepting tools (the schemas are converted, then ignored)."""
+
+    def bind_tools(self, tools, **kwargs):
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+        [convert_to_openai_tool(tool) for tool in tools]
+        return self
+
+
+def make_agent() -> DoctorAppointmentAgent:
+    # skip LLMModel(): no API key or network needed
+    agent = DoctorAppointmentAgent.__new__(DoctorAppointmentAgent)
+    agent.llm_model = FakeToolModel(messages=cycle([AIMessage(content="Done.")]))
+    agent._sub_agents = {}
+    return agent
+
+
+def time_turns(agent: DoctorAppointmentAgent, name: str, turns: int, rebuild: bool) -> list[float]:
+    node = getattr(agent, name)
+    state = {
+        "messages": [HumanMessage(content="book with Dr Adil tomorrow 10:00")],
+        "id_number": 1000082, "next": "", "query": "", "current_reasoning": "",
+    }
+    timings = []
+    for _ in range(turns):
+        if rebuild:
+            agent._sub_agents.clear()
+        started = time.perf_counter()
+        node(state)
+        timings.append((time.perf_counter() - started) * 1e3)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sub-agent per-turn overhead benchmark")
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    agent = make_agent()
+    agent.workflow()
+    for name in SUB_AGENTS:
+        rebuilt = time_turns(agent, name, args.turns, rebuild=True)
+        prebuilt = time_turns(agent, name, args.turns, rebuild=False)
+        print(f"{name:<38} rebuilt {statistics.median(rebuilt):6.2f} ms   "
+              f"prebuilt {statistics.median(prebuilt):6.2f} ms   "
+              f"saved {statistics.median(rebuilt) - statistics.median(prebuilt):6.2f} ms/turn")
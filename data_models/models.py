@@ -1,4 +1,5 @@
 import re
+from typing import Optional
 from pydantic import BaseModel, Field, EmailStr, field_validator
 
 
@@ -35,6 +36,39 @@ class IdentificationNumberModel(BaseModel):
         return v
 
 
+class SlotSearchModel(BaseModel):
+    n: int = Field(description="Number of free slots to return", ge=1, le=50)
+    horizon_days: int = Field(description="Number of days to search from the start date", ge=1, le=365)
+
+
+class BookingRequestModel(BaseModel):
+    """One appointment of a bulk booking: booked at desired_date, or moved there from old_date."""
+    desired_date: str = Field(description="Date format 'DD-MM-YYYY HH:MM'", pattern=r'^\d{2}-\d{2}-\d{4} \d{2}:\d{2}$')
+    old_date: Optional[str] = Field(
+        default=None, description="Date of the appointment to move, format 'DD-MM-YYYY HH:MM'",
+        pattern=r'^\d{2}-\d{2}-\d{4} \d{2}:\d{2}$',
+    )
+    id_number: int = Field(description="Patient identification number (positive integer)")
+    doctor_name: str = Field(description="Doctor name", min_length=1)
+
+    @field_validator("id_number")
+    def check_format_id(cls, v):
+        if v <= 0:
+            raise ValueError("The ID number should be a positive integer")
+        return v
+
+
+class PatientSearchModel(BaseModel):
+    query: str = Field(description="Part of a patient name, telephone number or email", min_length=1)
+    k: int = Field(description="Number of patients to return", ge=1, le=50)
+
+    @field_validator("query")
+    def check_query(cls, v):
+        if not v.strip():
+            raise ValueError("The search query must not be empty")
+        return v.strip()
+
+
 # ------------------------------------------------
 # 2. Doctor Availability Model (doctor_availability.csv)
 # ------------------------------------------------
@@ -101,8 +135,20 @@ class DoctorModel(BaseModel):
 # ------------------------------------------------
 # 5. Patient Model (patients.csv)
 # ------------------------------------------------
-class PatientModel(BaseModel):
-    ID: int
+def _check_phone(v):
+    if not re.match(r'^[0-9]{8,15}$', v):
+        raise ValueError("Phone number must contain 8-15 digits")
+    return v
+
+
+def _check_birthdate(v):
+    if not re.match(r'^\d{2}-\d{2}-\d{4}$', v):
+        raise ValueError("date_naissance must be DD-MM-YYYY")
+    return v
+
+
+class NewPatientModel(BaseModel):
+    """Patient fields before the storage allocates the ID."""
     nom: str
     email: EmailStr
     telephone: str
@@ -112,15 +158,36 @@ class PatientModel(BaseModel):
 
     @field_validator("telephone")
     def validate_phone(cls, v):
-        if not re.match(r'^[0-9]{8,15}$', v):
-            raise ValueError("Phone number must contain 8-15 digits")
-        return v
+        return _check_phone(v)
 
     @field_validator("date_naissance")
     def validate_birthdate(cls, v):
-        if not re.match(r'^\d{2}-\d{2}-\d{4}$', v):
-            raise ValueError("date_naissance must be DD-MM-YYYY")
-        return v
+        return _check_birthdate(v)
+
+
+class PatientModel(NewPatientModel):
+    ID: int
+
+
+class PatientUpdateModel(BaseModel):
+    """Changed fields of a patient record: only the fields given are validated."""
+    nom: Optional[str] = None
+    email: Optional[EmailStr] = None
+    telephone: Optional[str] = None
+    date_naissance: Optional[str] = None
+    sexe: Optional[str] = None
+    addresse: Optional[str] = None
+
+    @field_validator("telephone")
+    def validate_phone(cls, v):
+        return v if v is None else _check_phone(v)
+
+    @field_validator("date_naissance")
+    def validate_birthdate(cls, v):
+        return v if v is None else _check_birthdate(v)
+
+    def changes(self) -> dict:
+        return self.model_dump(exclude_none=True)
 
 
 # ------------------------------------------------
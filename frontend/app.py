@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import json
+import uuid
 
 API_URL = "http://127.0.0.1:8006/execute"
 
@@ -12,6 +13,19 @@ if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 if "patient_id" not in st.session_state:
     st.session_state.patient_id = 2  # Default ID
+if "session_id" not in st.session_state:
+    st.session_state.session_id = None  # conversation ID returned by the API
+if "pending_actions" not in st.session_state:
+    st.session_state.pending_actions = {}  # idempotency key of each action sent but not answered yet
+
+
+def action_key(*action) -> str:
+    """Idempotency key of an action: kept until it is answered, so a rerun or a retry re-sends the same key."""
+    return st.session_state.pending_actions.setdefault(action, str(uuid.uuid4()))
+
+
+def action_answered(*action):
+    st.session_state.pending_actions.pop(action, None)
 
 # Sidebar for patient ID and info
 with st.sidebar:
@@ -33,9 +47,15 @@ with st.sidebar:
             try:
                 response = requests.post(
                     API_URL,
-                    json={"messages": f"Get my patient information", "id_number": patient_id},
+                    # without the session ID: the lookup must not become a turn of the chat
+                    json={
+                        "messages": f"Get my patient information",
+                        "id_number": patient_id,
+                        "idempotency_key": action_key("info", patient_id),
+                    },
                     timeout=10
                 )
+                action_answered("info", patient_id)
                 if response.status_code == 200:
                     result = response.json()
                     if "messages" in result:
@@ -62,6 +82,7 @@ with st.sidebar:
     # Clear chat button
     if st.button("Clear Chat History"):
         st.session_state.chat_history = []
+        st.session_state.session_id = None
         st.rerun()
 
 # Main chat interface
@@ -102,12 +123,19 @@ if user_input:
         try:
             response = requests.post(
                 API_URL,
-                json={"messages": user_input, "id_number": st.session_state.patient_id},
+                json={
+                    "messages": user_input,
+                    "id_number": st.session_state.patient_id,
+                    "session_id": st.session_state.session_id,
+                    "idempotency_key": action_key("chat", user_input, st.session_state.patient_id),
+                },
                 timeout=30
             )
+            action_answered("chat", user_input, st.session_state.patient_id)
             
             if response.status_code == 200:
                 result = response.json()
+                st.session_state.session_id = result.get("session_id", st.session_state.session_id)
                 bot_messages = result.get("messages", [])
                 
                 # Extract assistant messages
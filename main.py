@@ -1,6 +1,13 @@
-from fastapi import FastAPI
+import uuid
+from typing import Optional
+
+from fastapi import FastAPI, Header
 from pydantic import BaseModel
 from agents.agent import DoctorAppointmentAgent
+from agents.routing import CONFIDENCE_THRESHOLD, stats as routing_stats
+from agents.session_store import SESSIONS_FILE, SQLiteSessionSaver
+from toolkit.idempotency import operations, request_scope
+from toolkit.toolkits import BOOKED, RESCHEDULED, book_appointments
 from langchain_core.messages import HumanMessage
 import os
 
@@ -16,20 +23,42 @@ app = FastAPI()
 class UserQuery(BaseModel):
     id_number: int
     messages: str
+    idempotency_key: Optional[str] = None     # or the Idempotency-Key header
+    session_id: Optional[str] = None          # conversation to continue (returned by the first call)
+
+
+class BulkBookingQuery(BaseModel):
+    appointments: list[dict]        # {"desired_date": "DD-MM-YYYY HH:MM", "id_number": ..., "doctor_name": ...}
+                                    # plus "old_date" to move that appointment to desired_date
+    all_or_nothing: bool = False
 
 
 # -------------------------------
 # INIT AGENT + GRAPH ONLY ONCE
 # -------------------------------
 agent = DoctorAppointmentAgent()
-app_graph = agent.workflow()         # build workflow ONCE (important!)
+# conversation state saved per session (SESSION_DB_PATH, idle sessions dropped after SESSION_TTL seconds)
+sessions = SQLiteSessionSaver(os.getenv("SESSION_DB_PATH") or os.path.join("data", SESSIONS_FILE))
+app_graph = agent.workflow(checkpointer=sessions)         # build workflow ONCE (important!)
 
 
 # -------------------------------
 # MAIN ENDPOINT
 # -------------------------------
 @app.post("/execute")
-def execute_agent(user_input: UserQuery):
+async def execute_agent(user_input: UserQuery, idempotency_key: Optional[str] = Header(default=None)):
+    # a retried request (same key) gets the first response back without running the agents again;
+    # the tool calls of the run derive their own keys from it (see toolkit/idempotency.py)
+    key = user_input.idempotency_key or idempotency_key
+    with request_scope(key):
+        return await operations.run_async(
+            "execute", key, user_input.model_dump(exclude={"idempotency_key"}), lambda: run_agent(user_input)
+        )
+
+
+async def run_agent(user_input: UserQuery):
+    # without a session ID the turn starts a new conversation, whose ID is returned
+    session_id = user_input.session_id or str(uuid.uuid4())
 
     # Prepare user message as LangChain HumanMessage
     input_message = [HumanMessage(content=user_input.messages)]
@@ -41,14 +70,15 @@ def execute_agent(user_input: UserQuery):
         "next": "",
         "query": "",
         "current_reasoning": "",
+        "handoffs": 0,
     }
 
-    # Run agent workflow
-    response = app_graph.invoke(
+    # Run agent workflow (async: the event loop stays free while the agents and tools work)
+    response = await app_graph.ainvoke(
         query_state,
         config={
             "recursion_limit": 40,
-            "configurable": {"thread_id": "session_1"}
+            "configurable": {"thread_id": session_id}
         }
     )
 
@@ -62,9 +92,11 @@ def execute_agent(user_input: UserQuery):
         "content": user_input.messages
     })
     
-    # Find the last assistant/agent message in the response
+    # Find the last assistant/agent message of this turn (the session's history comes before the user message)
+    turn_messages = response["messages"]
+    last_human = max((i for i, msg in enumerate(turn_messages) if isinstance(msg, HumanMessage)), default=-1)
     assistant_messages = []
-    for msg in response["messages"]:
+    for msg in turn_messages[last_human + 1:]:
         if hasattr(msg, "content"):
             # Skip the user message (we already added it)
             if hasattr(msg, 'type') and msg.type == 'human':
@@ -103,4 +135,27 @@ def execute_agent(user_input: UserQuery):
             "content": "How can I help you today?"
         })
 
-    return {"messages": output_messages}
+    return {"messages": output_messages, "session_id": session_id}
+
+
+# -------------------------------
+# BULK BOOKING (front desk)
+# -------------------------------
+@app.post("/appointments/bulk")
+def book_appointments_bulk(request: BulkBookingQuery):
+    # every request validated in one pass, the free slots booked in one atomic write, then the moves
+    results = book_appointments(request.appointments, request.all_or_nothing)
+    return {
+        "booked": sum(result["status"] == BOOKED for result in results),
+        "moved": sum(result["status"] == RESCHEDULED for result in results),
+        "results": results,
+    }
+
+
+# -------------------------------
+# ROUTING STATS
+# -------------------------------
+@app.get("/routing/stats")
+def get_routing_stats():
+    # share of the supervisor's routing decisions made without an LLM call (see agents/routing.py)
+    return routing_stats.snapshot() | {"confidence_threshold": CONFIDENCE_THRESHOLD}
@@ -24,14 +24,13 @@ def get_response(user_message: str, patient_id: int) -> str:
     # Patient information
     elif any(word in user_message_lower for word in ['patient', 'my info', 'information', 'get my']):
         try:
-            import pandas as pd
-            df = pd.read_csv("data/patients.csv")
-            patient = df[df["ID"] == patient_id]
+            # through the storage: patients.csv lags the journal until the next compaction
+            from toolkit.storage import get_storage
+            patient_info = get_storage("data/").get_patient(patient_id)
             
-            if len(patient) == 0:
+            if patient_info is None:
                 return f"No patient found with ID: {patient_id}"
             
-            patient_info = patient.iloc[0]
             return (
                 f"Patient ID: {patient_info['ID']}\n"
                 f"Name: {patient_info['nom']}\n"
@@ -1,5 +1,11 @@
 """
 Simple appointment chatbot focused on appointment management
+
+It reads and rewrites the CSV files itself, with its own columns, and is
+not meant to run beside the main API: the CSV backend of toolkit/storage.py
+only folds its journal (data/bookings.journal) into the CSV files every
+JOURNAL_COMPACT_EVERY events and when it is closed, so recent bookings are
+missing from what this script reads.
 """
 
 from fastapi import FastAPI
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Tests for the in-memory indexed availability store."""
+
+import os
+import sys
+import threading
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from toolkit.availability_store import AvailabilityStore, normalize_doctor
+from toolkit.timeslots import format_slot, parse_day, parse_slot
+
+
+CSV_CONTENT = """date_availability,specialization,doctor_name,is_available,id_patient
+04-12-2025 08:00,Orthodontie,Dr.Mohamed Tajmouati,True,
+04-12-2025 08:30,Orthodontie,Dr.Mohamed Tajmouati,False,1000024.0
+04-12-2025 09:00,Orthodontie,Dr.Mohamed Tajmouati,Ture,
+05-12-2025 08:00,Orthodontie,Dr.Mohamed Tajmouati,True,
+05-12-2025 08:30,general_dentist,Dr.Hanane Louizi,True,
+05-12-2025 09:00,general_dentist,Dr.Hanane Louizi,False,1000094.0
+"""
+
+
+def make_store(tmp_path):
+    csv_path = tmp_path / "doctor_availability.csv"
+    csv_path.write_text(CSV_CONTENT, encoding="utf-8")
+    return AvailabilityStore(str(csv_path))
+
+
+def test_normalize_doctor():
+    assert normalize_doctor("Dr.Mohamed Tajmouati") == "mohamed tajmouati"
+    assert normalize_doctor("dr  mohamed   Tajmouati ") == "mohamed tajmouati"
+    assert normalize_doctor("Mohamed Tajmouati") == "mohamed tajmouati"
+
+
+def test_doctor_day_lookup(tmp_path):
+    store = make_store(tmp_path)
+
+    slots = store.doctor_day("Dr Mohamed Tajmouati", parse_day("04-12-2025"))
+    assert [slot.time for slot in slots] == ["08:00", "08:30", "09:00"]
+    # "Ture" typo is read as available
+    assert [slot.is_available for slot in slots] == [True, False, True]
+    assert slots[1].id_patient == 1000024
+
+    assert store.doctor_day("Dr Mohamed Tajmouati", parse_day("06-12-2025")) == []
+
+
+def test_specialization_day_lookup(tmp_path):
+    store = make_store(tmp_path)
+
+    slots = store.specialization_day("GENERAL_DENTIST", parse_day("05-12-2025"))
+    assert [slot.date_availability for slot in slots] == ["05-12-2025 08:30"]
+
+    all_slots = store.specialization_day("general_dentist", parse_day("05-12-2025"), available_only=False)
+    assert len(all_slots) == 2
+
+
+def test_mark_writes_through(tmp_path):
+    store = make_store(tmp_path)
+
+    assert store.mark("dr.mohamed tajmouati", parse_slot("04-12-2025 08:00"), False, 42) == 1
+    assert store.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 08:00")).id_patient == 42
+
+    df = pd.read_csv(store.csv_path, dtype=str)
+    row = df[df["date_availability"] == "04-12-2025 08:00"].iloc[0]
+    assert row["is_available"] == "False"
+    assert row["id_patient"] == "42"
+    # the other rows are written back as they were read
+    assert df["is_available"].tolist()[2] == "Ture"
+
+    # a fresh store sees the persisted state
+    reloaded = AvailabilityStore(store.csv_path)
+    assert not reloaded.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 08:00")).is_available
+
+
+def test_mark_unknown_slot(tmp_path):
+    store = make_store(tmp_path)
+    assert store.mark("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 18:00"), False, 42) == 0
+
+
+def test_time_keys_round_trip():
+    start = parse_slot("04-12-2025 08:30")
+    assert start % (24 * 60) == 8 * 60 + 30
+    assert format_slot(start) == "04-12-2025 08:30"
+    assert parse_day("2025-12-04") == parse_day("04-12-2025") == start // (24 * 60)
+
+
+def test_slots_are_sorted_by_start(tmp_path):
+    csv_path = tmp_path / "doctor_availability.csv"
+    csv_path.write_text(
+        "date_availability,specialization,doctor_name,is_available,id_patient\n"
+        "04-12-2025 10:00,Orthodontie,Dr.Mohamed Tajmouati,True,\n"
+        "04-12-2025 09:30,Orthodontie,Dr.Mohamed Tajmouati,True,\n",
+        encoding="utf-8",
+    )
+    store = AvailabilityStore(str(csv_path))
+    assert [slot.time for slot in store.doctor_day("Dr.Mohamed Tajmouati", parse_day("04-12-2025"))] == ["09:30", "10:00"]
+
+
+def test_snapshot_is_not_changed_by_later_writes(tmp_path):
+    store = make_store(tmp_path)
+    doctor_key = normalize_doctor("Dr.Mohamed Tajmouati")
+    day = parse_day("04-12-2025")
+
+    before = store.snapshot()
+    store.mark("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 08:00"), False, 42)
+
+    assert before.doctor_day(doctor_key, day)[0].is_available
+    assert before.count_free(doctor_key, day) == 2
+    assert before.specialization_day("orthodontie", day)[0].id_patient is None
+
+    after = store.snapshot()
+    assert after.doctor_day(doctor_key, day)[0].id_patient == 42
+    assert after.count_free(doctor_key, day) == 1
+    assert after.specialization_day("orthodontie", day)[0].id_patient == 42
+    # the other doctors' indexes are shared, not copied
+    assert after.by_doctor["hanane louizi"] is before.by_doctor["hanane louizi"]
+
+
+def test_readers_never_see_a_half_applied_write(tmp_path):
+    store = make_store(tmp_path)
+    store.write_through = False
+    doctor_key = normalize_doctor("Dr.Mohamed Tajmouati")
+    day = parse_day("04-12-2025")
+    starts = [parse_slot("04-12-2025 08:00"), parse_slot("04-12-2025 09:00")]
+    done = threading.Event()
+    errors = []
+
+    def reader():
+        while not done.is_set():
+            snapshot = store.snapshot()
+            rows = snapshot.doctor_day(doctor_key, day)
+            # rows and bitmap of one snapshot always agree
+            if snapshot.free_starts(doctor_key, day) != [slot.start for slot in rows if slot.is_available]:
+                errors.append(rows)
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for i in range(2000):
+        store.mark("Dr.Mohamed Tajmouati", starts[i % 2], i % 3 == 0, None)
+    done.set()
+    for thread in readers:
+        thread.join()
+    assert errors == []
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Tests for the append-only booking journal of the CSV backend."""
+
+import os
+import shutil
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from toolkit.journal import JOURNAL_FILE, BookingJournal, GroupCommitWriter
+from toolkit.storage import BOOKED, CREATED, NOTHING_TO_UPDATE, UPDATED, CSVStorage
+from toolkit.timeslots import format_time, parse_slot
+
+
+DATA_FILES = ["doctor_availability.csv", "rendez_vous.csv", "patients.csv", "doctors.csv"]
+DOCTOR = "Dr.Mohamed Tajmouati"
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    for file_name in DATA_FILES:
+        shutil.copy(os.path.join(source, file_name), tmp_path / file_name)
+    return str(tmp_path) + os.sep
+
+
+def read_file(data_path, file_name):
+    with open(os.path.join(data_path, file_name), encoding="utf-8") as file:
+        return file.read()
+
+
+def test_booking_appends_instead_of_rewriting(data_path):
+    before = read_file(data_path, "doctor_availability.csv"), read_file(data_path, "rendez_vous.csv")
+    storage = CSVStorage(data_path)
+
+    assert storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:00"), 77)[0] == BOOKED
+    assert storage.cancel_booking(DOCTOR, parse_slot("04-12-2025 08:00"), 77)
+
+    # snapshots untouched, two events journaled
+    assert (read_file(data_path, "doctor_availability.csv"), read_file(data_path, "rendez_vous.csv")) == before
+    events = BookingJournal.read(os.path.join(data_path, JOURNAL_FILE))
+    assert [event["op"] for event in events] == ["book", "cancel"]
+
+
+def test_journal_is_replayed_on_startup(data_path):
+    storage = CSVStorage(data_path)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:00"), 77)
+    storage.journal.close()
+
+    restarted = CSVStorage(data_path)
+    assert restarted.get_slot(DOCTOR, parse_slot("04-12-2025 08:00")).id_patient == 77
+    assert len(restarted.patient_appointments(77)) == 1
+
+
+def test_created_patient_is_journaled_not_rewritten(data_path):
+    before = read_file(data_path, "patients.csv")
+    storage = CSVStorage(data_path)
+    assert storage.create_patient({"nom": "New", "email": "new@email.com", "telephone": "212600000001"}) \
+        == (CREATED, 12)
+    assert read_file(data_path, "patients.csv") == before
+    storage.journal.close()
+
+    restarted = CSVStorage(data_path)
+    assert restarted.get_patient(12)["nom"] == "New"
+    assert restarted.create_patient({"nom": "Next", "email": "next@email.com", "telephone": "212600000002"}) \
+        == (CREATED, 13)
+    restarted.compact()
+    assert "next@email.com" in read_file(data_path, "patients.csv")
+
+
+def test_patient_update_is_journaled_not_rewritten(data_path):
+    before = read_file(data_path, "patients.csv")
+    storage = CSVStorage(data_path)
+    assert storage.update_patient(3, {"addresse": "5 Rue Neuve"}) == (UPDATED, 3)
+    assert read_file(data_path, "patients.csv") == before
+    assert BookingJournal.read(os.path.join(data_path, JOURNAL_FILE))[-1] == {
+        "op": "update_patient", "patient_id": 3, "fields": {"addresse": "5 Rue Neuve"},
+    }
+    # no field to change: nothing is journaled
+    assert storage.update_patient(3, {}) == (NOTHING_TO_UPDATE, 3)
+    assert len(BookingJournal.read(os.path.join(data_path, JOURNAL_FILE))) == 1
+    storage.journal.close()
+
+    restarted = CSVStorage(data_path)
+    assert restarted.get_patient(3)["addresse"] == "5 Rue Neuve"
+    assert restarted.get_patient(3)["nom"] == "Karim Alami"
+
+
+def test_compaction_writes_snapshots_and_empties_journal(data_path):
+    storage = CSVStorage(data_path)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:00"), 77)
+    storage.compact()
+
+    assert storage.journal.pending == 0
+    assert BookingJournal.read(os.path.join(data_path, JOURNAL_FILE)) == []
+
+    df_avl = pd.read_csv(os.path.join(data_path, "doctor_availability.csv"))
+    df_app = pd.read_csv(os.path.join(data_path, "rendez_vous.csv"))
+    assert int(df_avl[df_avl["date_availability"] == "04-12-2025 08:00"].iloc[0]["id_patient"]) == 77
+    assert len(df_app[df_app["patient_id"] == 77]) == 1
+
+
+def test_compaction_only_rewrites_the_rows_that_changed(data_path):
+    def read_bytes(file_name):
+        with open(os.path.join(data_path, file_name), "rb") as file:
+            return file.read()
+
+    before = {file_name: read_bytes(file_name) for file_name in DATA_FILES}
+    storage = CSVStorage(data_path)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:00"), 77)
+    storage.update_patient(2, {"nom": "Renamed"})
+    storage.compact()
+
+    # the demo files keep their line endings, "1000024.0" ids, "Ture" typo and missing final newline
+    availability = read_bytes("doctor_availability.csv").split(b"\n")
+    changed = [line for line in availability if line not in before["doctor_availability.csv"].split(b"\n")]
+    assert changed == [b"04-12-2025 08:00,Orthodontie,Dr.Mohamed Tajmouati,False,77"]
+    assert len(availability) == len(before["doctor_availability.csv"].split(b"\n"))
+
+    appointments = read_bytes("rendez_vous.csv")
+    assert appointments.startswith(before["rendez_vous.csv"] + b"\r\n")
+    assert appointments.count(b"\r\n") == before["rendez_vous.csv"].count(b"\r\n") + 1
+
+    patients, old_patients = read_bytes("patients.csv").split(b"\r\n"), before["patients.csv"].split(b"\r\n")
+    assert [i for i, (new, old) in enumerate(zip(patients, old_patients)) if new != old] == [2]
+    assert len(patients) == len(old_patients)
+
+
+def test_close_writes_the_snapshots(data_path):
+    storage = CSVStorage(data_path)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:00"), 77)
+    storage.close()
+
+    assert BookingJournal.read(os.path.join(data_path, JOURNAL_FILE)) == []
+    appointments = pd.read_csv(os.path.join(data_path, "rendez_vous.csv"))
+    assert 77 in appointments["patient_id"].values
+
+
+def test_compaction_is_triggered_periodically(data_path):
+    storage = CSVStorage(data_path, compact_every=2)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:00"), 77)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:30"), 8)
+
+    with storage._compact_lock:   # wait for the background compaction
+        pass
+    df_app = pd.read_csv(os.path.join(data_path, "rendez_vous.csv"))
+    assert set(df_app["patient_id"]) >= {77, 8}
+
+
+def test_replay_after_interrupted_compaction_is_idempotent(data_path):
+    storage = CSVStorage(data_path)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:00"), 77)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:30"), 77)
+    storage.cancel_booking(DOCTOR, parse_slot("04-12-2025 08:30"), 77)
+
+    # crash after the snapshots were written but before the journal was dropped
+    storage.journal.rotate()
+    storage.availability.save()
+    storage.appointments.save()
+    storage.journal.close()
+
+    restarted = CSVStorage(data_path)
+    appointments = restarted.patient_appointments(77)
+    assert [format_time(appointment["start"]) for appointment in appointments] == ["08:00"]
+    assert not restarted.get_slot(DOCTOR, parse_slot("04-12-2025 08:00")).is_available
+    assert restarted.get_slot(DOCTOR, parse_slot("04-12-2025 08:30")).is_available
+
+
+def test_torn_last_line_is_ignored(data_path):
+    storage = CSVStorage(data_path)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:00"), 77)
+    storage.journal.close()
+    with open(os.path.join(data_path, JOURNAL_FILE), "a", encoding="utf-8") as file:
+        file.write('{"op": "book", "doc')
+
+    restarted = CSVStorage(data_path)
+    assert restarted.get_slot(DOCTOR, parse_slot("04-12-2025 08:00")).id_patient == 77
+
+
+def test_reschedule_is_one_journal_event(data_path):
+    storage = CSVStorage(data_path)
+    storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:00"), 77)
+    storage.move_booking(DOCTOR, parse_slot("04-12-2025 08:00"), parse_slot("04-12-2025 09:00"), 77)
+
+    events = BookingJournal.read(os.path.join(data_path, JOURNAL_FILE))
+    assert [event["op"] for event in events] == ["book", "move"]
+
+    storage.journal.close()
+    restarted = CSVStorage(data_path)
+    assert restarted.get_slot(DOCTOR, parse_slot("04-12-2025 08:00")).is_available
+    assert restarted.get_slot(DOCTOR, parse_slot("04-12-2025 09:00")).id_patient == 77
+
+
+def test_string_keyed_events_are_replayed(data_path):
+    # journals written before slots were keyed by epoch-minutes
+    with open(os.path.join(data_path, JOURNAL_FILE), "w", encoding="utf-8") as file:
+        file.write(
+            '{"op": "book", "doctor": "Dr.Mohamed Tajmouati", "slot": "04-12-2025 08:00", "patient_id": 77, '
+            '"appointment": {"patient_id": 77, "medecin_id": 1, "date rendez vous": "04-12-2025", '
+            '"heure rendez-vous": "08:00", "service": "Orthodontie"}}\n'
+        )
+
+    storage = CSVStorage(data_path)
+    assert storage.get_slot(DOCTOR, parse_slot("04-12-2025 08:00")).id_patient == 77
+    assert [appointment["start"] for appointment in storage.patient_appointments(77)] == [parse_slot("04-12-2025 08:00")]
+
+
+def test_concurrent_bookings_share_journal_writes(data_path):
+    storage = CSVStorage(data_path)
+    storage.writer.interval = 0.05
+    starts = [parse_slot("04-12-2025 08:00"), parse_slot("04-12-2025 08:30"), parse_slot("04-12-2025 09:00")]
+    barrier = threading.Barrier(len(starts))
+
+    def book(i):
+        barrier.wait()
+        storage.book_slot(DOCTOR, starts[i], 70 + i)
+        # the acknowledgement is durable: the event is already in the file
+        events = BookingJournal.read(os.path.join(data_path, JOURNAL_FILE))
+        assert any(event["patient_id"] == 70 + i for event in events)
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(len(starts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(BookingJournal.read(os.path.join(data_path, JOURNAL_FILE))) == len(starts)
+    assert storage.writer.batches < len(starts)
+
+
+def test_failed_journal_write_is_undone(data_path, monkeypatch):
+    storage = CSVStorage(data_path)
+    start = parse_slot("04-12-2025 08:00")
+    assert storage.book_slot(DOCTOR, parse_slot("04-12-2025 08:30"), 76)[0] == BOOKED
+
+    def no_space(fd):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr("toolkit.journal.os.fsync", no_space)
+    with pytest.raises(OSError):
+        storage.book_slot(DOCTOR, start, 77)
+
+    # the booking is gone from memory and from the journal; the earlier one is kept
+    assert storage.get_slot(DOCTOR, start).is_available
+    assert storage.patient_appointments(77) == []
+    assert storage.get_slot(DOCTOR, parse_slot("04-12-2025 08:30")).id_patient == 76
+    events = BookingJournal.read(os.path.join(data_path, JOURNAL_FILE))
+    assert [event["patient_id"] for event in events] == [76]
+
+    monkeypatch.undo()
+    assert storage.book_slot(DOCTOR, start, 77)[0] == BOOKED
+    assert len(BookingJournal.read(os.path.join(data_path, JOURNAL_FILE))) == 2
+
+
+def test_group_commit_batches_and_reports_failures(tmp_path):
+    journal = BookingJournal(str(tmp_path / JOURNAL_FILE))
+    writer = GroupCommitWriter(journal, interval_ms=200, max_batch=3)
+    tickets = [writer.submit([{"op": "mark", "n": i}]) for i in range(3)]
+    writer.wait(tickets[-1])            # a full batch does not wait for the interval
+    assert writer.batches == 1
+    assert [event["n"] for event in BookingJournal.read(journal.path)] == [0, 1, 2]
+
+    journal.close()                     # the next batch cannot be written
+    ticket = writer.submit([{"op": "mark", "n": 3}])
+    with pytest.raises(ValueError):
+        writer.wait(ticket)
+    writer.close()
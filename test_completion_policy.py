@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Tests for the completion policy of DoctorAppointmentAgent (a worker's answer ends the turn)."""
+
+import os
+import sys
+from itertools import cycle
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agents.agent import HANDOFF_TOOL, DoctorAppointmentAgent
+
+
+class FakeToolModel(GenericFakeChatModel):
+    """Fake chat model accepting tools; without structured output, the supervisor routes by keywords."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def run_turn(answers: list, message: str):
+    # skip LLMModel(): no API key or network needed
+    agent = DoctorAppointmentAgent.__new__(DoctorAppointmentAgent)
+    agent.llm_model = FakeToolModel(messages=cycle(answers))
+    agent._sub_agents = {}
+    supervisor_calls = []
+    supervisor_node = agent.supervisor_node
+    agent.supervisor_node = lambda state: supervisor_calls.append(1) or supervisor_node(state)
+
+    state = agent.workflow().invoke(
+        {
+            "messages": [HumanMessage(content=message)],
+            "id_number": 1000082, "next": "", "query": "", "current_reasoning": "", "handoffs": 0,
+        },
+        {"recursion_limit": 40},
+    )
+    return state, len(supervisor_calls)
+
+
+def test_worker_answer_ends_the_turn():
+    state, supervisor_calls = run_turn([AIMessage(content="Dr Adil is free at 10:00.")],
+                                       "is Dr Adil available tomorrow?")
+    assert supervisor_calls == 1
+    assert state["messages"][-1].content == "Dr Adil is free at 10:00."
+    assert state["messages"][-1].name == "check_suggest_availability_sup_agent"
+
+
+def test_handoff_goes_back_to_the_supervisor_once():
+    handoff = AIMessage(content="", tool_calls=[
+        {"name": HANDOFF_TOOL, "args": {"reason": "This is a billing question."}, "id": "call-1"},
+    ])
+    state, supervisor_calls = run_turn([handoff], "is Dr Adil available tomorrow?")
+    # handed back once, then the worker's (default) answer ends the turn
+    assert supervisor_calls == 2
+    assert state["handoffs"] == 1
+    assert state["messages"][-1].name == "check_suggest_availability_sup_agent"
+    assert state["messages"][-1].content
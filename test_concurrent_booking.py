@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Stress test: hundreds of concurrent bookings of one slot must produce exactly one winner."""
+
+import os
+import shutil
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import toolkit.toolkits as toolkits
+from toolkit.storage import CSVStorage, set_storage
+from toolkit.sqlite_storage import import_csv
+from toolkit.timeslots import parse_slot
+
+
+DATA_FILES = ["doctor_availability.csv", "rendez_vous.csv", "patients.csv", "doctors.csv"]
+CONCURRENT_BOOKINGS = 200
+SLOT = "04-12-2025 08:00"
+DOCTOR = "Dr.Mohamed Tajmouati"
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def storage(request, tmp_path, monkeypatch):
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    for file_name in DATA_FILES:
+        shutil.copy(os.path.join(source, file_name), tmp_path / file_name)
+
+    data_path = str(tmp_path) + os.sep
+    if request.param == "csv":
+        backend = CSVStorage(data_path)
+    else:
+        backend = import_csv(data_path, str(tmp_path / "appointments.db"))
+
+    monkeypatch.setattr(toolkits, "DATA_PATH", data_path)
+    set_storage(data_path, backend)
+    yield backend
+    set_storage(data_path, None)
+
+
+def test_exactly_one_booking_wins(storage):
+    barrier = threading.Barrier(CONCURRENT_BOOKINGS)
+    results = [None] * CONCURRENT_BOOKINGS
+
+    def book(i):
+        barrier.wait()
+        results[i] = toolkits.set_appointment.func(SLOT, 1000 + i, DOCTOR)
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(CONCURRENT_BOOKINGS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    winners = [i for i, result in enumerate(results) if "successfully" in result]
+    assert len(winners) == 1
+    assert all("already booked" in result for i, result in enumerate(results) if i != winners[0])
+
+    # the slot and the appointment book agree on the single winner
+    slot = storage.get_slot(DOCTOR, parse_slot(SLOT))
+    assert not slot.is_available
+    assert slot.id_patient == 1000 + winners[0]
+
+    booked = [
+        appointment
+        for i in range(CONCURRENT_BOOKINGS)
+        for appointment in storage.patient_appointments(1000 + i)
+    ]
+    assert len(booked) == 1
+    assert booked[0]["patient_id"] == 1000 + winners[0]
+
+
+def test_csv_files_stay_in_sync(storage):
+    if not isinstance(storage, CSVStorage):
+        pytest.skip("CSV files only")
+
+    toolkits.set_appointment.func(SLOT, 1234, DOCTOR)
+    storage.compact()
+
+    df_avl = pd.read_csv(os.path.join(storage.data_path, "doctor_availability.csv"))
+    df_app = pd.read_csv(os.path.join(storage.data_path, "rendez_vous.csv"))
+    assert int(df_avl[df_avl["date_availability"] == SLOT].iloc[0]["id_patient"]) == 1234
+    assert len(df_app[df_app["patient_id"] == 1234]) == 1
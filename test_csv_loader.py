@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Tests for the shared cached CSV loader."""
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from toolkit.csv_loader import load_csv, write_csv
+
+
+AVAILABILITY = """date_availability,specialization,doctor_name,is_available,id_patient
+04-12-2025 08:00,Orthodontie,Dr.Mohamed Tajmouati,True,
+04-12-2025 08:30,Orthodontie,Dr.Mohamed Tajmouati,False,1000024.0
+04-12-2025 09:00,Orthodontie,Dr.Mohamed Tajmouati,Ture,
+"""
+
+
+def test_typed_columns(tmp_path):
+    path = tmp_path / "doctor_availability.csv"
+    path.write_text(AVAILABILITY, encoding="utf-8")
+
+    df = load_csv(str(path))
+    assert df["is_available"].tolist() == [True, False, True]
+    assert df["id_patient"].dtype == "Int64"
+    assert df["id_patient"].isna().tolist() == [True, False, True]
+    assert isinstance(df["doctor_name"].dtype, pd.CategoricalDtype)
+    assert df["date_availability"].iloc[0] == "04-12-2025 08:00"
+
+    patients = tmp_path / "patients.csv"
+    patients.write_text("ID,nom,telephone\n1,Test,0612345678\n", encoding="utf-8")
+    assert load_csv(str(patients))["telephone"].iloc[0] == "0612345678"
+
+
+def test_unchanged_file_is_not_parsed_again(tmp_path):
+    path = tmp_path / "doctor_availability.csv"
+    path.write_text(AVAILABILITY, encoding="utf-8")
+
+    first = load_csv(str(path))
+    assert load_csv(str(path)) is first
+
+    # another writer changes the file: size and mtime differ
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("05-12-2025 08:00,Orthodontie,Dr.Mohamed Tajmouati,True,\n")
+    assert len(load_csv(str(path))) == 4
+
+    # our own writes drop the cached frame
+    write_csv(first, str(path))
+    assert len(load_csv(str(path))) == 3
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Tests for the idempotency key cache."""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from toolkit.idempotency import IdempotencyCache, IdempotencyConflict
+
+
+def test_operation_runs_once_per_key():
+    cache = IdempotencyCache()
+    calls = []
+
+    def operation():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.run("book", "key-1", {"slot": 1}, operation) == 1
+    assert cache.run("book", "key-1", {"slot": 1}, operation) == 1
+    assert cache.run("cancel", "key-1", {"slot": 1}, operation) == 2      # keys are scoped by operation
+    assert cache.run("book", None, {"slot": 1}, operation) == 3           # no key: always runs
+    with pytest.raises(IdempotencyConflict):
+        cache.run("book", "key-1", {"slot": 2}, operation)
+
+
+def test_concurrent_retry_waits_for_the_first_execution():
+    cache = IdempotencyCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def operation():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "done"
+
+    first = threading.Thread(target=cache.run, args=("book", "key", {}, operation))
+    first.start()
+    started.wait()
+    results = []
+    retry = threading.Thread(target=lambda: results.append(cache.run("book", "key", {}, operation)))
+    retry.start()
+    release.set()
+    first.join()
+    retry.join()
+    assert results == ["done"]
+    assert len(calls) == 1
+
+
+def test_failures_are_not_cached_and_entries_expire():
+    cache = IdempotencyCache(ttl=0.05, max_entries=2)
+
+    def fail():
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        cache.run("book", "key", {}, fail)
+    assert cache.run("book", "key", {}, lambda: "retried") == "retried"
+
+    time.sleep(0.06)
+    assert cache.run("book", "key", {}, lambda: "again") == "again"
+
+    for key in ("a", "b", "c"):
+        cache.run("book", key, {}, lambda: key)
+    assert len(cache) == 2
+
+
+def test_running_operations_are_not_evicted():
+    cache = IdempotencyCache(max_entries=1)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def operation():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "done"
+
+    first = threading.Thread(target=cache.run, args=("book", "slow", {}, operation))
+    first.start()
+    started.wait()
+    assert cache.run("book", "other", {}, lambda: "other") == "other"    # over the limit
+    results = []
+    retry = threading.Thread(target=lambda: results.append(cache.run("book", "slow", {}, operation)))
+    retry.start()
+    release.set()
+    first.join()
+    retry.join()
+    assert results == ["done"]
+    assert len(calls) == 1
+
+    cache.run("book", "third", {}, lambda: "third")
+    assert len(cache) == 1
+
+
+def test_async_operations():
+    cache = IdempotencyCache()
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"messages": ["ok"]}
+
+    async def main():
+        return await asyncio.gather(*(cache.run_async("execute", "key", {"q": 1}, operation) for _ in range(3)))
+
+    assert asyncio.run(main()) == [{"messages": ["ok"]}] * 3
+    assert len(calls) == 1
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Tests for the keyword intent router."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+import agents.agent
+from agents.agent import SUB_AGENTS, DoctorAppointmentAgent, Router
+from agents.routing import AGENT_NODES, INTENTS, KeywordRouter, RoutingStats, keyword_weights, router
+from toolkit.toolkits import get_patient_appointments
+
+
+def test_messages_are_routed_in_each_language():
+    assert router.best("réserver avec Dr Adil demain 10:00") == "appointment"
+    assert router.best("Reserver avec le Dr Adil") == "appointment"                # accents are optional
+    assert router.best("Is Dr. Adil available on 15-12-2024?") == "availability"
+    assert router.best("mettre à jour mon profil") == "patient"
+    assert router.best("What are your services?") == "faq"
+    assert router.best("أريد إلغاء الموعد") == "appointment"                       # attached article
+    assert router.best("Bonjour, je veux annuler mon RDV") == "appointment"         # a greeting counts less
+    assert router.best("Bonjour") == "greeting"
+    assert router.best("merci beaucoup") is None
+
+
+def test_scores_are_weighted_and_match_at_word_start():
+    scores = router.scores("What time is my appointment? I booked it for 10:00")
+    assert scores == {"faq": 0.5, "availability": 0.5, "appointment": 2.0}
+    assert router.scores("facebook") == {}                                          # "book" inside a word
+    assert router.best("schedule") == "appointment"                                 # tie: first intent wins
+
+
+def test_overlapping_keywords_are_all_found():
+    keywords = {"a": {"he": 1.0, "she": 1.0, "hers": 2.0}, "b": {"his": 1.0, "ushers": 0.5}}
+    for automaton in (False, True):
+        keyword_router = KeywordRouter(keywords, automaton=automaton)
+        # keywords only match at the start of a word: "she" and "he" are not found in "ushers"
+        assert keyword_router.scores("ushers") == {"b": 0.5}
+        # "hers" holds "he" and "hers"
+        assert keyword_router.scores("she hers his he") == {"a": 5.0, "b": 1.0}
+        # overlapping occurrences of an Arabic keyword all count
+        assert KeywordRouter({"a": {"ببب": 1.0}}, automaton=automaton).scores("بببب") == {"a": 2.0}
+
+
+def test_the_vocabulary_is_scanned_until_it_is_large():
+    assert not router.automaton and len(router) == 1
+    compiled = KeywordRouter(keyword_weights(), INTENTS, automaton=True)
+    for message in ["What time is my appointment? I booked it for 10:00", "أريد إلغاء الموعد",
+                    "Bonjour, je veux annuler mon RDV", "mettre à jour mon profil", "merci beaucoup"]:
+        assert compiled.scores(message) == router.scores(message)
+    large = {"a": {f"keyword{number}": 1.0 for number in range(1000)}}
+    assert KeywordRouter(large).automaton
+
+
+def test_listing_requests_reach_an_agent_that_can_list_appointments():
+    for message in ["mes rendez-vous", "show my appointments"]:
+        node = AGENT_NODES[router.best(message)]
+        assert get_patient_appointments in SUB_AGENTS[node][1]
+
+
+def test_confidence_is_the_lead_of_the_best_intent():
+    assert router.classify("réserver avec Dr Adil demain 10:00") == ("appointment", 1.0 / 1.5)
+    assert router.classify("book an appointment with Dr Adil") == ("appointment", 2.0 / 2.5)
+    assert router.classify("I want to book, is 10:00 available?") == ("appointment", 0.0)
+    assert router.classify("Dr Adil please") == (None, 0.0)
+
+
+def test_supervisor_asks_the_llm_only_for_ambiguous_messages(monkeypatch):
+    llm_calls = []
+
+    class RouterModel(GenericFakeChatModel):
+        def with_structured_output(self, schema, **kwargs):
+            llm_calls.append(1)
+            return RunnableLambda(lambda messages: Router(next="appointment_management_sup_agent"))
+
+    monkeypatch.setattr(agents.agent, "stats", RoutingStats())
+    agent = DoctorAppointmentAgent.__new__(DoctorAppointmentAgent)
+    agent.llm_model = RouterModel(messages=iter([]))
+
+    def route(message: str) -> str:
+        return agent.supervisor_node({"messages": [HumanMessage(content=message)], "id_number": 1000082}).goto
+
+    assert route("réserver avec Dr Adil demain 10:00") == "appointment_management_sup_agent"
+    assert route("mes informations de patient") == "patient_management_sup_agent"
+    assert route("What time is my appointment?") == "appointment_management_sup_agent"
+    assert len(llm_calls) == 1
+    assert agents.agent.stats.snapshot() == {"routed_locally": 2, "routed_by_llm": 1, "llm_calls_avoided": 2 / 3}
+
+    monkeypatch.setattr(agents.agent, "CONFIDENCE_THRESHOLD", 1.0)      # always ask the LLM
+    route("mes rendez-vous")
+    assert len(llm_calls) == 2
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Tests for the doctors.csv schedule compiler and the generated slots."""
+
+import os
+import shutil
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from toolkit.schedules import parse_schedule, weekday_of
+from toolkit.storage import BOOKED, CSVStorage
+from toolkit.timeslots import format_time, parse_day, parse_slot
+
+
+DATA_FILES = ["doctor_availability.csv", "rendez_vous.csv", "patients.csv", "doctors.csv"]
+MONDAY = parse_day("08-12-2025")
+THURSDAY = parse_day("04-12-2025")
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    for file_name in DATA_FILES:
+        shutil.copy(os.path.join(source, file_name), tmp_path / file_name)
+    return str(tmp_path) + os.sep
+
+
+def test_parse_ranges_and_lists():
+    assert weekday_of(MONDAY) == 0
+
+    hours = parse_schedule("Lundi-Vendredi: 09:00-18:30, Samedi: 09:00-13:00")
+    assert sorted(hours) == [0, 1, 2, 3, 4, 5]
+    assert hours[5] == [(540, 780)]
+
+    # three days joined by "-" are a list, not a range
+    hours = parse_schedule("Lundi-Mercredi-Vendredi: 09:00-18:30, Jeudi: 09:00-13:00")
+    assert sorted(hours) == [0, 2, 3, 4]
+
+    hours = parse_schedule("lundi: 09:00-12:00 / 14:00-16:00, Samedi-Lundi: 10:00-11:00")
+    assert hours[0] == [(540, 720), (600, 660), (840, 960)]
+    assert sorted(hours) == [0, 5, 6]
+
+    with pytest.raises(ValueError):
+        parse_schedule("Lundy: 09:00-12:00")
+
+
+def test_slots_are_generated_from_the_schedule(data_path):
+    storage = CSVStorage(data_path, schedule_slots=True)
+
+    # Dr Adil Tajmouati works Monday 09:00-18:30: 19 half-hour slots, none stored
+    assert storage.count_free("Dr Adil Tajmouati", MONDAY) == 19
+    assert format_time(storage.free_starts("Dr Adil Tajmouati", MONDAY)[-1]) == "18:00"
+    assert storage.doctor_day("Dr Adil Tajmouati", MONDAY + 1) == []    # not working on Tuesday
+
+    # rows of doctor_availability.csv replace the generated slot at the same start
+    day = storage.doctor_day("Dr.Mohamed Tajmouati", THURSDAY)
+    assert [format_time(slot.start) for slot in day][:3] == ["08:00", "08:30", "09:00"]
+    assert not storage.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 10:00")).is_available
+    assert format_time(day[-1].start) == "18:00"
+
+    specialists = storage.specialization_day("Orthodontie", MONDAY)
+    assert {slot.doctor_name for slot in specialists} == {"Dr.Adil Tajmouati"}   # name used in the calendar
+
+
+def test_only_exceptions_are_stored(data_path):
+    rows_before = len(pd.read_csv(os.path.join(data_path, "doctor_availability.csv")))
+    storage = CSVStorage(data_path, schedule_slots=True)
+
+    assert storage.book_slot("Dr Adil Tajmouati", parse_slot("08-12-2025 10:00"), 77)[0] == BOOKED
+    storage.compact()
+
+    df = pd.read_csv(os.path.join(data_path, "doctor_availability.csv"))
+    assert len(df) == rows_before + 1
+    assert df.iloc[-1]["date_availability"] == "08-12-2025 10:00"
+
+    storage.journal.close()
+    restarted = CSVStorage(data_path, schedule_slots=True)
+    assert restarted.get_slot("Dr Adil Tajmouati", parse_slot("08-12-2025 10:00")).id_patient == 77
+    assert restarted.count_free("Dr Adil Tajmouati", MONDAY) == 18
+
+
+def test_next_free_over_generated_days(data_path):
+    storage = CSVStorage(data_path, schedule_slots=True)
+
+    # Saturday 13:00 onwards: Dr Adil Tajmouati's next working slot is Monday 09:00
+    assert storage.next_free("Dr Adil Tajmouati", parse_slot("06-12-2025 13:00")) == parse_slot("08-12-2025 09:00")
+    assert storage.next_free("Dr Adil Tajmouati", parse_slot("06-12-2025 13:00"), parse_day("07-12-2025")) is None
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Tests for the SQLite session checkpointer of /execute."""
+
+import asyncio
+import operator
+import os
+import sqlite3
+import sys
+from typing import Annotated, Optional, TypedDict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from agents.agent import DoctorAppointmentAgent
+from agents.session_store import SQLiteSessionSaver
+
+
+class State(TypedDict):
+    message: str
+    pending_data: Optional[dict]
+    turns: Annotated[list, operator.add]
+
+
+def remember(state: State):
+    # a multi-step flow: the first turn asks for data, the next one completes it
+    pending = state.get("pending_data") or {}
+    return {"pending_data": pending | {state["message"]: len(pending)}, "turns": [state["message"]]}
+
+
+def build_graph(saver: SQLiteSessionSaver):
+    graph = StateGraph(State)
+    graph.add_node("remember", remember)
+    graph.add_edge(START, "remember")
+    graph.add_edge("remember", END)
+    return graph.compile(checkpointer=saver)
+
+
+def config(session_id: str) -> dict:
+    return {"configurable": {"thread_id": session_id}}
+
+
+def test_sessions_resume_and_survive_a_restart(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    graph = build_graph(SQLiteSessionSaver(db_path))
+    graph.invoke({"message": "doctor"}, config("a"))
+    graph.invoke({"message": "other"}, config("b"))
+    graph.invoke({"message": "date"}, config("a"))
+
+    # a new saver on the same file (an API restart) continues each conversation
+    graph = build_graph(SQLiteSessionSaver(db_path))
+    state = graph.invoke({"message": "confirm"}, config("a"))
+    assert state["pending_data"] == {"doctor": 0, "date": 1, "confirm": 2}
+    assert state["turns"] == ["doctor", "date", "confirm"]
+    assert graph.get_state(config("b")).values["turns"] == ["other"]
+
+    # only the latest checkpoint of a session is kept
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 2
+
+
+def test_idle_sessions_expire(tmp_path):
+    saver = SQLiteSessionSaver(str(tmp_path / "sessions.db"), ttl=60)
+    graph = build_graph(saver)
+    graph.invoke({"message": "doctor"}, config("a"))
+    updated_at = saver.connection().execute("SELECT updated_at FROM sessions").fetchone()[0]
+
+    assert saver.evict_idle(updated_at + 30) == 0
+    assert saver.evict_idle(updated_at + 61) == 1
+    state = graph.invoke({"message": "date"}, config("a"))
+    assert state["pending_data"] == {"date": 0}          # a new conversation
+
+
+def test_large_states_are_compressed_and_usable_async(tmp_path):
+    saver = SQLiteSessionSaver(str(tmp_path / "sessions.db"))
+    graph = build_graph(saver)
+    message = "book with Dr Adil tomorrow at 10:00 " * 100
+
+    async def turns():
+        await graph.ainvoke({"message": message}, config("a"))
+        return await graph.ainvoke({"message": "confirm"}, config("a"))
+
+    state = asyncio.run(turns())
+    assert state["turns"] == [message, "confirm"]
+    checkpoint_type, size = saver.connection().execute(
+        "SELECT checkpoint_type, LENGTH(checkpoint) FROM sessions"
+    ).fetchone()
+    assert checkpoint_type.endswith("+zlib") and size < len(message)
+
+
+class RecordingModel(GenericFakeChatModel):
+    """Fake chat model accepting tools, recording the conversation each worker call is given."""
+    seen: list = []
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.seen.append([message.content for message in messages])
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def test_agent_turns_of_a_session_share_the_conversation(tmp_path):
+    # skip LLMModel(): no API key or network needed
+    agent = DoctorAppointmentAgent.__new__(DoctorAppointmentAgent)
+    agent.llm_model = RecordingModel(messages=iter([
+        AIMessage(content="Dr Adil is free at 10:00."),
+        AIMessage(content="Dr Adil is also free at 11:00."),
+    ]))
+    agent._sub_agents = {}
+    graph = agent.workflow(checkpointer=SQLiteSessionSaver(str(tmp_path / "sessions.db")))
+
+    def turn(message: str) -> dict:
+        return graph.invoke(
+            {
+                "messages": [HumanMessage(content=message)],
+                "id_number": 1000082, "next": "", "query": "", "current_reasoning": "", "handoffs": 0,
+            },
+            {"recursion_limit": 40, "configurable": {"thread_id": "a"}},
+        )
+
+    turn("is Dr Adil available tomorrow?")
+    state = turn("is he available later in the day?")
+
+    assert [message.content for message in state["messages"]] == [
+        "is Dr Adil available tomorrow?", "Dr Adil is free at 10:00.",
+        "is he available later in the day?", "Dr Adil is also free at 11:00.",
+    ]
+    # the worker of the second turn was given the first one
+    assert "Dr Adil is free at 10:00." in agent.llm_model.seen[-1]
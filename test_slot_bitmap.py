@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Tests for the doctor-day bitmap availability engine."""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from toolkit.availability_store import AvailabilityStore
+from toolkit.slot_bitmap import SLOTS_PER_DAY, SlotBitmaps
+from toolkit.timeslots import MINUTES_PER_DAY, format_time, parse_day, parse_slot
+
+
+DOCTOR = "Dr.Mohamed Tajmouati"
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def write_csv(tmp_path, rows):
+    csv_path = tmp_path / "doctor_availability.csv"
+    csv_path.write_text(
+        "date_availability,specialization,doctor_name,is_available,id_patient\n" + "".join(
+            f"{date},Orthodontie,{DOCTOR},{available},\n" for date, available in rows
+        ),
+        encoding="utf-8",
+    )
+    return str(csv_path)
+
+
+def test_bitmap_matches_rows_on_demo_data(tmp_path):
+    csv_path = tmp_path / "doctor_availability.csv"
+    csv_path.write_bytes(open(os.path.join(DATA_PATH, "doctor_availability.csv"), "rb").read())
+    store = AvailabilityStore(str(csv_path), write_through=False)
+
+    rng = random.Random(7)
+    slots = list(store._slots)
+    for _ in range(200):
+        slot = rng.choice(slots)
+        store.mark(slot.doctor_name, slot.start, rng.random() < 0.5, None)
+
+    for slot in slots:
+        rows = store.doctor_day(slot.doctor_name, slot.day)
+        assert store.free_starts(slot.doctor_name, slot.day) == [row.start for row in rows if row.is_available]
+        assert store.count_booked(slot.doctor_name, slot.day) == sum(not row.is_available for row in rows)
+        assert store.count_free(slot.doctor_name, slot.day) == sum(row.is_available for row in rows)
+
+
+def test_next_free(tmp_path):
+    store = AvailabilityStore(write_csv(tmp_path, [
+        ("04-12-2025 08:00", "False"),
+        ("04-12-2025 08:30", "True"),
+        ("06-12-2025 09:00", "True"),
+    ]), write_through=False)
+
+    assert store.next_free(DOCTOR, parse_slot("04-12-2025 07:00")) == parse_slot("04-12-2025 08:30")
+    assert store.next_free(DOCTOR, parse_slot("04-12-2025 08:15")) == parse_slot("04-12-2025 08:30")
+    assert store.next_free(DOCTOR, parse_slot("04-12-2025 08:31")) == parse_slot("06-12-2025 09:00")
+    assert store.next_free(DOCTOR, parse_slot("04-12-2025 08:31"), last_day=parse_day("05-12-2025")) is None
+
+    store.mark(DOCTOR, parse_slot("04-12-2025 08:30"), False)
+    store.mark(DOCTOR, parse_slot("04-12-2025 08:00"), True)
+    assert store.next_free(DOCTOR, parse_slot("04-12-2025 07:00")) == parse_slot("04-12-2025 08:00")
+    assert store.next_free("Dr Unknown", 0) is None
+
+
+def test_off_grid_day_falls_back_to_rows(tmp_path):
+    store = AvailabilityStore(write_csv(tmp_path, [
+        ("04-12-2025 08:15", "True"),
+        ("04-12-2025 09:00", "True"),
+        ("05-12-2025 09:00", "True"),
+    ]), write_through=False)
+
+    day = parse_day("04-12-2025")
+    assert [format_time(start) for start in store.free_starts(DOCTOR, day)] == ["08:15", "09:00"]
+    assert store.next_free(DOCTOR, parse_slot("04-12-2025 08:00")) == parse_slot("04-12-2025 08:15")
+
+    store.mark(DOCTOR, parse_slot("04-12-2025 08:15"), False, 42)
+    assert store.count_booked(DOCTOR, day) == 1
+    assert store.next_free(DOCTOR, parse_slot("04-12-2025 08:00")) == parse_slot("04-12-2025 09:00")
+
+
+def test_a_year_of_fifty_doctors_fits_in_kilobytes():
+    bitmaps = SlotBitmaps()
+    first_day = parse_day("01-01-2026")
+    for doctor in range(50):
+        for day in range(first_day, first_day + 365):
+            for bit in range(16, SLOTS_PER_DAY - 12):
+                bitmaps.add(f"doctor {doctor}", day * MINUTES_PER_DAY + bit * 30, True)
+
+    assert bitmaps.nbytes() == 50 * 365 * 16
+    assert bitmaps.count_free("doctor 0", first_day) == SLOTS_PER_DAY - 28
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""Run the toolkit tools against both storage backends (CSV and SQLite)."""
+
+import asyncio
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import toolkit.toolkits as toolkits
+from toolkit.idempotency import IdempotencyCache, request_scope
+from toolkit.storage import CREATED, DUPLICATE_EMAIL, DUPLICATE_TELEPHONE, CSVStorage, set_storage
+from toolkit.sqlite_storage import import_csv
+from toolkit.timeslots import format_time, parse_day, parse_slot
+
+
+DATA_FILES = ["doctor_availability.csv", "rendez_vous.csv", "patients.csv", "doctors.csv"]
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def storage(request, tmp_path, monkeypatch):
+    """Copy of the demo data behind the requested backend, installed for the tools."""
+    yield from install_backend(request.param, tmp_path, monkeypatch)
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def shared_start_storage(request, tmp_path, monkeypatch):
+    """The demo data plus Dr Hanane Louizi slots at the starts of Dr Mohamed Tajmouati slots."""
+    yield from install_backend(request.param, tmp_path, monkeypatch, extra_slots=[
+        "04-12-2025 08:00,general_dentist,Dr.Hanane Louizi,True,",
+        "04-12-2025 09:00,general_dentist,Dr.Hanane Louizi,True,",
+    ])
+
+
+def install_backend(kind, tmp_path, monkeypatch, extra_slots=()):
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    for file_name in DATA_FILES:
+        shutil.copy(os.path.join(source, file_name), tmp_path / file_name)
+    with open(tmp_path / "doctor_availability.csv", "a", encoding="utf-8") as f:
+        f.writelines(f"\n{row}" for row in extra_slots)      # the demo file has no final newline
+
+    data_path = str(tmp_path) + os.sep
+    if kind == "csv":
+        backend = CSVStorage(data_path)
+    else:
+        backend = import_csv(data_path, str(tmp_path / "appointments.db"))
+
+    monkeypatch.setattr(toolkits, "DATA_PATH", data_path)
+    set_storage(data_path, backend)
+    yield backend
+    set_storage(data_path, None)
+
+
+def test_check_availability_by_doctor(storage):
+    result = toolkits.check_availability_by_doctor.func("04-12-2025", "Dr.Mohamed Tajmouati")
+    assert "- 08:00" in result
+    assert "- 10:00" not in result
+    assert "Booked slots: 2" in result
+
+    result = toolkits.check_availability_by_doctor.func("04-12-2025 10:00", "Dr.Mohamed Tajmouati")
+    assert "NOT available" in result
+
+
+def test_check_availability_by_specialization(storage):
+    result = toolkits.check_availability_by_specialization.func("05-12-2025", "general_dentist")
+    assert "Dr Dr.Hanane Louizi" in result
+    assert "Total available slots: 8" in result
+
+
+def test_book_then_cancel(storage):
+    booked = toolkits.set_appointment.func("04-12-2025 08:00", 7, "Dr.Mohamed Tajmouati")
+    assert "successfully" in booked
+    assert not storage.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 08:00")).is_available
+
+    again = toolkits.set_appointment.func("04-12-2025 08:00", 8, "Dr.Mohamed Tajmouati")
+    assert "already booked" in again
+
+    appointments = toolkits.get_patient_appointments.func(7)
+    assert "Dr Mohamed Tajmouati" in appointments
+    assert "08:00" in appointments
+
+    cancelled = toolkits.cancel_appointment.func("04-12-2025 08:00", 7, "Dr.Mohamed Tajmouati")
+    assert "successfully" in cancelled
+    assert storage.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 08:00")).is_available
+
+
+def test_cancel_needs_the_patients_booking_with_that_doctor(shared_start_storage):
+    storage = shared_start_storage
+    start = parse_slot("04-12-2025 08:00")
+    toolkits.set_appointment.func("04-12-2025 08:00", 1, "Dr.Mohamed Tajmouati")
+    toolkits.set_appointment.func("04-12-2025 08:00", 2, "Dr.Hanane Louizi")
+
+    # patient 1 has no appointment with Dr Hanane: her slot stays patient 2's
+    result = toolkits.cancel_appointment.func("04-12-2025 08:00", 1, "Dr.Hanane Louizi")
+    assert "No appointment found" in result
+    assert storage.get_slot("Dr.Hanane Louizi", start).id_patient == 2
+    assert storage.get_slot("Dr.Mohamed Tajmouati", start).id_patient == 1
+    assert "already booked" in toolkits.set_appointment.func("04-12-2025 08:00", 3, "Dr.Hanane Louizi")
+
+    assert "successfully" in toolkits.cancel_appointment.func("04-12-2025 08:00", 1, "Dr.Mohamed Tajmouati")
+    assert storage.get_slot("Dr.Mohamed Tajmouati", start).is_available
+    assert start in [a["start"] for a in storage.patient_appointments(2)]
+
+
+def test_impossible_dates_are_reported_by_the_tools(storage):
+    doctor = "Dr.Mohamed Tajmouati"
+    assert "No time slot found" in toolkits.check_availability_by_doctor.func("31-02-2025 10:00", doctor)
+    assert "No availability found" in toolkits.check_availability_by_doctor.func("31-02-2025", doctor)
+    assert "No doctors available" in toolkits.check_availability_by_specialization.func("31-02-2025", "general_dentist")
+    assert "No time slot found" in toolkits.set_appointment.func("31-02-2025 10:00", 7, doctor)
+    assert "No appointment found" in toolkits.cancel_appointment.func("31-02-2025 10:00", 7, doctor)
+    assert "no appointment was found" in toolkits.reschedule_appointment.func("31-02-2025 10:00", "04-12-2025 09:00", 7, doctor)
+    assert "not a valid date" in toolkits.find_next_available.func(doctor, "31-02-2025")
+
+
+def test_patient_tools(storage):
+    assert "exists: True" in toolkits.check_patient_id.func(1)
+    assert "exists: False" in toolkits.check_patient_id.func(999999)
+    assert "Ahmed Benali" in toolkits.get_patient.func(1)
+
+    created = toolkits.create_patient.func(
+        "Test Patient", "test.patient@email.com", "212611111111", "01-01-1990", "M", "1 Rue Test"
+    )
+    assert "Patient created successfully with ID: 12" in created
+    assert "Test Patient" in toolkits.get_patient.func(12)
+
+    updated = toolkits.update_patient.func(12, addresse="2 Rue Test")
+    assert "updated successfully" in updated
+    assert "2 Rue Test" in toolkits.get_patient.func(12)
+
+
+def test_update_patient_changes_only_the_given_fields(storage):
+    # patient 1 has a YYYY-MM-DD birth date: untouched fields are not re-validated
+    assert "updated successfully" in toolkits.update_patient.func(1, telephone="212600000001")
+    patient = storage.get_patient(1)
+    assert (patient["telephone"], patient["date_naissance"]) == ("212600000001", "1985-05-15")
+
+    assert "Validation error" in toolkits.update_patient.func(1, telephone="12")
+    assert "already used by patient ID: 2" in toolkits.update_patient.func(1, email="Fatima.Zohra@email.com")
+    assert "No patient found" in toolkits.update_patient.func(999999, nom="Nobody")
+    assert "Nothing to update" in toolkits.update_patient.func(1)
+
+    # the old number is free again, the new one is taken
+    assert storage.create_patient({"nom": "New", "email": "new@email.com", "telephone": "212612345678"})[0] == CREATED
+    assert storage.create_patient({"nom": "New", "email": "other@email.com", "telephone": "212600000001"}) \
+        == (DUPLICATE_TELEPHONE, 1)
+
+
+
+def test_create_patient_allocates_unique_ids_and_rejects_duplicates(storage):
+    def create(n):
+        return storage.create_patient({
+            "nom": f"Patient {n}", "email": f"patient{n}@email.com", "telephone": f"2126000000{n:02d}",
+            "date_naissance": "01-01-1990", "sexe": "F", "addresse": "1 Rue Test",
+        })
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(create, range(20)))
+    assert {status for status, _ in results} == {CREATED}
+    assert sorted(patient_id for _, patient_id in results) == list(range(12, 32))
+
+    assert storage.create_patient({"nom": "Copy", "email": " Ahmed.Benali@email.com", "telephone": "1"}) \
+        == (DUPLICATE_EMAIL, 1)
+    assert storage.create_patient({"nom": "Copy", "email": "new@email.com", "telephone": "212 612 345 678"}) \
+        == (DUPLICATE_TELEPHONE, 1)
+
+    duplicate = toolkits.create_patient.func(
+        "Copy", "ahmed.benali@email.com", "212600000099", "01-01-1990", "M", "1 Rue Test"
+    )
+    assert "already registered (ID: 1)" in duplicate
+
+
+def test_sqlite_uses_indexes(tmp_path):
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    for file_name in DATA_FILES:
+        shutil.copy(os.path.join(source, file_name), tmp_path / file_name)
+    backend = import_csv(str(tmp_path), str(tmp_path / "appointments.db"))
+
+    conn = backend.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = " ".join(
+        row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM availability WHERE doctor_key = ? AND start BETWEEN ? AND ?",
+            ("x", 0, 1439),
+        )
+    )
+    assert "idx_availability_doctor_start" in plan
+
+
+def test_reschedule_moves_appointment(storage):
+    toolkits.set_appointment.func("04-12-2025 08:00", 77, "Dr.Mohamed Tajmouati")
+
+    result = toolkits.reschedule_appointment.func("04-12-2025 08:00", "04-12-2025 09:00", 77, "Dr.Mohamed Tajmouati")
+    assert "successfully rescheduled" in result
+    assert storage.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 08:00")).is_available
+    assert storage.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 09:00")).id_patient == 77
+    assert [format_time(a["start"]) for a in storage.patient_appointments(77)] == ["09:00"]
+
+
+def test_reschedule_to_taken_slot_keeps_appointment(storage):
+    toolkits.set_appointment.func("04-12-2025 08:00", 77, "Dr.Mohamed Tajmouati")
+
+    # 10:00 is already booked in the demo data
+    result = toolkits.reschedule_appointment.func("04-12-2025 08:00", "04-12-2025 10:00", 77, "Dr.Mohamed Tajmouati")
+    assert "already booked" in result
+    assert storage.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 08:00")).id_patient == 77
+    assert storage.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 10:00")).id_patient == 1000024
+    assert [format_time(a["start"]) for a in storage.patient_appointments(77)] == ["08:00"]
+
+    result = toolkits.reschedule_appointment.func("04-12-2025 12:30", "04-12-2025 09:00", 77, "Dr.Mohamed Tajmouati")
+    assert "no appointment was found" in result
+
+
+def test_reschedule_needs_the_patients_booking_with_that_doctor(shared_start_storage):
+    storage = shared_start_storage
+    toolkits.set_appointment.func("04-12-2025 08:00", 1, "Dr.Mohamed Tajmouati")
+    toolkits.set_appointment.func("04-12-2025 08:00", 2, "Dr.Hanane Louizi")
+
+    # patient 1's 08:00 booking is with Dr Mohamed: Dr Hanane's slot is patient 2's
+    result = toolkits.reschedule_appointment.func("04-12-2025 08:00", "04-12-2025 09:00", 1, "Dr.Hanane Louizi")
+    assert "no appointment was found" in result
+    assert storage.get_slot("Dr.Hanane Louizi", parse_slot("04-12-2025 08:00")).id_patient == 2
+    assert storage.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 08:00")).id_patient == 1
+    assert storage.get_slot("Dr.Hanane Louizi", parse_slot("04-12-2025 09:00")).is_available
+    assert [format_time(a["start"]) for a in storage.patient_appointments(1)
+            if a["start"] >= parse_slot("04-12-2025 00:00")] == ["08:00"]
+
+
+def test_appointments_without_a_slot_can_be_cancelled_and_moved(storage):
+    # the demo appointments of January 2024 predate the availability file
+    result = toolkits.cancel_appointment.func("16-01-2024 10:30", 3, "Dr.Mohamed Tajmouati")
+    assert "successfully cancelled" in result
+    assert storage.patient_appointments(3) == []
+
+    result = toolkits.reschedule_appointment.func("22-01-2024 14:30", "04-12-2025 09:00", 9, "Dr.Mohamed Tajmouati")
+    assert "successfully rescheduled" in result
+    assert storage.get_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 09:00")).id_patient == 9
+    assert [format_time(a["start"]) for a in storage.patient_appointments(9)] == ["09:00"]
+
+    # another patient's appointment is still not theirs
+    result = toolkits.cancel_appointment.func("17-01-2024 11:00", 3, "Dr.Adil Tajmouati")
+    assert "No appointment found" in result
+
+
+def test_free_slot_queries(storage):
+    day = parse_day("04-12-2025")
+    assert storage.count_booked("Dr.Mohamed Tajmouati", day) == 2
+    assert storage.next_free("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 10:00")) == parse_slot("04-12-2025 10:30")
+
+    storage.book_slot("Dr.Mohamed Tajmouati", parse_slot("04-12-2025 10:30"), 77)
+    assert storage.count_booked("Dr.Mohamed Tajmouati", day) == 3
+    assert parse_slot("04-12-2025 10:30") not in storage.free_starts("Dr.Mohamed Tajmouati", day)
+
+
+def test_patient_appointments_join_doctor_names(storage):
+    assert storage.doctor_names()[2] == "Dr Adil Tajmouati"
+    for start in ("04-12-2025 08:00", "04-12-2025 08:30", "04-12-2025 09:00"):
+        toolkits.set_appointment.func(start, 7, "Dr.Mohamed Tajmouati")
+
+    result = toolkits.get_patient_appointments.func(7)
+    assert result.count("Doctor: Dr Mohamed Tajmouati") == 3
+    assert "Doctor: Dr Adil Tajmouati" in result
+    assert "Date: 04-12-2025" in result
+
+
+def test_find_next_available(storage):
+    result = toolkits.find_next_available.func("Dr Mohamed Tajmouati", "04-12-2025 09:45", 2, 1)
+    assert result.splitlines()[1:] == [
+        "- 04-12-2025 10:30 with Dr Dr.Mohamed Tajmouati",
+        "- 04-12-2025 11:00 with Dr Dr.Mohamed Tajmouati",
+    ]
+
+    # merged across the doctors of a specialization, in time order
+    starts = storage.next_free_slots(storage.resolve_doctors("Orthodontie"), parse_slot("04-12-2025 00:00"), 50)
+    assert [start for start, _ in starts] == sorted(start for start, _ in starts)
+    assert len(starts) == sum(
+        storage.count_free(name, parse_day("04-12-2025")) + storage.count_free(name, parse_day("05-12-2025"))
+        for name in storage.resolve_doctors("Orthodontie")
+    )
+
+    assert "No available slots" in toolkits.find_next_available.func("general_dentist", "06-12-2025", 5, 30)
+    assert "No doctor or specialization" in toolkits.find_next_available.func("cardiology", "04-12-2025")
+
+
+def test_tools_run_as_coroutines(storage):
+    async def book_concurrently():
+        return await asyncio.gather(*(
+            toolkits.set_appointment.ainvoke({
+                "desired_date": "04-12-2025 08:00", "id_number": patient, "doctor_name": "Dr.Mohamed Tajmouati",
+            })
+            for patient in (1000082, 1000083, 1000084, 1000085)
+        ))
+
+    results = asyncio.run(book_concurrently())
+    assert sum("successfully" in result for result in results) == 1
+
+    result = asyncio.run(toolkits.check_availability_by_doctor.ainvoke({
+        "desired_date": "04-12-2025", "doctor_name": "Dr.Mohamed Tajmouati",
+    }))
+    assert "- 08:00" not in result
+
+
+def test_search_patients(storage):
+    assert "ID 1: Ahmed Benali" in toolkits.search_patients.func("benali")
+    assert storage.search_patients("2126123", k=1)[0]["ID"] == 1
+    assert storage.search_patients("sara.b")[0]["ID"] == 10
+    assert storage.search_patients("Fassi Rachid")[0]["ID"] == 9      # words in another order
+    assert "No patient found" in toolkits.search_patients.func("zzzz")
+
+    # the index follows creations and updates
+    storage.create_patient({"nom": "Nadia Lahlou", "email": "nadia@email.com", "telephone": "212655000111"})
+    assert [patient["nom"] for patient in storage.search_patients("lahlou")] == ["Nadia Lahlou"]
+    storage.update_patient(12, {"nom": "Nadia Tazi"})
+    assert storage.search_patients("lahlou") == []
+    assert storage.search_patients("tazi", k=1)[0]["ID"] == 12
+
+
+def test_bulk_booking(storage):
+    doctor = "Dr.Mohamed Tajmouati"
+    results = toolkits.book_appointments([
+        {"desired_date": "04-12-2025 08:00", "id_number": 21, "doctor_name": doctor},
+        {"desired_date": "04-12-2025 08:00", "id_number": 22, "doctor_name": doctor},     # same slot
+        {"desired_date": "04-12-2025 10:00", "id_number": 23, "doctor_name": doctor},     # booked already
+        {"desired_date": "04-12-2025 08:15", "id_number": 24, "doctor_name": doctor},     # no such slot
+        {"desired_date": "04/12/2025", "id_number": 25, "doctor_name": doctor},
+        {"desired_date": "31-02-2025 08:00", "id_number": 25, "doctor_name": doctor},     # no such day
+        {"desired_date": "04-12-2025 08:30", "id_number": -5, "doctor_name": doctor},
+    ])
+    assert [result["status"] for result in results] == [
+        "booked", "already_booked", "already_booked", "no_slot", "invalid", "invalid", "invalid",
+    ]
+    assert storage.get_slot(doctor, parse_slot("04-12-2025 08:00")).id_patient == 21
+    assert len(storage.patient_appointments(21)) == 1
+    assert storage.get_slot(doctor, parse_slot("04-12-2025 08:30")).is_available
+
+    # all-or-nothing: one taken slot and nothing is written
+    results = toolkits.book_appointments([
+        {"desired_date": "04-12-2025 08:30", "id_number": 26, "doctor_name": doctor},
+        {"desired_date": "04-12-2025 08:00", "id_number": 26, "doctor_name": doctor},
+    ], all_or_nothing=True)
+    assert [result["status"] for result in results] == ["not_booked", "already_booked"]
+    assert storage.get_slot(doctor, parse_slot("04-12-2025 08:30")).is_available
+    assert storage.patient_appointments(26) == []
+
+    text = toolkits.set_appointments_bulk.func([
+        {"desired_date": "04-12-2025 08:30", "id_number": 26, "doctor_name": doctor},
+        {"desired_date": "04-12-2025 09:00", "id_number": 26, "doctor_name": doctor},
+    ], all_or_nothing=True)
+    assert "Booked 2 of 2 appointments" in text
+
+
+def test_bulk_moves(storage):
+    doctor = "Dr.Mohamed Tajmouati"
+    toolkits.set_appointment.func("04-12-2025 08:00", 31, doctor)
+    toolkits.set_appointment.func("04-12-2025 08:30", 32, doctor)
+
+    results = toolkits.book_appointments([
+        {"desired_date": "04-12-2025 09:00", "id_number": 33, "doctor_name": doctor},
+        {"desired_date": "04-12-2025 09:30", "old_date": "04-12-2025 08:00", "id_number": 31, "doctor_name": doctor},
+        {"desired_date": "04-12-2025 11:00", "old_date": "04-12-2025 12:00", "id_number": 32, "doctor_name": doctor},
+        {"desired_date": "04-12-2025 11:00", "old_date": "31-02-2025 08:30", "id_number": 32, "doctor_name": doctor},
+    ])
+    assert [result["status"] for result in results] == ["booked", "rescheduled", "no_appointment", "invalid"]
+    assert storage.get_slot(doctor, parse_slot("04-12-2025 08:00")).is_available
+    assert [format_time(a["start"]) for a in storage.patient_appointments(31)] == ["09:30"]
+
+    # all-or-nothing: a taken slot among the bookings and the moves do not run
+    results = toolkits.book_appointments([
+        {"desired_date": "04-12-2025 09:00", "id_number": 34, "doctor_name": doctor},
+        {"desired_date": "04-12-2025 11:00", "old_date": "04-12-2025 08:30", "id_number": 32, "doctor_name": doctor},
+    ], all_or_nothing=True)
+    assert [result["status"] for result in results] == ["already_booked", "not_booked"]
+    assert storage.get_slot(doctor, parse_slot("04-12-2025 08:30")).id_patient == 32
+
+    text = toolkits.set_appointments_bulk.func([
+        {"desired_date": "04-12-2025 11:00", "old_date": "04-12-2025 08:30", "id_number": 32, "doctor_name": doctor},
+    ])
+    assert "Booked 0 and moved 1 of 1 appointments" in text
+    assert "04-12-2025 11:00 (from 04-12-2025 08:30)" in text
+
+
+def test_idempotent_retries_do_not_write_twice(storage, monkeypatch):
+    monkeypatch.setattr(toolkits, "operations", IdempotencyCache())
+    doctor = "Dr.Mohamed Tajmouati"
+
+    # the tool calls of an /execute request with a key derive their keys from it
+    with request_scope("request-1"):
+        first = toolkits.set_appointment.func("04-12-2025 08:00", 21, doctor)
+        assert "successfully" in first
+        # the retry gets the first answer, not "already booked", and books nothing
+        assert toolkits.set_appointment.func("04-12-2025 08:00", 21, doctor) == first
+        assert len(storage.patient_appointments(21)) == 1
+
+        patient = ("Nadia Lahlou", "nadia@email.com", "212655000111", "01-01-1990", "F", "1 Rue Test")
+        created = toolkits.create_patient.func(*patient)
+        assert toolkits.create_patient.func(*patient) == created
+        assert len(storage.all_patients()) == 12
+
+        cancelled = toolkits.cancel_appointment.func("04-12-2025 08:00", 21, doctor)
+        assert toolkits.cancel_appointment.func("04-12-2025 08:00", 21, doctor) == cancelled
+        assert "successfully" in cancelled
+
+    # outside a keyed request nothing is cached
+    assert "successfully" in toolkits.set_appointment.func("04-12-2025 08:30", 22, doctor)
+    assert "already booked" in toolkits.set_appointment.func("04-12-2025 08:30", 22, doctor)
@@ -0,0 +1,137 @@
+"""
+In-memory copy of rendez_vous.csv used by the CSV backend.
+
+Appointments are keyed by integer epoch-minutes (toolkit/timeslots.py);
+the file keeps its "date rendez vous" (YYYY-MM-DD) and
+"heure rendez-vous" (HH:MM) columns. Rows keep their position in the
+file as appointment id, and a per-patient index gives the appointments
+of one patient without scanning the book.
+"""
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from toolkit.availability_store import parse_patient_id
+from toolkit.csv_loader import SOURCE_LINES, load_csv, source_lines, write_csv
+from toolkit.timeslots import MINUTES_PER_DAY, day_of, format_day, format_time, parse_day_column, parse_time_column
+
+
+APPOINTMENTS_FILE = "rendez_vous.csv"
+COLUMNS = ["patient_id", "medecin_id", "date rendez vous", "heure rendez-vous", "service"]
+FIELDS = ["patient_id", "medecin_id", "start", "service"]
+
+
+class AppointmentBook:
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self._lock = threading.RLock()
+        self._rows: dict[int, dict] = {}              # appointment id -> row (file order)
+        self._by_patient: dict[int, list[int]] = {}
+        self._next_id = 0
+        self._source: dict[int, tuple[dict, str]] = {}   # appointment id -> row as read, with its text in the file
+        self._load()
+
+    def _load(self):
+        df = load_csv(self.csv_path)
+        starts = (
+            parse_day_column(df["date rendez vous"]) * MINUTES_PER_DAY
+            + parse_time_column(df["heure rendez-vous"])
+        ) if len(df) else np.array([], dtype=np.int64)
+
+        with self._lock:
+            self._rows = {}
+            self._by_patient = {}
+            for idx, (patient_id, medecin_id, start, service) in enumerate(
+                zip(df["patient_id"], df["medecin_id"], starts, df["service"])
+            ):
+                self._insert(idx, {
+                    "patient_id": int(patient_id),
+                    "medecin_id": parse_patient_id(medecin_id),
+                    "start": int(start),
+                    "service": service,
+                })
+            self._next_id = len(df)
+            lines = source_lines(self.csv_path, len(df)) or []
+            self._source = {
+                appointment_id: (self._rows[appointment_id], line) for appointment_id, line in enumerate(lines)
+            }
+
+    def _insert(self, appointment_id: int, row: dict):
+        self._rows[appointment_id] = row
+        self._by_patient.setdefault(row["patient_id"], []).append(appointment_id)
+
+    # ----------------------------------------------------------
+    # READS
+    # ----------------------------------------------------------
+    def for_patient(self, patient_id: int) -> list[dict]:
+        return [
+            {"appointment_id": appointment_id, **self._rows[appointment_id]}
+            for appointment_id in self._by_patient.get(patient_id, [])
+        ]
+
+    def find(self, patient_id: int, start: int, medecin_id: Optional[int] = None) -> list[int]:
+        """Ids of the patient's appointments starting at `start` that have a doctor (this one if given)."""
+        return [
+            appointment_id
+            for appointment_id in self._by_patient.get(patient_id, [])
+            if self._rows[appointment_id]["start"] == start
+            and self._rows[appointment_id]["medecin_id"] is not None
+            and medecin_id in (None, self._rows[appointment_id]["medecin_id"])
+        ]
+
+    # ----------------------------------------------------------
+    # WRITES (idempotent, see toolkit/journal.py)
+    # ----------------------------------------------------------
+    def ensure(self, row: dict) -> Optional[int]:
+        """Add the appointment unless an identical one is already in the book."""
+        row = {field: row[field] for field in FIELDS}
+        with self._lock:
+            for appointment_id in self._by_patient.get(row["patient_id"], []):
+                if self._rows[appointment_id] == row:
+                    return None
+            appointment_id = self._next_id
+            self._next_id += 1
+            self._insert(appointment_id, row)
+            return appointment_id
+
+    def remove(self, patient_id: int, start: int, medecin_id: Optional[int] = None) -> int:
+        """Remove the patient's appointments at `start` (with this doctor if given); returns how many were removed."""
+        with self._lock:
+            ids = self.find(patient_id, start, medecin_id)
+            for appointment_id in ids:
+                del self._rows[appointment_id]
+                self._by_patient[patient_id].remove(appointment_id)
+            return len(ids)
+
+    # ----------------------------------------------------------
+    # PERSISTENCE
+    # ----------------------------------------------------------
+    def to_frame(self) -> pd.DataFrame:
+        with self._lock:
+            df = pd.DataFrame(
+                [
+                    (
+                        row["patient_id"],
+                        "" if row["medecin_id"] is None else row["medecin_id"],
+                        format_day(day_of(row["start"]), iso=True),
+                        format_time(row["start"]),
+                        row["service"],
+                    )
+                    for row in self._rows.values()
+                ],
+                columns=COLUMNS,
+            )
+            # rows are never modified in place: an appointment read from the file is written back as it was
+            df.attrs[SOURCE_LINES] = [
+                self._source[appointment_id][1]
+                if appointment_id in self._source and self._source[appointment_id][0] is row else None
+                for appointment_id, row in self._rows.items()
+            ]
+            return df
+
+    def save(self, df: Optional[pd.DataFrame] = None):
+        """Write the snapshot file (atomic replace)."""
+        write_csv(self.to_frame() if df is None else df, self.csv_path)
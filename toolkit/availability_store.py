@@ -0,0 +1,484 @@
+"""
+Indexed in-memory view of doctor_availability.csv.
+
+The CSV is parsed once per process (the store is owned by the
+process-wide CSV storage, see toolkit/storage.py). Slots are keyed by
+integer epoch-minutes (toolkit/timeslots.py) and indexed by
+(normalized doctor, day number) and (normalized specialization, day
+number), so that a lookup only touches the slots of that day, whatever
+the size of the calendar. Free/booked counts and "next free slot" are
+answered by a bitmap per doctor-day (toolkit/slot_bitmap.py) kept in
+sync with the slots. Doctors with a working-hours schedule
+(toolkit/schedules.py) get the slots of a day generated the first time
+that day is looked at; only slots that differ from the schedule are
+written back. By default every mutation is written through
+to the CSV file; the CSV storage backend turns that off and journals
+mutations instead (see toolkit/journal.py).
+
+The indexes are published as immutable snapshots (AvailabilitySnapshot).
+Readers take the current snapshot without locking; the single writer
+(holding the store lock) builds the next version by copying only what a
+write touches (the doctor's days, the specialization's days and the
+doctor's bitmap, sharing everything else) and swaps it in with one
+reference assignment. A read never waits for a booking and never sees a
+half-applied one. Slot objects are never modified once published: a
+write replaces them.
+"""
+import bisect
+import re
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from toolkit.csv_loader import SOURCE_LINES, TRUE_VALUES, load_csv, source_lines, write_csv
+from toolkit.schedules import DoctorSchedule
+from toolkit.slot_bitmap import SlotBitmaps
+from toolkit.timeslots import MINUTES_PER_DAY, day_of, format_day, format_slot, format_time, parse_slot_column
+
+
+AVAILABILITY_FILE = "doctor_availability.csv"
+COLUMNS = ["date_availability", "specialization", "doctor_name", "is_available", "id_patient"]
+
+# open-ended "next free slot" searches over generated slots stop after this many days
+SCHEDULE_HORIZON_DAYS = 365
+# days of a schedule generated (and published) together by a "next free slot" search
+MATERIALIZE_BATCH_DAYS = 7
+
+
+
+def normalize_doctor(name: str) -> str:
+    """
+    Normalize a doctor name for lookups:
+    'Dr.Mohamed Tajmouati', 'dr mohamed  tajmouati' -> 'mohamed tajmouati'
+    """
+    name = str(name).strip().lower()
+    name = re.sub(r"^dr\.?\s*", "", name)
+    return " ".join(name.split())
+
+
+def normalize_specialization(specialization: str) -> str:
+    return " ".join(str(specialization).strip().lower().split())
+
+
+def parse_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    if pd.isna(value):
+        return False
+    return bool(value)
+
+
+def parse_patient_id(value) -> Optional[int]:
+    if value is None or pd.isna(value) or value == "":
+        return None
+    return int(float(value))
+
+
+@dataclass
+class Slot:
+    start: int               # epoch-minutes, see toolkit/timeslots.py
+    specialization: str
+    doctor_name: str
+    is_available: bool
+    id_patient: Optional[int] = None
+    generated: bool = False  # from a schedule, not in the CSV until it changes
+    row: Optional[int] = field(default=None, compare=False, repr=False)     # position in the CSV rows
+
+    @property
+    def day(self) -> int:
+        return day_of(self.start)
+
+    # rendering helpers for the tool boundary
+    @property
+    def date_availability(self) -> str:
+        return format_slot(self.start)
+
+    @property
+    def day_label(self) -> str:
+        return format_day(self.day)
+
+    @property
+    def time(self) -> str:
+        return format_time(self.start)
+
+
+class AvailabilitySnapshot:
+    """
+    One version of the calendar indexes, keyed by normalized names. Never
+    modified once published: reading several things from the same snapshot
+    gives a consistent answer even while bookings go on.
+    """
+
+    __slots__ = ("by_doctor", "by_specialization", "bitmaps", "doctor_names",
+                 "specialization_doctors", "materialized")
+
+    def __init__(self, by_doctor: dict[str, dict[int, tuple[Slot, ...]]],
+                 by_specialization: dict[str, dict[int, tuple[Slot, ...]]],
+                 bitmaps: SlotBitmaps, doctor_names: dict[str, str],
+                 specialization_doctors: dict[str, dict[str, str]],
+                 materialized: dict[str, frozenset[int]]):
+        self.by_doctor = by_doctor                              # doctor key -> day -> slots sorted by start
+        self.by_specialization = by_specialization              # specialization key -> day -> slots
+        self.bitmaps = bitmaps
+        self.doctor_names = doctor_names                        # doctor key -> name in the CSV
+        self.specialization_doctors = specialization_doctors
+        self.materialized = materialized                        # doctor key -> generated days
+
+    def doctor_day(self, doctor_key: str, day: int) -> tuple[Slot, ...]:
+        return self.by_doctor.get(doctor_key, {}).get(day, ())
+
+    def specialization_day(self, specialization_key: str, day: int) -> tuple[Slot, ...]:
+        return self.by_specialization.get(specialization_key, {}).get(day, ())
+
+    def matching(self, doctor_key: str, start: int) -> list[Slot]:
+        """Slots of the doctor starting at `start` (binary search in the sorted day)."""
+        day_slots = self.doctor_day(doctor_key, day_of(start))
+        i = bisect.bisect_left(day_slots, start, key=lambda slot: slot.start)
+        matching = []
+        while i < len(day_slots) and day_slots[i].start == start:
+            matching.append(day_slots[i])
+            i += 1
+        return matching
+
+    # bitmap queries; days the bitmap cannot describe exactly read the rows
+    def free_starts(self, doctor_key: str, day: int) -> list[int]:
+        if self.bitmaps.is_exact(doctor_key, day):
+            return self.bitmaps.free_starts(doctor_key, day)
+        return [slot.start for slot in self.doctor_day(doctor_key, day) if slot.is_available]
+
+    def count_free(self, doctor_key: str, day: int) -> int:
+        if self.bitmaps.is_exact(doctor_key, day):
+            return self.bitmaps.count_free(doctor_key, day)
+        return sum(slot.is_available for slot in self.doctor_day(doctor_key, day))
+
+    def count_booked(self, doctor_key: str, day: int) -> int:
+        if self.bitmaps.is_exact(doctor_key, day):
+            return self.bitmaps.count_booked(doctor_key, day)
+        return sum(not slot.is_available for slot in self.doctor_day(doctor_key, day))
+
+    def next_free(self, doctor_key: str, start: int, last_day: Optional[int] = None) -> Optional[int]:
+        found = self.bitmaps.next_free(doctor_key, start, last_day)
+        for day in self.bitmaps.inexact_days(doctor_key):
+            if day < day_of(start) or (found is not None and day > day_of(found)) \
+                    or (last_day is not None and day > last_day):
+                continue
+            starts = [
+                slot.start for slot in self.doctor_day(doctor_key, day)
+                if slot.is_available and slot.start >= start
+            ]
+            if starts and (found is None or starts[0] < found):
+                found = starts[0]
+        return found
+
+
+class AvailabilityStore:
+    """
+    In-memory availability calendar loaded once from doctor_availability.csv.
+    Reads are served from the current snapshot, writes publish a new one
+    and, with write_through, are persisted to the CSV file before returning.
+
+    With `schedules`, the rows of the CSV are the exceptions: the slots of
+    a scheduled doctor-day are generated on first access, and a CSV row at
+    the same start replaces the generated slot.
+    """
+
+    def __init__(self, csv_path: str, write_through: bool = True,
+                 schedules: Optional[list[DoctorSchedule]] = None):
+        self.csv_path = csv_path
+        self.write_through = write_through
+        self._lock = threading.RLock()                          # the single writer
+        self._schedules = {normalize_doctor(schedule.doctor_name): schedule for schedule in schedules or []}
+        self._scheduled_by_specialization: dict[str, list[str]] = {}
+        for doctor_key, schedule in self._schedules.items():
+            self._scheduled_by_specialization.setdefault(
+                normalize_specialization(schedule.specialization), []
+            ).append(doctor_key)
+        self._slots: list[Slot] = []                            # file order, used for persistence (writer only)
+        self._source: list[tuple[Slot, str]] = []               # slots as read, with their text in the file
+        self._snapshot: AvailabilitySnapshot
+        self._load()
+
+    # ----------------------------------------------------------
+    # LOADING / PERSISTENCE
+    # ----------------------------------------------------------
+    def _load(self):
+        df = load_csv(self.csv_path)
+        starts = parse_slot_column(df["date_availability"])
+
+        slots = [
+            Slot(
+                start=int(start),
+                specialization=specialization,
+                doctor_name=doctor_name,
+                is_available=bool(is_available),
+                id_patient=parse_patient_id(id_patient),
+                row=row,
+            )
+            for row, (start, specialization, doctor_name, is_available, id_patient) in enumerate(zip(
+                starts, df["specialization"], df["doctor_name"], df["is_available"], df["id_patient"]
+            ))
+        ]
+
+        by_doctor: dict[str, dict[int, list[Slot]]] = {}
+        by_specialization: dict[str, dict[int, list[Slot]]] = {}
+        bitmaps = SlotBitmaps()
+        doctor_names: dict[str, str] = {}
+        specialization_doctors: dict[str, dict[str, str]] = {}
+        for slot in slots:
+            doctor_key = normalize_doctor(slot.doctor_name)
+            specialization_key = normalize_specialization(slot.specialization)
+            by_doctor.setdefault(doctor_key, {}).setdefault(slot.day, []).append(slot)
+            by_specialization.setdefault(specialization_key, {}).setdefault(slot.day, []).append(slot)
+            bitmaps.add(doctor_key, slot.start, slot.is_available)
+            doctor_names.setdefault(doctor_key, slot.doctor_name)
+            specialization_doctors.setdefault(specialization_key, {}).setdefault(doctor_key, slot.doctor_name)
+        for doctor_key, schedule in self._schedules.items():
+            doctor_names.setdefault(doctor_key, schedule.doctor_name)
+            specialization_doctors.setdefault(
+                normalize_specialization(schedule.specialization), {}
+            ).setdefault(doctor_key, doctor_names[doctor_key])
+
+        snapshot = AvailabilitySnapshot(
+            by_doctor={
+                doctor_key: {day: tuple(sorted(day_slots, key=lambda slot: slot.start))
+                             for day, day_slots in days.items()}
+                for doctor_key, days in by_doctor.items()
+            },
+            by_specialization={
+                specialization_key: {day: tuple(day_slots) for day, day_slots in days.items()}
+                for specialization_key, days in by_specialization.items()
+            },
+            bitmaps=bitmaps,
+            doctor_names=doctor_names,
+            specialization_doctors=specialization_doctors,
+            materialized={},
+        )
+        lines = source_lines(self.csv_path, len(slots)) or []
+        with self._lock:
+            self._slots = slots
+            self._source = list(zip(slots, lines))
+            self._snapshot = snapshot
+
+    def _publish(self, snapshot: AvailabilitySnapshot, doctor_key: str,
+                 doctor_days: dict[int, tuple[Slot, ...]], bitmaps: SlotBitmaps,
+                 replaced: Optional[dict[int, Slot]] = None, added: Iterable[Slot] = (),
+                 materialized: Optional[frozenset[int]] = None):
+        """
+        Swap in the version following `snapshot` in which the doctor has
+        `doctor_days` and `bitmaps`, the slots of `replaced` (old slot id ->
+        new slot) are replaced and `added` slots were generated. Called by
+        the writer, with the lock held.
+        """
+        replaced = replaced or {}
+        added = list(added)
+
+        by_doctor = dict(snapshot.by_doctor)
+        by_doctor[doctor_key] = doctor_days
+
+        by_specialization = snapshot.by_specialization
+        touched: dict[str, set[int]] = {}
+        for slot in [*replaced.values(), *added]:
+            touched.setdefault(normalize_specialization(slot.specialization), set()).add(slot.day)
+        if touched:
+            by_specialization = dict(by_specialization)
+            for specialization_key, days in touched.items():
+                specialization_days = dict(by_specialization.get(specialization_key, {}))
+                for day in days:
+                    day_slots = tuple(
+                        replaced.get(id(slot), slot) for slot in specialization_days.get(day, ())
+                    )
+                    day_slots += tuple(
+                        slot for slot in added
+                        if slot.day == day and normalize_specialization(slot.specialization) == specialization_key
+                    )
+                    specialization_days[day] = day_slots
+                by_specialization[specialization_key] = specialization_days
+
+        materialized_days = snapshot.materialized
+        if materialized is not None:
+            materialized_days = dict(materialized_days)
+            materialized_days[doctor_key] = materialized
+
+        self._snapshot = AvailabilitySnapshot(
+            by_doctor=by_doctor,
+            by_specialization=by_specialization,
+            bitmaps=bitmaps,
+            doctor_names=snapshot.doctor_names,
+            specialization_doctors=snapshot.specialization_doctors,
+            materialized=materialized_days,
+        )
+
+    def _materialize(self, doctor_key: str, days: Iterable[int]):
+        """Generate the scheduled slots of doctor-days, once, around the CSV rows of those days."""
+        schedule = self._schedules.get(doctor_key)
+        if schedule is None:
+            return
+        with self._lock:
+            snapshot = self._snapshot
+            done = snapshot.materialized.get(doctor_key, frozenset())
+            days = [day for day in days if day not in done]
+            if not days:
+                return
+            doctor_days = dict(snapshot.by_doctor.get(doctor_key, {}))
+            bitmaps = snapshot.bitmaps.copy_for(doctor_key)
+            added = []
+            for day in days:
+                stored = doctor_days.get(day, ())
+                starts = {slot.start for slot in stored}
+                generated = [
+                    Slot(
+                        start=start,
+                        specialization=schedule.specialization,
+                        doctor_name=snapshot.doctor_names[doctor_key],
+                        is_available=True,
+                        generated=True,
+                    )
+                    for start in schedule.slot_starts(day) if start not in starts
+                ]
+                if not generated:
+                    continue
+                for slot in generated:
+                    bitmaps.add(doctor_key, slot.start, True)
+                doctor_days[day] = tuple(sorted(stored + tuple(generated), key=lambda slot: slot.start))
+                added += generated
+            self._publish(snapshot, doctor_key, doctor_days, bitmaps, added=added, materialized=done.union(days))
+
+    def to_frame(self) -> pd.DataFrame:
+        with self._lock:
+            df = pd.DataFrame(
+                [
+                    (
+                        slot.date_availability,
+                        slot.specialization,
+                        slot.doctor_name,
+                        slot.is_available,
+                        "" if slot.id_patient is None else slot.id_patient,
+                    )
+                    for slot in self._slots
+                ],
+                columns=COLUMNS,
+            )
+            # a slot that was never replaced is written back as it was read
+            df.attrs[SOURCE_LINES] = [
+                self._source[row][1] if row < len(self._source) and self._source[row][0] is slot else None
+                for row, slot in enumerate(self._slots)
+            ]
+            return df
+
+    def save(self, df: Optional[pd.DataFrame] = None):
+        """Persist the calendar to the CSV file (atomic replace)."""
+        with self._lock:
+            write_csv(self.to_frame() if df is None else df, self.csv_path)
+
+    # ----------------------------------------------------------
+    # READS (lock-free: each call reads one snapshot)
+    # ----------------------------------------------------------
+    def snapshot(self) -> AvailabilitySnapshot:
+        """The current version of the calendar; later writes do not change it."""
+        return self._snapshot
+
+    def _read(self, doctor_key: str, *days: int) -> AvailabilitySnapshot:
+        """The current snapshot, with the doctor's scheduled days generated."""
+        snapshot = self._snapshot
+        if doctor_key in self._schedules:
+            done = snapshot.materialized.get(doctor_key, ())
+            if any(day not in done for day in days):
+                self._materialize(doctor_key, days)
+                snapshot = self._snapshot
+        return snapshot
+
+    def doctor_day(self, doctor_name: str, day: int) -> list[Slot]:
+        """All slots of a doctor on a day number, sorted by start."""
+        doctor_key = normalize_doctor(doctor_name)
+        return list(self._read(doctor_key, day).doctor_day(doctor_key, day))
+
+    def specialization_day(self, specialization: str, day: int, available_only: bool = True) -> list[Slot]:
+        """Slots of every doctor of a specialization on a day number."""
+        specialization_key = normalize_specialization(specialization)
+        for doctor_key in self._scheduled_by_specialization.get(specialization_key, []):
+            self._read(doctor_key, day)
+        slots = self._snapshot.specialization_day(specialization_key, day)
+        if available_only:
+            return [slot for slot in slots if slot.is_available]
+        return list(slots)
+
+    def doctor_name(self, doctor_name: str) -> Optional[str]:
+        """The doctor's name as written in the calendar, None if the doctor has no slots."""
+        return self._snapshot.doctor_names.get(normalize_doctor(doctor_name))
+
+    def specialization_doctors(self, specialization: str) -> list[str]:
+        """Names of the doctors having slots in a specialization."""
+        return list(self._snapshot.specialization_doctors.get(normalize_specialization(specialization), {}).values())
+
+    def get_slot(self, doctor_name: str, start: int) -> Optional[Slot]:
+        """Exact slot lookup by epoch-minutes."""
+        doctor_key = normalize_doctor(doctor_name)
+        matching = self._read(doctor_key, day_of(start)).matching(doctor_key, start)
+        return matching[0] if matching else None
+
+    def free_starts(self, doctor_name: str, day: int) -> list[int]:
+        """Starts of the doctor's free slots on a day number, in order."""
+        doctor_key = normalize_doctor(doctor_name)
+        return self._read(doctor_key, day).free_starts(doctor_key, day)
+
+    def count_free(self, doctor_name: str, day: int) -> int:
+        doctor_key = normalize_doctor(doctor_name)
+        return self._read(doctor_key, day).count_free(doctor_key, day)
+
+    def count_booked(self, doctor_name: str, day: int) -> int:
+        doctor_key = normalize_doctor(doctor_name)
+        return self._read(doctor_key, day).count_booked(doctor_key, day)
+
+    def next_free(self, doctor_name: str, start: int, last_day: Optional[int] = None) -> Optional[int]:
+        """First free start of the doctor at or after `start` (up to `last_day` included)."""
+        doctor_key = normalize_doctor(doctor_name)
+        if doctor_key in self._schedules:
+            # generated days: materialize a batch of days at a time until a free slot shows up
+            if last_day is None:
+                last_day = day_of(start) + SCHEDULE_HORIZON_DAYS - 1
+            for first in range(day_of(start), last_day + 1, MATERIALIZE_BATCH_DAYS):
+                days = range(first, min(first + MATERIALIZE_BATCH_DAYS, last_day + 1))
+                found = self._read(doctor_key, *days).next_free(
+                    doctor_key, max(start, first * MINUTES_PER_DAY), days[-1]
+                )
+                if found is not None:
+                    return found
+            return None
+        return self._snapshot.next_free(doctor_key, start, last_day)
+
+    # ----------------------------------------------------------
+    # WRITES (single writer: the store lock)
+    # ----------------------------------------------------------
+    def mark(self, doctor_name: str, start: int, is_available: bool,
+             id_patient: Optional[int] = None) -> int:
+        """
+        Set availability for an exact time slot (written through to disk if enabled).
+        Returns the number of slots updated.
+        """
+        doctor_key = normalize_doctor(doctor_name)
+        day = day_of(start)
+        with self._lock:
+            snapshot = self._read(doctor_key, day)
+            matching = snapshot.matching(doctor_key, start)
+            if not matching:
+                return 0
+            replaced = {}
+            for slot in matching:
+                updated = replace(slot, is_available=is_available, id_patient=id_patient, generated=False)
+                if slot.generated:
+                    # now an exception to the schedule: persisted from here on
+                    updated.row = len(self._slots)
+                    self._slots.append(updated)
+                else:
+                    self._slots[slot.row] = updated
+                replaced[id(slot)] = updated
+            doctor_days = dict(snapshot.by_doctor[doctor_key])
+            doctor_days[day] = tuple(replaced.get(id(slot), slot) for slot in doctor_days[day])
+            bitmaps = snapshot.bitmaps.copy_for(doctor_key)
+            bitmaps.set_free(doctor_key, start, is_available)
+            self._publish(snapshot, doctor_key, doctor_days, bitmaps, replaced=replaced)
+            if self.write_through:
+                self.save()
+            return len(matching)
@@ -0,0 +1,149 @@
+"""
+Shared, cached access to the CSV files of the data directory.
+
+Each known file is read with explicit column types instead of pandas'
+inference:
+- doctor_availability.csv: is_available as bool (the "Ture" typo of the
+  demo data counts as true), id_patient as nullable Int64, doctor and
+  specialization names as categoricals
+- rendez_vous.csv: patient/doctor ids as nullable Int64
+- patients.csv / doctors.csv: integer IDs, every other column as text
+  (phone numbers keep their leading zeros)
+
+Parsed frames are cached by path and invalidated when the file's
+(mtime, size) changes, so reading an unchanged file costs one stat().
+Frames returned by `load_csv` are shared: copy them before modifying.
+
+Files are parsed by pandas' C parser with every column read as text and
+then converted: the pyarrow parser turns "HH:MM" into times even when
+asked for strings.
+
+`write_csv` keeps the layout of the file it replaces (line endings, final
+newline) and writes the rows listed in `df.attrs[SOURCE_LINES]` exactly as
+they were read, so rewriting a file only changes the rows that changed
+(the demo files hold "1000024.0" patient ids and the "Ture" typo).
+"""
+import csv
+import io
+import os
+import threading
+from typing import Optional
+
+import pandas as pd
+
+
+# same tolerance as DoctorAvailabilityModel ("ture" is a typo present in the CSV)
+TRUE_VALUES = {"true", "yes", "1", "ture"}
+
+ENGINE = "c"
+
+# column -> type for the known files; other columns are text
+SCHEMAS = {
+    "doctor_availability.csv": {
+        "specialization": "category",
+        "doctor_name": "category",
+        "is_available": "bool",
+        "id_patient": "Int64",
+    },
+    "rendez_vous.csv": {
+        "patient_id": "Int64",
+        "medecin_id": "Int64",
+        "service": "category",
+    },
+    "patients.csv": {
+        "ID": "int64",
+    },
+    "doctors.csv": {
+        "ID": "int64",
+        "specialite": "category",
+        "années d'expérience": "Int64",
+    },
+}
+
+# frame attribute: for each row, its text as read from the file if unchanged since, else None
+SOURCE_LINES = "source_lines"
+
+_cache: dict[str, tuple[int, int, pd.DataFrame]] = {}
+_cache_lock = threading.Lock()
+
+
+def _convert(column: pd.Series, kind: str) -> pd.Series:
+    if kind == "bool":
+        return column.str.strip().str.lower().isin(TRUE_VALUES)
+    if kind in ("Int64", "int64"):
+        numbers = pd.to_numeric(column.str.strip().replace("", None))
+        return numbers.astype(kind)
+    return column.astype(kind)
+
+
+def parse_csv(path: str) -> pd.DataFrame:
+    """Read a file with the types of its schema (no caching)."""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, engine=ENGINE)
+    for column, kind in SCHEMAS.get(os.path.basename(path), {}).items():
+        if column in df.columns:
+            df[column] = _convert(df[column], kind)
+    return df
+
+
+def load_csv(path: str) -> pd.DataFrame:
+    """Typed frame of a file, parsed again only when the file changed."""
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    df = parse_csv(key)
+    with _cache_lock:
+        _cache[key] = (stat.st_mtime_ns, stat.st_size, df)
+    return df
+
+
+def source_lines(path: str, rows: int) -> Optional[list[str]]:
+    """
+    Text of the data rows of a file as they are on disk (header excluded),
+    or None if they cannot be matched one to one with the `rows` parsed rows
+    (a quoted value spanning several lines).
+    """
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        lines = [line.rstrip("\r") for line in file.read().split("\n")]
+    lines = [line for line in lines if line.strip()]
+    return lines[1:] if len(lines) == rows + 1 else None
+
+
+def _layout(path: str) -> tuple[str, bool]:
+    """(line terminator, whether the file ends with one) of an existing file; "\n" and True otherwise."""
+    if not os.path.exists(path):
+        return "\n", True
+    with open(path, "rb") as file:
+        data = file.read()
+    return ("\r\n" if b"\r\n" in data else "\n"), data.endswith(b"\n") or not data
+
+
+def write_csv(df: pd.DataFrame, path: str):
+    """Replace a file atomically (temp file + rename) and drop its cached frame."""
+    newline, final_newline = _layout(path)
+    lines = df.attrs.get(SOURCE_LINES) or [None] * len(df)
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator=newline)
+    writer.writerow(df.columns)
+    for line, values in zip(lines, df.itertuples(index=False, name=None)):
+        if line is None:
+            writer.writerow(["" if pd.isna(value) else value for value in values])
+        else:
+            out.write(line + newline)
+    text = out.getvalue()
+    if not final_newline:
+        text = text[:-len(newline)]
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+    invalidate(path)
+
+
+def invalidate(path: str):
+    with _cache_lock:
+        _cache.pop(os.path.abspath(path), None)
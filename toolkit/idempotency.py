@@ -0,0 +1,160 @@
+"""
+Idempotency keys for the operations that change data.
+
+A client retrying a request (a Streamlit rerun, a timeout, the LLM issuing
+the same tool call again after an error) sends the same key, and gets the
+result of the first execution instead of a second booking or patient.
+
+Completed operations are kept in a bounded cache: an entry lives
+IDEMPOTENCY_TTL seconds after its operation finished (default 3600) and
+at most IDEMPOTENCY_MAX_KEYS completed entries are kept (default 10000,
+oldest dropped first; an operation still running is never dropped). A
+retry arriving while the first execution is still running waits for it.
+A failed operation is not cached, so it can be retried with the same key.
+
+Keys are scoped by operation (tool name, "execute" for the API). Tools
+called while an /execute request with a key is running get a key derived
+from the request's key and their own arguments (see `request_scope`), so
+the tool calls of a replayed conversation turn are not executed twice
+either; the tools take no key of their own.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+_request_key: ContextVar[Optional[str]] = ContextVar("idempotency_request_key", default=None)
+
+
+class IdempotencyConflict(ValueError):
+    """The key was already used for the same operation with other arguments."""
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    future: Future
+    expires: float
+
+
+def fingerprint(arguments: dict) -> str:
+    return json.dumps(arguments, sort_keys=True, default=str)
+
+
+@contextmanager
+def request_scope(key: Optional[str]):
+    """Derive keys for the tool calls made while handling a request sent with `key`."""
+    token = _request_key.set(key)
+    try:
+        yield
+    finally:
+        _request_key.reset(token)
+
+
+class IdempotencyCache:
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("IDEMPOTENCY_TTL", "3600"))
+        self.max_entries = max_entries or int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()    # oldest first
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _resolve(self, key: Optional[str], arguments: dict) -> Optional[str]:
+        if key:
+            return key
+        request_key = _request_key.get()
+        if request_key:
+            return f"{request_key}/{fingerprint(arguments)}"
+        return None
+
+    def _claim(self, scope: str, key: str, arguments: dict) -> tuple[Future, bool]:
+        """The future of the first execution under the key, and whether the caller must run it."""
+        now = time.monotonic()
+        digest = fingerprint(arguments)
+        with self._lock:
+            while self._entries:
+                oldest = next(iter(self._entries.values()))
+                if oldest.expires > now or not oldest.future.done():
+                    break
+                self._entries.popitem(last=False)
+
+            entry = self._entries.get((scope, key))
+            if entry is not None:
+                if entry.fingerprint != digest:
+                    raise IdempotencyConflict(f"Idempotency key {key!r} was already used for another {scope} request")
+                return entry.future, False
+
+            future = Future()
+            self._entries[(scope, key)] = _Entry(digest, future, float("inf"))
+            # drop the oldest completed entries: a retry of a running operation must find it
+            excess = len(self._entries) - self.max_entries
+            if excess > 0:
+                completed = (old_key for old_key, old in self._entries.items() if old.future.done())
+                for old_key in list(islice(completed, excess)):
+                    del self._entries[old_key]
+            return future, True
+
+    def _finish(self, scope: str, key: str, future: Future, result=None, error: Optional[BaseException] = None):
+        with self._lock:
+            if error is not None:
+                # not cached: a retry runs the operation again
+                if self._entries.get((scope, key)) is not None and self._entries[(scope, key)].future is future:
+                    del self._entries[(scope, key)]
+            elif (scope, key) in self._entries:
+                self._entries[(scope, key)].expires = time.monotonic() + self.ttl
+                self._entries.move_to_end((scope, key))
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def run(self, scope: str, key: Optional[str], arguments: dict, operation: Callable[[], T]) -> T:
+        """Run `operation` once per (scope, key); without a key it simply runs."""
+        key = self._resolve(key, arguments)
+        if key is None:
+            return operation()
+        future, owner = self._claim(scope, key, arguments)
+        if not owner:
+            return future.result()
+        try:
+            result = operation()
+        except BaseException as error:
+            self._finish(scope, key, future, error=error)
+            raise
+        self._finish(scope, key, future, result)
+        return result
+
+    async def run_async(self, scope: str, key: Optional[str], arguments: dict,
+                        operation: Callable[[], Awaitable[T]]) -> T:
+        """`run` for a coroutine operation; a retry waits without blocking the event loop."""
+        key = self._resolve(key, arguments)
+        if key is None:
+            return await operation()
+        future, owner = self._claim(scope, key, arguments)
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await operation()
+        except BaseException as error:
+            self._finish(scope, key, future, error=error)
+            raise
+        self._finish(scope, key, future, result)
+        return result
+
+
+# shared by the tools and the API
+operations = IdempotencyCache()
@@ -0,0 +1,227 @@
+"""
+Append-only journal of booking events for the CSV backend.
+
+Each booking/cancellation appends one JSON line (flushed and fsync'ed)
+instead of rewriting doctor_availability.csv and rendez_vous.csv. The
+snapshot files are rewritten only by a periodic compaction, and the
+journal is replayed on startup.
+
+Events are idempotent ("slot X is booked by P", "appointment A exists",
+"appointment A is gone"), so replaying a journal on top of a snapshot
+that already contains some of its events gives the same state. This is
+what makes a crash in the middle of a compaction harmless.
+
+Writes from concurrent requests go through a GroupCommitWriter: the
+events are queued and a single writer thread appends them by batches, so
+N simultaneous bookings cost one fsync instead of N, and callers wait for
+the batch holding their events (durable acknowledgement).
+"""
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+
+JOURNAL_FILE = "bookings.journal"
+
+
+class BookingJournal:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.compacting_path = path + ".compacting"
+        self._lock = threading.Lock()
+        self._drop_torn_tail(path)
+        self.pending = len(self.read(path))   # events not yet compacted into the snapshots
+        self._file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _drop_torn_tail(path: str):
+        """Cut a partially written last line so new events start on a clean line."""
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as file:
+            data = file.read()
+            if data and not data.endswith(b"\n"):
+                file.truncate(data.rfind(b"\n") + 1)
+
+    @staticmethod
+    def read(path: str) -> list[dict]:
+        """Events of a journal file (a torn last line from a crash is ignored)."""
+        if not os.path.exists(path):
+            return []
+        events = []
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return events
+
+    def unapplied_events(self) -> list[dict]:
+        """Everything that may be missing from the snapshots, oldest first."""
+        return self.read(self.compacting_path) + self.read(self.path)
+
+    def append(self, events: list[dict]):
+        """
+        Durably append events: one write + one fsync, whatever the history size.
+        If the write or the fsync fails, the journal is cut back to where it
+        was, so it only ever holds acknowledged events.
+        """
+        data = "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+        with self._lock:
+            offset = self._file.tell()
+            try:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception:
+                self._rewind(offset)
+                raise
+            self.pending += len(events)
+
+    def _rewind(self, offset: int):
+        try:
+            self._file.close()
+        except OSError:
+            pass                    # the buffered part of the batch is dropped below anyway
+        try:
+            os.truncate(self.path, offset)
+        except OSError:
+            pass
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def rotate(self) -> str:
+        """
+        Move the current events aside for compaction and start an empty journal.
+        If a previous compaction did not finish, its events are kept in front.
+        """
+        with self._lock:
+            self._file.close()
+            if os.path.exists(self.compacting_path):
+                with open(self.compacting_path, "a", encoding="utf-8") as rotated, \
+                        open(self.path, "r", encoding="utf-8") as current:
+                    rotated.write(current.read())
+                    rotated.flush()
+                    os.fsync(rotated.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.compacting_path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.pending = 0
+        return self.compacting_path
+
+    def discard_rotated(self):
+        """Called once the snapshots containing the rotated events are on disk."""
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class GroupCommitWriter:
+    """
+    Queue in front of a BookingJournal, flushed by one writer thread.
+
+    A batch is written (one write + one fsync) as soon as `max_batch`
+    events are waiting (GROUP_COMMIT_MAX, default 256) or `interval_ms`
+    after the first of them was queued (GROUP_COMMIT_MS, default 2).
+    `submit` returns a ticket; `wait(ticket)` returns once the events of
+    that submission are on disk, or raises the error of its batch.
+    """
+
+    def __init__(self, journal: BookingJournal, interval_ms: Optional[float] = None,
+                 max_batch: Optional[int] = None):
+        self.journal = journal
+        if interval_ms is None:
+            interval_ms = float(os.getenv("GROUP_COMMIT_MS", "2"))
+        self.interval = interval_ms / 1000
+        self.max_batch = max_batch or int(os.getenv("GROUP_COMMIT_MAX", "256"))
+        self.batches = 0                               # writes done, for monitoring
+        self._cond = threading.Condition()
+        self._queue: list[dict] = []
+        self._submitted = 0                            # tickets handed out
+        self._done = 0                                 # tickets whose batch was written (or failed)
+        self._failures: list[tuple[int, int, Exception]] = []     # (first, last ticket, error)
+        self.last_failed = 0                           # last ticket of the latest failed batch
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="journal-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, events: list[dict]) -> int:
+        """Queue events, in order; returns the ticket to wait on."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("The journal writer is closed")
+            self._queue.extend(events)
+            self._submitted += 1
+            self._cond.notify_all()
+            return self._submitted
+
+    def wait(self, ticket: int):
+        """Block until the submission is durable."""
+        with self._cond:
+            while self._done < ticket:
+                self._cond.wait()
+            for first, last, error in self._failures:
+                if first <= ticket <= last:
+                    raise error
+
+    def flush(self):
+        """Wait for everything submitted so far."""
+        with self._cond:
+            ticket = self._submitted
+        self.wait(ticket)
+
+    def drain(self) -> int:
+        """Wait until everything submitted so far was written or failed, without raising; returns the last ticket."""
+        with self._cond:
+            ticket = self._submitted
+            while self._done < ticket:
+                self._cond.wait()
+            return ticket
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                # give concurrent requests a chance to join the batch
+                deadline = time.monotonic() + self.interval
+                while len(self._queue) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._queue = self._queue, []
+                first, last = self._done + 1, self._submitted
+
+            error = None
+            try:
+                self.journal.append(batch)
+            except Exception as exc:
+                error = exc
+
+            with self._cond:
+                if error is not None:
+                    self._failures.append((first, last, error))
+                    self.last_failed = last
+                self._done = last
+                self.batches += 1
+                self._cond.notify_all()
+
+    def close(self):
+        """Write what is queued and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -0,0 +1,161 @@
+"""
+In-memory copy of patients.csv used by the CSV backend.
+
+Patients are keyed by ID, with hash indexes on the normalized email and
+telephone, so allocating an ID, checking for a duplicate, fetching a
+patient and changing some fields of one record are dictionary operations. The ID sequence is monotonic: it starts
+after the highest ID of the snapshot and of the journaled creations, and
+IDs are never reused (patients are not deleted).
+
+New patients and field updates are journaled by CSVStorage
+(toolkit/journal.py) and only written back to patients.csv by a
+compaction.
+"""
+import re
+import threading
+from typing import Optional
+
+import pandas as pd
+
+from toolkit.csv_loader import SOURCE_LINES, load_csv, source_lines, write_csv
+
+
+PATIENTS_FILE = "patients.csv"
+COLUMNS = ["ID", "nom", "email", "telephone", "date_naissance", "sexe", "addresse"]
+
+
+def email_key(email) -> str:
+    return str(email or "").strip().lower()
+
+
+def telephone_key(telephone) -> str:
+    """Digits only, so "06 12-34" and "061234" are the same number."""
+    return re.sub(r"\D", "", str(telephone or ""))
+
+
+class PatientRegistry:
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self._lock = threading.RLock()
+        self._records: dict[int, dict] = {}          # ID -> record (file order)
+        self._by_email: dict[str, int] = {}
+        self._by_telephone: dict[str, int] = {}
+        self.next_id = 1
+        self.dirty = False                           # changes not yet in patients.csv
+        self._source: dict[int, tuple[dict, str]] = {}    # ID -> record as read, with its text in the file
+        self._load()
+
+    def _load(self):
+        df = load_csv(self.csv_path)
+        with self._lock:
+            self._records = {}
+            self._by_email = {}
+            self._by_telephone = {}
+            for record in df.to_dict("records"):
+                self._insert({column: record.get(column, "") for column in COLUMNS} | {"ID": int(record["ID"])})
+            self.next_id = max(self._records, default=0) + 1
+            self.dirty = False
+            lines = source_lines(self.csv_path, len(df)) or []
+            # records are updated in place: keep a copy to tell which ones changed
+            self._source = {
+                int(patient_id): (dict(self._records[int(patient_id)]), line)
+                for patient_id, line in zip(df["ID"], lines)
+            }
+
+    def _insert(self, record: dict):
+        self._records[record["ID"]] = record
+        self._index(record)
+
+    def _index(self, record: dict):
+        # the demo data may already hold duplicates: the first ID keeps the key
+        if email_key(record["email"]):
+            self._by_email.setdefault(email_key(record["email"]), record["ID"])
+        if telephone_key(record["telephone"]):
+            self._by_telephone.setdefault(telephone_key(record["telephone"]), record["ID"])
+
+    # ----------------------------------------------------------
+    # READS
+    # ----------------------------------------------------------
+    def get(self, patient_id: int) -> Optional[dict]:
+        record = self._records.get(patient_id)
+        return dict(record) if record is not None else None
+
+    def __contains__(self, patient_id: int) -> bool:
+        return patient_id in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def records(self) -> list[dict]:
+        with self._lock:
+            return [dict(record) for record in self._records.values()]
+
+    def find_duplicate(self, fields: dict, patient_id: Optional[int] = None) -> Optional[tuple[str, int]]:
+        """("email" | "telephone", ID) of another patient already using one of the values."""
+        for field, index, key in (
+            ("email", self._by_email, email_key),
+            ("telephone", self._by_telephone, telephone_key),
+        ):
+            if field not in fields:
+                continue
+            owner = index.get(key(fields[field]))
+            if owner is not None and owner != patient_id:
+                return field, owner
+        return None
+
+    # ----------------------------------------------------------
+    # WRITES (idempotent, see toolkit/journal.py)
+    # ----------------------------------------------------------
+    def ensure(self, record: dict) -> bool:
+        """Add the patient unless its ID is already registered."""
+        record = {column: record.get(column, "") for column in COLUMNS}
+        with self._lock:
+            if record["ID"] in self._records:
+                return False
+            self._insert(record)
+            self.next_id = max(self.next_id, record["ID"] + 1)
+            self.dirty = True
+            return True
+
+    def update(self, patient_id: int, fields: dict) -> bool:
+        """Set some fields of a patient in place; the indexes follow an email / telephone change."""
+        fields = {column: value for column, value in fields.items() if column in COLUMNS and column != "ID"}
+        with self._lock:
+            record = self._records.get(patient_id)
+            if record is None:
+                return False
+            if "email" in fields or "telephone" in fields:
+                self._unindex(record)
+                record.update(fields)
+                self._index(record)
+            else:
+                record.update(fields)
+            self.dirty = True
+            return True
+
+    def _unindex(self, record: dict):
+        if self._by_email.get(email_key(record["email"])) == record["ID"]:
+            del self._by_email[email_key(record["email"])]
+        if self._by_telephone.get(telephone_key(record["telephone"])) == record["ID"]:
+            del self._by_telephone[telephone_key(record["telephone"])]
+
+    # ----------------------------------------------------------
+    # PERSISTENCE
+    # ----------------------------------------------------------
+    def to_frame(self) -> pd.DataFrame:
+        with self._lock:
+            df = pd.DataFrame(
+                [[record[column] for column in COLUMNS] for record in self._records.values()],
+                columns=COLUMNS,
+            )
+            df.attrs[SOURCE_LINES] = [
+                self._source[patient_id][1]
+                if patient_id in self._source and self._source[patient_id][0] == record else None
+                for patient_id, record in self._records.items()
+            ]
+            return df
+
+    def save(self, df: Optional[pd.DataFrame] = None):
+        """Write the snapshot file (atomic replace)."""
+        write_csv(self.to_frame() if df is None else df, self.csv_path)
@@ -0,0 +1,209 @@
+"""
+In-memory search index over the patients (name, telephone, email).
+
+Each patient is indexed under the trigrams of its folded name (lowercase,
+accents removed), of the local part of its email and of its telephone
+digits, plus the 1- and 2-character prefixes of each of these words for
+very short queries. Posting lists are sorted `array('I')` of patient IDs
+(4 bytes per entry).
+
+A query walks the shortest posting list of its keys (intersected chunk
+by chunk with the next shortest ones when it is long) in ID order and checks each
+patient against its stored fields, stopping as soon as k patients start
+with the query, so frequent names cost as little as rare ones. When fewer than k patients contain the query
+(a typo, words in another order), patients sharing most of the query's
+trigrams follow.
+
+Updates are incremental: a changed patient is added to the posting lists
+of its new keys, and entries left behind by the old values are filtered
+out when candidates are checked.
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Optional
+
+
+GRAM = 3
+CHUNK = 4096                    # IDs of a long posting list intersected (in C) at a time
+FUZZY_MAX_CANDIDATES = 2000     # at most this many patients are scored by the similarity fallback
+
+_PHONE_QUERY = re.compile(r"^[\d\s+().-]+$")
+_EMPTY = array("I")
+
+
+def fold(text) -> str:
+    """Lowercase without accents, whitespace collapsed: 'Leïla  Berrada' -> 'leila berrada'."""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode().lower()
+    return " ".join(text.split())
+
+
+def _fields(patient: dict) -> tuple[str, str, str]:
+    """Searchable forms of a patient: (name, email, telephone digits)."""
+    return (
+        fold(patient.get("nom")),
+        str(patient.get("email") or "").strip().lower(),
+        re.sub(r"\D", "", str(patient.get("telephone") or "")),
+    )
+
+
+def _words(fields: tuple[str, str, str]) -> list[str]:
+    """Indexed words: the name's words, the email's local part and the telephone."""
+    name, email, telephone = fields
+    return [word for word in name.split() + [email.split("@")[0], telephone] if word]
+
+
+def _query_words(form: str) -> list[str]:
+    words = [word.split("@")[0] if "@" in word else word for word in form.split()]
+    return [word for word in words if word]
+
+
+def _grams(word: str) -> set[str]:
+    return {word[i:i + GRAM] for i in range(len(word) - GRAM + 1)}
+
+
+def _keys(words: Iterable[str]) -> set[str]:
+    keys = set()
+    for word in words:
+        keys.update(word[i:i + GRAM] for i in range(len(word) - GRAM + 1))
+        keys.update("^" + word[:size] for size in range(1, min(GRAM, len(word) + 1)))
+    return keys
+
+
+class PatientSearchIndex:
+
+    def __init__(self, patients: Iterable[dict] = ()):
+        self._lock = threading.Lock()
+        self._fields: dict[int, tuple[str, str, str]] = {}     # ID -> indexed forms
+
+        # bulk build: posting lists are sorted once at the end
+        postings: dict[str, list[int]] = {}
+        for patient in patients:
+            patient_id = int(patient["ID"])
+            fields = _fields(patient)
+            self._fields[patient_id] = fields
+            for key in _keys(_words(fields)):
+                postings.setdefault(key, []).append(patient_id)
+        self._postings: dict[str, array] = {
+            key: array("I", sorted(set(ids))) for key, ids in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    # ----------------------------------------------------------
+    # UPDATES
+    # ----------------------------------------------------------
+    def add(self, patient: dict):
+        """Index a new patient, or the new version of an indexed one."""
+        patient_id = int(patient["ID"])
+        fields = _fields(patient)
+        with self._lock:
+            for key in _keys(_words(fields)):
+                posting = self._postings.setdefault(key, array("I"))
+                if not posting or posting[-1] < patient_id:
+                    posting.append(patient_id)          # new patients: IDs only grow
+                else:
+                    position = bisect_left(posting, patient_id)
+                    if position == len(posting) or posting[position] != patient_id:
+                        posting.insert(position, patient_id)
+            self._fields[patient_id] = fields
+
+    # ----------------------------------------------------------
+    # QUERIES
+    # ----------------------------------------------------------
+    def search(self, query: str, k: int = 5) -> list[int]:
+        """
+        IDs of up to k patients matching the query, best first: patients with
+        a name word, email or telephone starting with the query, then
+        patients containing it, then similar patients. Ties go to the
+        lowest ID.
+        """
+        forms = {fold(query)}
+        if _PHONE_QUERY.match(query.strip()):
+            forms.add(re.sub(r"\D", "", query))
+        forms.discard("")
+        if not forms:
+            return []
+
+        prefix, inner = [], []
+        previous = None
+        for patient_id in heapq.merge(*(self._candidates(form) for form in forms)):
+            if patient_id == previous:
+                continue
+            previous = patient_id
+            qualities = [self._quality(form, self._fields[patient_id]) for form in forms]
+            quality = min((q for q in qualities if q is not None), default=None)
+            if quality == 0:
+                prefix.append(patient_id)
+                if len(prefix) == k:
+                    break       # nothing later in ID order can rank higher
+            elif quality == 1 and len(inner) < k:
+                inner.append(patient_id)
+
+        result = (prefix + inner)[:k]
+        if len(result) < k:
+            result += self._similar(forms, k - len(result), exclude=set(result))
+        return result
+
+    def _postings_of(self, keys: Iterable[str]) -> list[array]:
+        return sorted((self._postings.get(key, _EMPTY) for key in keys), key=len)
+
+    def _candidates(self, form: str) -> Iterable[int]:
+        """
+        Sorted IDs that may contain the query: every patient containing it is
+        in the posting list of each of its keys.
+        """
+        keys = set()
+        for word in _query_words(form):
+            keys |= _grams(word) if len(word) >= GRAM else {"^" + word}
+        postings = self._postings_of(keys)
+        if not postings:
+            return
+        shortest, others = postings[0], postings[1:3]
+        if len(shortest) <= CHUNK or not others:
+            yield from shortest
+            return
+        # chunk by chunk, so that a search stopping early only pays for the first chunks
+        for offset in range(0, len(shortest), CHUNK):
+            chunk = shortest[offset:offset + CHUNK]
+            ids = set(chunk)
+            for other in others:
+                ids.intersection_update(other[bisect_left(other, chunk[0]):bisect_right(other, chunk[-1])])
+            yield from sorted(ids)
+
+    @staticmethod
+    def _quality(form: str, fields: tuple[str, str, str]) -> Optional[int]:
+        """0: a field or a word of the name starts with the query, 1: contains it, None: neither."""
+        best = None
+        for value in fields:
+            if value.startswith(form) or f" {form}" in value:
+                return 0
+            if form in value:
+                best = 1
+        return best
+
+    def _similar(self, forms: set[str], k: int, exclude: set[int]) -> list[int]:
+        """IDs having at least half of the query's trigrams, most shared first."""
+        scored = {}
+        for form in forms:
+            grams = set().union(*(_grams(word) for word in _query_words(form)))
+            if not grams:
+                continue
+            needed = (len(grams) + 1) // 2
+            # a patient with `needed` of the grams is in one of the len - needed + 1 shortest lists
+            candidates = set()
+            for posting in self._postings_of(grams)[:len(grams) - needed + 1]:
+                candidates.update(posting[:FUZZY_MAX_CANDIDATES - len(candidates)])
+                if len(candidates) >= FUZZY_MAX_CANDIDATES:
+                    break
+            for patient_id in candidates - exclude:
+                # checked against the current fields: entries of old values do not count
+                text = " ".join(_words(self._fields[patient_id]))
+                score = sum(gram in text for gram in grams)
+                if score >= needed:
+                    scored[patient_id] = max(scored.get(patient_id, 0), score / len(grams))
+        return heapq.nsmallest(k, scored, key=lambda patient_id: (-scored[patient_id], patient_id))
@@ -0,0 +1,98 @@
+"""
+Working-hours schedules of doctors.csv ("disponibilité par jour et heure").
+
+A schedule string such as
+    "Lundi-Vendredi: 09:00-18:30, Samedi: 09:00-13:00"
+    "Lundi-Mercredi-Vendredi: 09:00-18:30, Jeudi: 09:00-13:00"
+is compiled once into per-weekday hour ranges. Two days joined by "-"
+are a range (Lundi-Vendredi = Monday to Friday), three or more are a list
+(Lundi-Mercredi-Vendredi = Monday, Wednesday and Friday). Several hour
+ranges can be given for the same days with "/" or "et"
+("Lundi: 09:00-12:00 / 14:00-18:00").
+
+The availability store uses the compiled schedules to generate the
+half-hour slots of a doctor-day the first time it is asked for, so only
+exceptions to the schedule (bookings, closures) are stored in
+doctor_availability.csv.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from toolkit.slot_bitmap import SLOT_MINUTES
+from toolkit.timeslots import MINUTES_PER_DAY, parse_time
+
+
+WEEKDAYS = {
+    "lundi": 0, "mardi": 1, "mercredi": 2, "jeudi": 3, "vendredi": 4, "samedi": 5, "dimanche": 6,
+}
+_EPOCH_WEEKDAY = 3      # 1970-01-01 was a Thursday
+
+_HOURS = r"\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2}"
+_RULE = re.compile(
+    rf"(?P<days>[^\d:,]+?)\s*:\s*(?P<hours>{_HOURS}(?:\s*(?:/|et|&)\s*{_HOURS})*)",
+    re.IGNORECASE,
+)
+
+
+def _weekday(name: str) -> int:
+    key = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().strip().lower()
+    if key not in WEEKDAYS:
+        raise ValueError(f"Unknown day in schedule: {name!r}")
+    return WEEKDAYS[key]
+
+
+def _parse_days(text: str) -> list[int]:
+    days = [_weekday(name) for name in text.split("-")]
+    if len(days) == 2:
+        first, last = days
+        return [(first + offset) % 7 for offset in range((last - first) % 7 + 1)]
+    return days
+
+
+def weekday_of(day: int) -> int:
+    """Monday = 0 ... Sunday = 6, for a day number."""
+    return (day + _EPOCH_WEEKDAY) % 7
+
+
+@dataclass
+class DoctorSchedule:
+    doctor_name: str
+    specialization: str
+    hours: dict[int, list[tuple[int, int]]] = field(default_factory=dict)   # weekday -> [(from, to)] minutes
+
+    def slot_starts(self, day: int) -> list[int]:
+        """Epoch-minutes of the schedule's half-hour slots on a day number, in order."""
+        base = day * MINUTES_PER_DAY
+        return [
+            base + minute
+            for opens, closes in self.hours.get(weekday_of(day), [])
+            for minute in range(opens, closes - SLOT_MINUTES + 1, SLOT_MINUTES)
+        ]
+
+
+def parse_schedule(text: str) -> dict[int, list[tuple[int, int]]]:
+    """Schedule string -> {weekday: [(from, to) in minutes of the day]}."""
+    hours: dict[int, list[tuple[int, int]]] = {}
+    for rule in _RULE.finditer(text or ""):
+        ranges = [
+            (parse_time(opens), parse_time(closes))
+            for opens, closes in re.findall(r"(\d{1,2}:\d{2})\s*-\s*(\d{1,2}:\d{2})", rule.group("hours"))
+        ]
+        for weekday in _parse_days(rule.group("days")):
+            hours.setdefault(weekday, []).extend(ranges)
+    for ranges in hours.values():
+        ranges.sort()
+    return hours
+
+
+def compile_schedules(doctors: Iterable[dict]) -> list[DoctorSchedule]:
+    """Schedules of the doctors.csv records that have one."""
+    schedules = []
+    for doctor in doctors:
+        text = doctor.get("disponibilité par jour et heure")
+        hours = parse_schedule(text) if isinstance(text, str) else {}
+        if hours:
+            schedules.append(DoctorSchedule(doctor["nom"], doctor["specialite"], hours))
+    return schedules
@@ -0,0 +1,201 @@
+"""
+Bitmap availability engine: one fixed-width bitmap per doctor-day.
+
+A day is SLOTS_PER_DAY half-hour slots; bit i of a mask is the slot
+starting at i * SLOT_MINUTES. Each doctor keeps two masks per day in
+packed `array('Q')` columns indexed by day offset:
+- `slots`: the slot exists in doctor_availability.csv
+- `free` : the slot exists and is available
+
+Booking or cancelling flips one bit (O(1)); "how many left" is a
+popcount and "next free" a find-first-set, with no per-slot objects.
+A year of 50 doctors is 50 * 365 * 16 bytes, about 290 KB.
+
+Days the bitmap cannot describe exactly (a slot off the half-hour grid,
+or the same start listed twice) are reported by `is_exact` so that the
+caller can fall back to the slot rows for them.
+"""
+from array import array
+from typing import Optional
+
+from toolkit.timeslots import MINUTES_PER_DAY, day_of
+
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = MINUTES_PER_DAY // SLOT_MINUTES
+
+
+def slot_bit(start: int) -> Optional[int]:
+    """Bit index of a start within its day, None when off the grid."""
+    minute = start % MINUTES_PER_DAY
+    if minute % SLOT_MINUTES:
+        return None
+    return minute // SLOT_MINUTES
+
+
+def iter_bits(mask: int):
+    """Indexes of the set bits, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DoctorBitmap:
+    """The slot/free masks of one doctor, one 64-bit word per day."""
+
+    __slots__ = ("first_day", "slots", "free")
+
+    def __init__(self):
+        self.first_day: Optional[int] = None
+        self.slots = array("Q")
+        self.free = array("Q")
+
+    def copy(self) -> "DoctorBitmap":
+        bitmap = DoctorBitmap()
+        bitmap.first_day = self.first_day
+        bitmap.slots = array("Q", self.slots)
+        bitmap.free = array("Q", self.free)
+        return bitmap
+
+    def _offset(self, day: int, grow: bool = False) -> Optional[int]:
+        if self.first_day is None:
+            if not grow:
+                return None
+            self.first_day = day
+        if day < self.first_day:
+            if not grow:
+                return None
+            padding = array("Q", bytes(8 * (self.first_day - day)))
+            self.slots = padding + self.slots
+            self.free = padding + self.free
+            self.first_day = day
+        offset = day - self.first_day
+        if offset >= len(self.slots):
+            if not grow:
+                return None
+            padding = array("Q", bytes(8 * (offset + 1 - len(self.slots))))
+            self.slots.extend(padding)
+            self.free.extend(padding)
+        return offset
+
+    @property
+    def last_day(self) -> Optional[int]:
+        return None if self.first_day is None else self.first_day + len(self.slots) - 1
+
+    def add(self, start: int, bit: int, is_available: bool):
+        offset = self._offset(day_of(start), grow=True)
+        self.slots[offset] |= 1 << bit
+        if is_available:
+            self.free[offset] |= 1 << bit
+        else:
+            self.free[offset] &= ~(1 << bit)
+
+    def set_free(self, start: int, bit: int, is_available: bool) -> bool:
+        """Flip one existing slot; False if the doctor has no such slot."""
+        offset = self._offset(day_of(start))
+        if offset is None or not self.slots[offset] >> bit & 1:
+            return False
+        if is_available:
+            self.free[offset] |= 1 << bit
+        else:
+            self.free[offset] &= ~(1 << bit)
+        return True
+
+    def masks(self, day: int) -> tuple[int, int]:
+        offset = self._offset(day)
+        if offset is None:
+            return 0, 0
+        return self.slots[offset], self.free[offset]
+
+    def next_free(self, start: int, last_day: Optional[int] = None) -> Optional[int]:
+        """First free start >= `start` (up to `last_day` included)."""
+        if self.first_day is None:
+            return None
+        day = max(day_of(start), self.first_day)
+        last_day = self.last_day if last_day is None else min(last_day, self.last_day)
+        # bits before `start` on its own day are masked out
+        minute = start - day * MINUTES_PER_DAY
+        below = -(-minute // SLOT_MINUTES) if minute > 0 else 0
+        while day <= last_day:
+            mask = self.free[day - self.first_day] >> below << below
+            if mask:
+                return day * MINUTES_PER_DAY + ((mask & -mask).bit_length() - 1) * SLOT_MINUTES
+            day += 1
+            below = 0
+        return None
+
+
+class SlotBitmaps:
+    """Bitmaps of every doctor, keyed by normalized doctor name."""
+
+    def __init__(self):
+        self._doctors: dict[str, DoctorBitmap] = {}
+        self._inexact: dict[str, set[int]] = {}     # doctor key -> days to read from the rows
+
+    def copy_for(self, doctor_key: str) -> "SlotBitmaps":
+        """
+        A copy in which only `doctor_key`'s bitmap may be changed: the other
+        doctors' bitmaps are shared with this one (copy-on-write updates).
+        """
+        bitmaps = SlotBitmaps()
+        bitmaps._doctors = dict(self._doctors)
+        bitmaps._inexact = dict(self._inexact)
+        if doctor_key in self._doctors:
+            bitmaps._doctors[doctor_key] = self._doctors[doctor_key].copy()
+        if doctor_key in self._inexact:
+            bitmaps._inexact[doctor_key] = set(self._inexact[doctor_key])
+        return bitmaps
+
+    def add(self, doctor_key: str, start: int, is_available: bool):
+        bitmap = self._doctors.setdefault(doctor_key, DoctorBitmap())
+        bit = slot_bit(start)
+        day = day_of(start)
+        if bit is None or bitmap.masks(day)[0] >> bit & 1:
+            self._inexact.setdefault(doctor_key, set()).add(day)
+            if bit is None:
+                return
+        bitmap.add(start, bit, is_available)
+
+    def set_free(self, doctor_key: str, start: int, is_available: bool) -> bool:
+        bitmap = self._doctors.get(doctor_key)
+        bit = slot_bit(start)
+        if bitmap is None or bit is None:
+            return False
+        return bitmap.set_free(start, bit, is_available)
+
+    def is_exact(self, doctor_key: str, day: int) -> bool:
+        return day not in self._inexact.get(doctor_key, ())
+
+    def inexact_days(self, doctor_key: str) -> set[int]:
+        return self._inexact.get(doctor_key, set())
+
+    # ---- queries (exact days only, see is_exact) ----
+    def free_starts(self, doctor_key: str, day: int) -> list[int]:
+        bitmap = self._doctors.get(doctor_key)
+        if bitmap is None:
+            return []
+        base = day * MINUTES_PER_DAY
+        return [base + bit * SLOT_MINUTES for bit in iter_bits(bitmap.masks(day)[1])]
+
+    def count_free(self, doctor_key: str, day: int) -> int:
+        bitmap = self._doctors.get(doctor_key)
+        return bitmap.masks(day)[1].bit_count() if bitmap else 0
+
+    def count_booked(self, doctor_key: str, day: int) -> int:
+        bitmap = self._doctors.get(doctor_key)
+        if bitmap is None:
+            return 0
+        slots, free = bitmap.masks(day)
+        return (slots & ~free).bit_count()
+
+    def next_free(self, doctor_key: str, start: int, last_day: Optional[int] = None) -> Optional[int]:
+        bitmap = self._doctors.get(doctor_key)
+        return bitmap.next_free(start, last_day) if bitmap else None
+
+    def nbytes(self) -> int:
+        """Memory used by the packed masks."""
+        return sum(
+            bitmap.slots.itemsize * (len(bitmap.slots) + len(bitmap.free))
+            for bitmap in self._doctors.values()
+        )
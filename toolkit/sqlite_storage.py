@@ -0,0 +1,638 @@
+"""
+SQLite backend for the toolkit storage layer.
+
+- WAL journal mode, one connection per thread
+- slots and appointments keyed by integer epoch-minutes, indexed on
+  (doctor, start), (specialization, start) and patient id; a day is a
+  start range
+- every write is a single short transaction touching only the changed rows
+- patient IDs come from an AUTOINCREMENT sequence (never reused), and the
+  normalized email / telephone are indexed for duplicate checks
+- patient search uses the in-memory index of toolkit/patient_search.py,
+  kept up to date by the writes of this process
+
+Import the existing CSV files once with:
+    python -m toolkit.sqlite_storage --data-path data/ --db data/appointments.db
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+from toolkit.availability_store import (
+    Slot,
+    normalize_doctor,
+    normalize_specialization,
+    parse_patient_id,
+)
+from toolkit.csv_loader import load_csv
+from toolkit.patient_registry import email_key, telephone_key
+from toolkit.storage import (
+    ALREADY_BOOKED,
+    BOOKED,
+    CREATED,
+    DUPLICATE_EMAIL,
+    DUPLICATE_TELEPHONE,
+    NO_APPOINTMENT,
+    NO_PATIENT,
+    NOTHING_TO_UPDATE,
+    NOT_BOOKED,
+    NO_SLOT,
+    RESCHEDULED,
+    UPDATED,
+    Storage,
+)
+from toolkit.timeslots import MINUTES_PER_DAY, parse_day_column, parse_slot_column, parse_time_column
+
+
+SCHEMA_VERSION = 3      # 2: slots and appointments keyed by integer epoch-minutes
+                        # 3: patient ID sequence, email / telephone keys
+TABLES = ("availability", "appointments", "patients", "doctors")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS availability (
+    id INTEGER PRIMARY KEY,
+    start INTEGER NOT NULL,
+    specialization TEXT NOT NULL,
+    specialization_key TEXT NOT NULL,
+    doctor_name TEXT NOT NULL,
+    doctor_key TEXT NOT NULL,
+    is_available INTEGER NOT NULL,
+    id_patient INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_availability_doctor_start
+    ON availability (doctor_key, start);
+CREATE INDEX IF NOT EXISTS idx_availability_specialization_start
+    ON availability (specialization_key, start, is_available);
+CREATE INDEX IF NOT EXISTS idx_availability_patient
+    ON availability (id_patient);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    id INTEGER PRIMARY KEY,
+    patient_id INTEGER NOT NULL,
+    medecin_id INTEGER,
+    start INTEGER NOT NULL,
+    service TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_appointments_patient
+    ON appointments (patient_id, start);
+
+CREATE TABLE IF NOT EXISTS patients (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    nom TEXT,
+    email TEXT,
+    telephone TEXT,
+    date_naissance TEXT,
+    sexe TEXT,
+    addresse TEXT,
+    email_key TEXT,
+    telephone_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_patients_email_key ON patients (email_key);
+CREATE INDEX IF NOT EXISTS idx_patients_telephone_key ON patients (telephone_key);
+
+CREATE TABLE IF NOT EXISTS doctors (
+    ID INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL,
+    nom_key TEXT NOT NULL,
+    specialite TEXT,
+    qualification TEXT,
+    experience INTEGER,
+    disponibilite TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_doctors_nom_key ON doctors (nom_key);
+"""
+
+PATIENT_COLUMNS = ["ID", "nom", "email", "telephone", "date_naissance", "sexe", "addresse"]
+
+
+def _row_to_slot(row) -> Slot:
+    return Slot(
+        start=row["start"],
+        specialization=row["specialization"],
+        doctor_name=row["doctor_name"],
+        is_available=bool(row["is_available"]),
+        id_patient=row["id_patient"],
+    )
+
+
+def _day_range(day: int) -> tuple[int, int]:
+    """Inclusive epoch-minutes bounds of a day, for `start BETWEEN ? AND ?`."""
+    return day * MINUTES_PER_DAY, (day + 1) * MINUTES_PER_DAY - 1
+
+
+class SQLiteStorage(Storage):
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_schema()
+
+    def _init_schema(self):
+        conn = self.connection()
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version == SCHEMA_VERSION:
+            return
+        (tables,) = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()
+        if tables:
+            raise RuntimeError(
+                f"{self.db_path} uses schema version {version} (expected {SCHEMA_VERSION}); "
+                "re-import the CSV files with: python -m toolkit.sqlite_storage"
+            )
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # ----------------------------------------------------------
+    # CONNECTIONS / TRANSACTIONS
+    # ----------------------------------------------------------
+    def connection(self) -> sqlite3.Connection:
+        """Connection of the calling thread (created on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, statements):
+        """Run (sql, params) pairs in one immediate transaction; return rowcounts."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            counts = [conn.execute(sql, params).rowcount for sql, params in statements]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return counts
+
+    # ----------------------------------------------------------
+    # AVAILABILITY
+    # ----------------------------------------------------------
+    def get_slot(self, doctor_name, start):
+        row = self.connection().execute(
+            "SELECT * FROM availability WHERE doctor_key = ? AND start = ? ORDER BY id LIMIT 1",
+            (normalize_doctor(doctor_name), start),
+        ).fetchone()
+        return _row_to_slot(row) if row else None
+
+    def doctor_day(self, doctor_name, day):
+        rows = self.connection().execute(
+            "SELECT * FROM availability WHERE doctor_key = ? AND start BETWEEN ? AND ? ORDER BY start",
+            (normalize_doctor(doctor_name), *_day_range(day)),
+        ).fetchall()
+        return [_row_to_slot(row) for row in rows]
+
+    def specialization_day(self, specialization, day, available_only=True):
+        sql = "SELECT * FROM availability WHERE specialization_key = ? AND start BETWEEN ? AND ?"
+        if available_only:
+            sql += " AND is_available = 1"
+        rows = self.connection().execute(
+            sql + " ORDER BY id", (normalize_specialization(specialization), *_day_range(day))
+        ).fetchall()
+        return [_row_to_slot(row) for row in rows]
+
+    def count_booked(self, doctor_name, day):
+        (count,) = self.connection().execute(
+            "SELECT COUNT(*) FROM availability WHERE doctor_key = ? AND start BETWEEN ? AND ? AND is_available = 0",
+            (normalize_doctor(doctor_name), *_day_range(day)),
+        ).fetchone()
+        return count
+
+    def next_free(self, doctor_name, start, last_day=None):
+        sql = "SELECT MIN(start) FROM availability WHERE doctor_key = ? AND start >= ? AND is_available = 1"
+        params = [normalize_doctor(doctor_name), start]
+        if last_day is not None:
+            sql += " AND start <= ?"
+            params.append(_day_range(last_day)[1])
+        (found,) = self.connection().execute(sql, params).fetchone()
+        return found
+
+    def resolve_doctors(self, doctor_or_specialization):
+        conn = self.connection()
+        row = conn.execute(
+            "SELECT doctor_name FROM availability WHERE doctor_key = ? ORDER BY id LIMIT 1",
+            (normalize_doctor(doctor_or_specialization),),
+        ).fetchone()
+        if row:
+            return [row["doctor_name"]]
+        rows = conn.execute(
+            "SELECT doctor_name FROM availability WHERE specialization_key = ? GROUP BY doctor_key ORDER BY MIN(id)",
+            (normalize_specialization(doctor_or_specialization),),
+        ).fetchall()
+        return [row["doctor_name"] for row in rows]
+
+    def next_free_slots(self, doctor_names, start, n, last_day=None):
+        if not doctor_names:
+            return []
+        keys = {normalize_doctor(doctor_name): doctor_name for doctor_name in doctor_names}
+        sql = (
+            f"SELECT DISTINCT start, doctor_key FROM availability "
+            f"WHERE doctor_key IN ({', '.join('?' * len(keys))}) AND start >= ? AND is_available = 1"
+        )
+        params = [*keys, start]
+        if last_day is not None:
+            sql += " AND start <= ?"
+            params.append(_day_range(last_day)[1])
+        rows = self.connection().execute(sql + " ORDER BY start, doctor_key LIMIT ?", (*params, n)).fetchall()
+        return [(row["start"], keys[row["doctor_key"]]) for row in rows]
+
+    def mark_slot(self, doctor_name, start, is_available, id_patient=None):
+        (updated,) = self._write([(
+            "UPDATE availability SET is_available = ?, id_patient = ? WHERE doctor_key = ? AND start = ?",
+            (int(is_available), id_patient, normalize_doctor(doctor_name), start),
+        )])
+        return updated
+
+    # ----------------------------------------------------------
+    # BOOKINGS (one transaction each, one per batch for book_slots)
+    # ----------------------------------------------------------
+    def book_slot(self, doctor_name, start, patient_id):
+        doctor_key = normalize_doctor(doctor_name)
+        medecin_id = self.doctor_id(doctor_name) or 0
+
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # compare-and-set: only a free slot can be claimed
+            claimed = conn.execute(
+                "UPDATE availability SET is_available = 0, id_patient = ? "
+                "WHERE doctor_key = ? AND start = ? AND is_available = 1",
+                (patient_id, doctor_key, start),
+            ).rowcount
+            row = conn.execute(
+                "SELECT * FROM availability WHERE doctor_key = ? AND start = ? ORDER BY id LIMIT 1",
+                (doctor_key, start),
+            ).fetchone()
+            if not claimed:
+                conn.execute("ROLLBACK")
+                return (ALREADY_BOOKED, _row_to_slot(row)) if row else (NO_SLOT, None)
+
+            conn.execute(
+                "INSERT INTO appointments (patient_id, medecin_id, start, service) VALUES (?, ?, ?, ?)",
+                (patient_id, medecin_id, start, row["specialization"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return BOOKED, _row_to_slot(row)
+
+    def book_slots(self, bookings, all_or_nothing=False):
+        conn = self.connection()
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for doctor_name, start, patient_id in bookings:
+                doctor_key = normalize_doctor(doctor_name)
+                claimed = conn.execute(
+                    "UPDATE availability SET is_available = 0, id_patient = ? "
+                    "WHERE doctor_key = ? AND start = ? AND is_available = 1",
+                    (patient_id, doctor_key, start),
+                ).rowcount
+                row = conn.execute(
+                    "SELECT * FROM availability WHERE doctor_key = ? AND start = ? ORDER BY id LIMIT 1",
+                    (doctor_key, start),
+                ).fetchone()
+                if not claimed:
+                    results.append((ALREADY_BOOKED, _row_to_slot(row)) if row else (NO_SLOT, None))
+                    continue
+                conn.execute(
+                    "INSERT INTO appointments (patient_id, medecin_id, start, service) VALUES (?, ?, ?, ?)",
+                    (patient_id, self.doctor_id(doctor_name) or 0, start, row["specialization"]),
+                )
+                results.append((BOOKED, _row_to_slot(row)))
+
+            if all_or_nothing and any(status != BOOKED for status, _ in results):
+                conn.execute("ROLLBACK")
+                return [(NOT_BOOKED if status == BOOKED else status, slot) for status, slot in results]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return results
+
+    @staticmethod
+    def _no_slot(conn, doctor_key, start) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM availability WHERE doctor_key = ? AND start = ?", (doctor_key, start)
+        ).fetchone() is None
+
+    def cancel_booking(self, doctor_name, start, patient_id):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # only the patient's appointment with this doctor, and the slot the patient holds
+            # (appointments older than the availability table have no slot)
+            doctor_key = normalize_doctor(doctor_name)
+            deleted = conn.execute(
+                "DELETE FROM appointments WHERE patient_id = ? AND start = ? AND medecin_id = ?",
+                (patient_id, start, self.doctor_id(doctor_name) or 0),
+            ).rowcount
+            freed = conn.execute(
+                "UPDATE availability SET is_available = 1, id_patient = NULL "
+                "WHERE doctor_key = ? AND start = ? AND id_patient = ?",
+                (doctor_key, start, patient_id),
+            ).rowcount if deleted else 0
+            if not freed and not (deleted and self._no_slot(conn, doctor_key, start)):
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def move_booking(self, doctor_name, old_start, new_start, patient_id):
+        doctor_key = normalize_doctor(doctor_name)
+        medecin_id = self.doctor_id(doctor_name) or 0
+
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            appointment = conn.execute(
+                "SELECT id FROM appointments WHERE patient_id = ? AND start = ? AND medecin_id = ?",
+                (patient_id, old_start, medecin_id),
+            ).fetchone()
+            holds = conn.execute(
+                "SELECT 1 FROM availability WHERE doctor_key = ? AND start = ? AND id_patient = ?",
+                (doctor_key, old_start, patient_id),
+            ).fetchone()
+            # the patient must hold old_start with this doctor (or have an appointment without a slot)
+            if appointment is None or (holds is None and not self._no_slot(conn, doctor_key, old_start)):
+                conn.execute("ROLLBACK")
+                return NO_APPOINTMENT
+            if new_start == old_start:
+                conn.execute("ROLLBACK")
+                return RESCHEDULED
+
+            # claim the new slot first: if it is taken nothing has changed yet
+            claimed = conn.execute(
+                "UPDATE availability SET is_available = 0, id_patient = ? "
+                "WHERE doctor_key = ? AND start = ? AND is_available = 1",
+                (patient_id, doctor_key, new_start),
+            ).rowcount
+            if not claimed:
+                exists = conn.execute(
+                    "SELECT 1 FROM availability WHERE doctor_key = ? AND start = ?", (doctor_key, new_start)
+                ).fetchone()
+                conn.execute("ROLLBACK")
+                return ALREADY_BOOKED if exists else NO_SLOT
+
+            (specialization,) = conn.execute(
+                "SELECT specialization FROM availability WHERE doctor_key = ? AND start = ? ORDER BY id LIMIT 1",
+                (doctor_key, new_start),
+            ).fetchone()
+            conn.execute(
+                "UPDATE availability SET is_available = 1, id_patient = NULL "
+                "WHERE doctor_key = ? AND start = ? AND id_patient = ?",
+                (doctor_key, old_start, patient_id),
+            )
+            conn.execute(
+                "UPDATE appointments SET medecin_id = ?, start = ?, service = ? WHERE id = ?",
+                (medecin_id, new_start, specialization, appointment["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return RESCHEDULED
+
+    # ----------------------------------------------------------
+    # APPOINTMENTS
+    # ----------------------------------------------------------
+    def add_appointment(self, appointment):
+        self._write([(
+            "INSERT INTO appointments (patient_id, medecin_id, start, service) VALUES (?, ?, ?, ?)",
+            (appointment["patient_id"], appointment["medecin_id"], appointment["start"], appointment["service"]),
+        )])
+
+    def remove_appointment(self, patient_id, start):
+        (deleted,) = self._write([(
+            "DELETE FROM appointments WHERE patient_id = ? AND start = ? AND medecin_id IS NOT NULL",
+            (patient_id, start),
+        )])
+        return deleted > 0
+
+    def patient_appointments(self, patient_id):
+        rows = self.connection().execute(
+            "SELECT * FROM appointments WHERE patient_id = ? ORDER BY id", (patient_id,)
+        ).fetchall()
+        return [
+            {
+                "appointment_id": row["id"],
+                "patient_id": row["patient_id"],
+                "medecin_id": row["medecin_id"],
+                "start": row["start"],
+                "service": row["service"],
+            }
+            for row in rows
+        ]
+
+    # ----------------------------------------------------------
+    # PATIENTS
+    # ----------------------------------------------------------
+    def get_patient(self, patient_id):
+        row = self.connection().execute(
+            f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients WHERE ID = ?", (patient_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def patient_exists(self, patient_id):
+        return self.connection().execute(
+            "SELECT 1 FROM patients WHERE ID = ?", (patient_id,)
+        ).fetchone() is not None
+
+    @staticmethod
+    def _patient_duplicate(conn, fields, patient_id=None) -> Optional[tuple[str, int]]:
+        """(DUPLICATE_EMAIL | DUPLICATE_TELEPHONE, ID) of another patient using a value of `fields`."""
+        for field, key_column, key, status in (
+            ("email", "email_key", email_key, DUPLICATE_EMAIL),
+            ("telephone", "telephone_key", telephone_key, DUPLICATE_TELEPHONE),
+        ):
+            if not key(fields.get(field)):
+                continue
+            row = conn.execute(
+                f"SELECT ID FROM patients WHERE {key_column} = ? AND ID IS NOT ? ORDER BY ID LIMIT 1",
+                (key(fields[field]), patient_id),
+            ).fetchone()
+            if row:
+                return status, row["ID"]
+        return None
+
+    def create_patient(self, fields):
+        columns = [column for column in PATIENT_COLUMNS if column != "ID"]
+        conn = self.connection()
+        # the duplicate lookups and the insert share one write transaction
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            duplicate = self._patient_duplicate(conn, fields)
+            if duplicate is not None:
+                conn.execute("ROLLBACK")
+                return duplicate
+            cursor = conn.execute(
+                f"INSERT INTO patients ({', '.join(columns)}, email_key, telephone_key) "
+                f"VALUES ({', '.join('?' * (len(columns) + 2))})",
+                (*(fields.get(column, "") for column in columns),
+                 email_key(fields.get("email")), telephone_key(fields.get("telephone"))),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._index_patient(cursor.lastrowid)
+        return CREATED, cursor.lastrowid
+
+    def update_patient(self, patient_id, fields):
+        values = {column: fields[column] for column in fields if column in PATIENT_COLUMNS and column != "ID"}
+        if "email" in values:
+            values["email_key"] = email_key(values["email"])
+        if "telephone" in values:
+            values["telephone_key"] = telephone_key(values["telephone"])
+        if not values:
+            return (NOTHING_TO_UPDATE, patient_id) if self.patient_exists(patient_id) else (NO_PATIENT, None)
+
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            duplicate = self._patient_duplicate(conn, fields, patient_id)
+            if duplicate is not None:
+                conn.execute("ROLLBACK")
+                return duplicate
+            updated = conn.execute(
+                f"UPDATE patients SET {', '.join(f'{column} = ?' for column in values)} WHERE ID = ?",
+                (*values.values(), patient_id),
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not updated:
+            return NO_PATIENT, None
+        self._index_patient(patient_id)
+        return UPDATED, patient_id
+
+    def all_patients(self):
+        rows = self.connection().execute(
+            f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients ORDER BY ID"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # ----------------------------------------------------------
+    # DOCTORS
+    # ----------------------------------------------------------
+    def get_doctor(self, doctor_id):
+        row = self.connection().execute(
+            "SELECT * FROM doctors WHERE ID = ?", (doctor_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def doctor_id(self, doctor_name):
+        row = self.connection().execute(
+            "SELECT ID FROM doctors WHERE nom_key = ? ORDER BY ID LIMIT 1", (normalize_doctor(doctor_name),)
+        ).fetchone()
+        return row["ID"] if row else None
+
+    def doctor_names(self):
+        return dict(self.connection().execute("SELECT ID, nom FROM doctors").fetchall())
+
+
+# -------------------------------------------------------
+# ONE-SHOT CSV IMPORT
+# -------------------------------------------------------
+def import_csv(data_path: str, db_path: str) -> SQLiteStorage:
+    """
+    Load doctor_availability.csv, rendez_vous.csv, patients.csv and doctors.csv
+    into a SQLite database. The tables are dropped and recreated, so this also
+    upgrades a database created with an older schema.
+    """
+    with sqlite3.connect(db_path, isolation_level=None) as conn:
+        for table in TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute("PRAGMA user_version = 0")
+    storage = SQLiteStorage(db_path)
+
+    df_avl = load_csv(os.path.join(data_path, "doctor_availability.csv"))
+    df_app = load_csv(os.path.join(data_path, "rendez_vous.csv"))
+    df_patients = load_csv(os.path.join(data_path, "patients.csv"))
+    df_doctors = load_csv(os.path.join(data_path, "doctors.csv"))
+
+    availability_rows = [
+        (
+            int(start),
+            specialization, normalize_specialization(specialization),
+            doctor_name, normalize_doctor(doctor_name),
+            int(is_available), parse_patient_id(id_patient),
+        )
+        for start, specialization, doctor_name, is_available, id_patient in zip(
+            parse_slot_column(df_avl["date_availability"]), df_avl["specialization"], df_avl["doctor_name"],
+            df_avl["is_available"], df_avl["id_patient"]
+        )
+    ]
+    appointment_starts = (
+        parse_day_column(df_app["date rendez vous"]) * MINUTES_PER_DAY
+        + parse_time_column(df_app["heure rendez-vous"])
+    ) if len(df_app) else []
+    appointment_rows = [
+        (idx, int(patient_id), parse_patient_id(medecin_id), int(start), service)
+        for idx, (patient_id, medecin_id, start, service) in enumerate(
+            zip(df_app["patient_id"], df_app["medecin_id"], appointment_starts, df_app["service"])
+        )
+    ]
+    patient_rows = [
+        (int(values[0]), *values[1:], email_key(values[2]), telephone_key(values[3]))
+        for values in df_patients[PATIENT_COLUMNS].itertuples(index=False)
+    ]
+    doctor_rows = [
+        (int(doctor["ID"]), doctor["nom"], normalize_doctor(doctor["nom"]), doctor["specialite"],
+         doctor["qualification"], parse_patient_id(doctor["années d'expérience"]),
+         doctor["disponibilité par jour et heure"])
+        for doctor in df_doctors.to_dict("records")
+    ]
+
+    conn = storage.connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT INTO availability (start, specialization, specialization_key, "
+            "doctor_name, doctor_key, is_available, id_patient) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            availability_rows,
+        )
+        conn.executemany(
+            "INSERT INTO appointments (id, patient_id, medecin_id, start, service) VALUES (?, ?, ?, ?, ?)",
+            appointment_rows,
+        )
+        conn.executemany(
+            f"INSERT INTO patients ({', '.join(PATIENT_COLUMNS)}, email_key, telephone_key) "
+            f"VALUES ({', '.join('?' * (len(PATIENT_COLUMNS) + 2))})",
+            patient_rows,
+        )
+        conn.executemany(
+            "INSERT INTO doctors (ID, nom, nom_key, specialite, qualification, experience, disponibilite) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            doctor_rows,
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return storage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the CSV data files into a SQLite database.")
+    parser.add_argument("--data-path", default="data/")
+    parser.add_argument("--db", default=None, help="defaults to <data-path>/appointments.db")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(args.data_path, "appointments.db")
+    storage = import_csv(args.data_path, db_path)
+    conn = storage.connection()
+    for table in TABLES:
+        (count,) = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        print(f"{table}: {count} rows")
+    print(f"Imported into {db_path}")
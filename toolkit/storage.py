@@ -0,0 +1,669 @@
+"""
+Storage layer behind the toolkit tools.
+
+The tools only talk to a `Storage` object. Two backends are available:
+- "csv"    : the historical CSV files in DATA_PATH (default)
+- "sqlite" : an indexed SQLite database (see toolkit/sqlite_storage.py)
+
+The backend is selected with the STORAGE_BACKEND environment variable
+("csv" or "sqlite"); SQLITE_DB_PATH overrides the database location.
+"""
+import atexit
+import functools
+import heapq
+import os
+import threading
+from itertools import islice
+from typing import Optional
+
+from toolkit.appointment_book import APPOINTMENTS_FILE, AppointmentBook
+from toolkit.availability_store import AVAILABILITY_FILE, AvailabilityStore, Slot, normalize_doctor
+from toolkit.csv_loader import load_csv, write_csv
+from toolkit.journal import JOURNAL_FILE, BookingJournal, GroupCommitWriter
+from toolkit.patient_registry import COLUMNS as PATIENT_COLUMNS, PATIENTS_FILE, PatientRegistry
+from toolkit.patient_search import PatientSearchIndex
+from toolkit.schedules import compile_schedules
+from toolkit.timeslots import MINUTES_PER_DAY, parse_day, parse_slot, parse_time
+
+
+# book_slot / move_booking outcomes
+BOOKED = "booked"
+RESCHEDULED = "rescheduled"
+ALREADY_BOOKED = "already_booked"
+NO_SLOT = "no_slot"
+NO_APPOINTMENT = "no_appointment"
+NOT_BOOKED = "not_booked"       # bookable, but an all-or-nothing batch failed
+
+# create_patient / update_patient outcomes
+CREATED = "created"
+UPDATED = "updated"
+NOTHING_TO_UPDATE = "nothing_to_update"
+NO_PATIENT = "no_patient"
+DUPLICATE_EMAIL = "duplicate_email"
+DUPLICATE_TELEPHONE = "duplicate_telephone"
+
+
+# -------------------------------------------------------
+# BASE INTERFACE
+# -------------------------------------------------------
+class Storage:
+    """Operations needed by the toolkit tools, independent of the backend."""
+
+    _patient_index: Optional[PatientSearchIndex] = None
+    _patient_index_lock = threading.Lock()
+
+    # ---- availability ----
+    # slots and appointments are keyed by epoch-minutes, days by day number
+    # (see toolkit/timeslots.py)
+    def get_slot(self, doctor_name: str, start: int) -> Optional[Slot]:
+        raise NotImplementedError
+
+    def doctor_day(self, doctor_name: str, day: int) -> list[Slot]:
+        raise NotImplementedError
+
+    def specialization_day(self, specialization: str, day: int, available_only: bool = True) -> list[Slot]:
+        raise NotImplementedError
+
+    def mark_slot(self, doctor_name: str, start: int, is_available: bool,
+                  id_patient: Optional[int] = None) -> int:
+        raise NotImplementedError
+
+    def free_starts(self, doctor_name: str, day: int) -> list[int]:
+        """Starts of the doctor's free slots on a day, in order."""
+        return [slot.start for slot in self.doctor_day(doctor_name, day) if slot.is_available]
+
+    def count_free(self, doctor_name: str, day: int) -> int:
+        return len(self.free_starts(doctor_name, day))
+
+    def count_booked(self, doctor_name: str, day: int) -> int:
+        return sum(not slot.is_available for slot in self.doctor_day(doctor_name, day))
+
+    def next_free(self, doctor_name: str, start: int, last_day: Optional[int] = None) -> Optional[int]:
+        """First free start of the doctor at or after `start` (up to `last_day` included)."""
+        raise NotImplementedError
+
+    def resolve_doctors(self, doctor_or_specialization: str) -> list[str]:
+        """
+        Calendar names of the doctors matching a doctor name, or else of the
+        doctors of a specialization. Empty if neither matches.
+        """
+        raise NotImplementedError
+
+    def next_free_slots(self, doctor_names: list[str], start: int, n: int,
+                        last_day: Optional[int] = None) -> list[tuple[int, str]]:
+        """Earliest `n` free (start, doctor name) pairs at or after `start`, across the doctors."""
+        def free_slots(doctor_name):
+            found = self.next_free(doctor_name, start, last_day)
+            while found is not None:
+                yield found, doctor_name
+                found = self.next_free(doctor_name, found + 1, last_day)
+
+        # k-way merge of the per-doctor sorted streams, consumed lazily
+        return list(islice(heapq.merge(*(free_slots(doctor_name) for doctor_name in doctor_names)), n))
+
+    # ---- bookings (atomic) ----
+    def book_slot(self, doctor_name: str, start: int, patient_id: int) -> tuple[str, Optional[Slot]]:
+        """
+        Claim a free slot and record the appointment as one atomic operation.
+        Under concurrent calls for the same slot exactly one caller gets BOOKED;
+        the others get ALREADY_BOOKED. NO_SLOT if the slot does not exist.
+        """
+        raise NotImplementedError
+
+    def book_slots(self, bookings: list[tuple[str, int, int]],
+                   all_or_nothing: bool = False) -> list[tuple[str, Optional[Slot]]]:
+        """
+        Book several (doctor_name, start, patient_id) in one atomic write.
+        Each item gets BOOKED, ALREADY_BOOKED (also when an earlier item of
+        the batch takes the same slot) or NO_SLOT. With all_or_nothing,
+        nothing is written unless every item can be booked, and the items
+        that could have been booked get NOT_BOOKED.
+        """
+        raise NotImplementedError
+
+    def cancel_booking(self, doctor_name: str, start: int, patient_id: int) -> bool:
+        """
+        Remove the appointment and free the slot as one atomic operation.
+        False (nothing changes) unless the patient has an appointment with
+        this doctor at `start` and holds the doctor's slot.
+        """
+        raise NotImplementedError
+
+    def move_booking(self, doctor_name: str, old_start: int, new_start: int, patient_id: int) -> str:
+        """
+        Move a patient's appointment to another slot of the same doctor in one
+        atomic write. The new slot is checked first; on any failure nothing
+        changes. Returns RESCHEDULED, NO_APPOINTMENT (the patient does not
+        hold `old_start` with this doctor), NO_SLOT or ALREADY_BOOKED.
+        """
+        raise NotImplementedError
+
+    def _appointment_row(self, slot: Slot, doctor_name: str, patient_id: int) -> dict:
+        return {
+            "patient_id": patient_id,
+            "medecin_id": self.doctor_id(doctor_name) or 0,
+            "start": slot.start,
+            "service": slot.specialization
+        }
+
+    # ---- appointments ----
+    def add_appointment(self, appointment: dict):
+        raise NotImplementedError
+
+    def remove_appointment(self, patient_id: int, start: int) -> bool:
+        raise NotImplementedError
+
+    def patient_appointments(self, patient_id: int) -> list[dict]:
+        """The patient's appointments: dicts with appointment_id, medecin_id, start and service."""
+        raise NotImplementedError
+
+    # ---- patients ----
+    def get_patient(self, patient_id: int) -> Optional[dict]:
+        raise NotImplementedError
+
+    def patient_exists(self, patient_id: int) -> bool:
+        return self.get_patient(patient_id) is not None
+
+    def create_patient(self, fields: dict) -> tuple[str, int]:
+        """
+        Allocate the next patient ID and insert the patient in one atomic
+        write, unless the email or telephone is already registered.
+        Returns (CREATED, new ID) or (DUPLICATE_EMAIL | DUPLICATE_TELEPHONE,
+        ID of the patient already using it).
+        """
+        raise NotImplementedError
+
+    def update_patient(self, patient_id: int, fields: dict) -> tuple[str, Optional[int]]:
+        """
+        Change only the given fields of one patient, in place. Returns
+        (UPDATED, ID), (NOTHING_TO_UPDATE, ID) when no patient field is
+        given (nothing is written), (NO_PATIENT, None) or (DUPLICATE_EMAIL |
+        DUPLICATE_TELEPHONE, ID of the other patient using the value).
+        """
+        raise NotImplementedError
+
+    def all_patients(self) -> list[dict]:
+        raise NotImplementedError
+
+    # ---- patient search ----
+    def search_patients(self, query: str, k: int = 5) -> list[dict]:
+        """Up to k patients matching part of a name, telephone or email, best first."""
+        index = self._search_index()
+        return [patient for patient in map(self.get_patient, index.search(query, k)) if patient is not None]
+
+    def _search_index(self) -> PatientSearchIndex:
+        """The in-memory search index, built from all patients on first use."""
+        if self._patient_index is None:
+            with self._patient_index_lock:
+                if self._patient_index is None:
+                    self._patient_index = PatientSearchIndex(self.all_patients())
+        return self._patient_index
+
+    def _index_patient(self, patient_id: int):
+        """Keep the search index (if built) in step with a created or updated patient."""
+        if self._patient_index is None:
+            # an index being built may have read the patients before this change
+            with self._patient_index_lock:
+                if self._patient_index is None:
+                    return
+        patient = self.get_patient(patient_id)
+        if patient is not None:
+            self._patient_index.add(patient)
+
+    # ---- doctors ----
+    def get_doctor(self, doctor_id) -> Optional[dict]:
+        raise NotImplementedError
+
+    def doctor_id(self, doctor_name: str) -> Optional[int]:
+        raise NotImplementedError
+
+    def doctor_names(self) -> dict[int, str]:
+        """ID -> name map of the doctor directory (for joins with appointments)."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the backend; the process-wide storages are closed at exit."""
+
+
+# -------------------------------------------------------
+# CSV BACKEND
+# -------------------------------------------------------
+def _durable(method):
+    """Return from a CSVStorage write only once its journal events are on disk."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        ticket = getattr(self._tickets, "ticket", None)
+        if ticket is not None:
+            self._tickets.ticket = None
+            try:
+                self.writer.wait(ticket)     # outside self._lock: other writes join the batch
+            except Exception:
+                self._recover()
+                raise
+        return result
+    return wrapper
+
+
+class CSVStorage(Storage):
+    """
+    The CSV files in data_path are the database.
+
+    Availability and appointments are held in memory. Bookings and
+    cancellations are applied in memory at once and appended to a
+    journal by a group-commit writer (one fsync per batch of concurrent
+    writes, see toolkit/journal.py); a write returns once its batch is on
+    disk. If a batch cannot be written, the memory is rebuilt from the
+    files (what a restart would see) and its writes raise. The snapshot files are rewritten by a compaction every
+    `compact_every` events (JOURNAL_COMPACT_EVERY, default 500) and on
+    close(), so the cost of a write does not grow with the size of the
+    files. Until then, code reading the CSV files directly instead of
+    going through get_storage() does not see the journaled writes.
+
+    With `schedule_slots` (SCHEDULE_SLOTS=1), the working hours of
+    doctors.csv generate the slots and doctor_availability.csv only holds
+    the exceptions (bookings, closures, extra slots).
+    """
+
+    def __init__(self, data_path: str, compact_every: Optional[int] = None,
+                 schedule_slots: Optional[bool] = None):
+        self.data_path = data_path
+        self.compact_every = compact_every or int(os.getenv("JOURNAL_COMPACT_EVERY", "500"))
+        if schedule_slots is None:
+            schedule_slots = os.getenv("SCHEDULE_SLOTS", "0").lower() in ("1", "true", "yes")
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compacting = False
+
+        self._doctors_frame = None
+        self._schedules = compile_schedules(self._doctor_directory().values()) if schedule_slots else None
+        self.journal = BookingJournal(self._path(JOURNAL_FILE))
+        self.writer = GroupCommitWriter(self.journal)
+        self._tickets = threading.local()           # ticket of the current thread's last write
+        self._uncompacted = self.journal.pending    # events journaled since the last compaction
+        self._loaded_through = 0                    # writer tickets reflected by the files at the last load
+        self._load()
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.data_path, file_name)
+
+    def _load(self):
+        """Read the snapshot files, then replay what was journaled after the last compaction."""
+        self.availability = AvailabilityStore(
+            self._path(AVAILABILITY_FILE), write_through=False, schedules=self._schedules,
+        )
+        self.appointments = AppointmentBook(self._path(APPOINTMENTS_FILE))
+        self.patients = PatientRegistry(self._path(PATIENTS_FILE))
+        self._patient_index = None
+        for event in self.journal.unapplied_events():
+            self._apply(event)
+
+    # ---- journal ----
+    @staticmethod
+    def _event_start(event: dict, key: str = "start") -> int:
+        """Start of an event; journals written before integer keys carry strings."""
+        if key in event:
+            return event[key]
+        if key == "start" and "slot" in event:
+            return parse_slot(event["slot"])
+        if key == "old_start":
+            return parse_slot(event["old_slot"])
+        return parse_day(event["day"]) * MINUTES_PER_DAY + parse_time(event["time"])
+
+    @staticmethod
+    def _event_appointment(event: dict) -> dict:
+        appointment = dict(event["appointment"])
+        if "start" not in appointment:
+            appointment["start"] = (
+                parse_day(appointment.pop("date rendez vous")) * MINUTES_PER_DAY
+                + parse_time(appointment.pop("heure rendez-vous"))
+            )
+        return appointment
+
+    def _apply(self, event: dict):
+        op = event["op"]
+        if op == "book":
+            self.availability.mark(event["doctor"], self._event_start(event), False, event["patient_id"])
+            self.appointments.ensure(self._event_appointment(event))
+        elif op == "cancel":
+            start = self._event_start(event)
+            self.appointments.remove(event["patient_id"], start, self.doctor_id(event["doctor"]) or 0)
+            self.availability.mark(event["doctor"], start, True, None)
+        elif op == "move":
+            old_start = self._event_start(event, "old_start")
+            self.appointments.remove(event["patient_id"], old_start, self.doctor_id(event["doctor"]) or 0)
+            self.availability.mark(event["doctor"], old_start, True, None)
+            self.availability.mark(event["doctor"], self._event_start(event), False, event["patient_id"])
+            self.appointments.ensure(self._event_appointment(event))
+        elif op == "mark":
+            self.availability.mark(
+                event["doctor"], self._event_start(event), event["is_available"], event["id_patient"]
+            )
+        elif op == "add_appointment":
+            self.appointments.ensure(self._event_appointment(event))
+        elif op == "remove_appointment":
+            self.appointments.remove(event["patient_id"], self._event_start(event, "appointment_start"))
+        elif op == "create_patient":
+            self.patients.ensure(event["patient"])
+            self._index_patient(event["patient"]["ID"])
+        elif op == "update_patient":
+            self.patients.update(event["patient_id"], event["fields"])
+            self._index_patient(event["patient_id"])
+        else:
+            raise ValueError(f"Unknown journal event: {op}")
+
+    def _commit(self, *events: dict):
+        """
+        Apply the events in memory and queue them for the journal, in that
+        order for every writer. Caller holds self._lock; the public write
+        method waits for the journal write once the lock is released (@_durable).
+        """
+        for event in events:
+            self._apply(event)
+        self._tickets.ticket = self.writer.submit(list(events))
+        self._uncompacted += len(events)
+        if self._uncompacted >= self.compact_every and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def _reload_if_failed(self):
+        """
+        Caller holds self._compact_lock and self._lock. Once the writer is
+        idle, drop from memory the writes of failed batches by loading the
+        files again (they only hold the batches that were written).
+        """
+        submitted = self.writer.drain()
+        if self.writer.last_failed > self._loaded_through:
+            self._load()
+        self._loaded_through = submitted
+
+    def _recover(self):
+        """Called by a write whose journal batch failed."""
+        with self._compact_lock, self._lock:
+            self._reload_if_failed()
+
+    def compact(self):
+        """Rewrite the snapshot files from memory and drop the journaled events."""
+        with self._compact_lock:
+            try:
+                with self._lock:
+                    # never write a failed batch into the snapshots
+                    self._reload_if_failed()
+                    self.journal.rotate()
+                    self._uncompacted = 0
+                    df_avl = self.availability.to_frame()
+                    df_app = self.appointments.to_frame()
+                    df_pat = self.patients.to_frame() if self.patients.dirty else None
+                    self.patients.dirty = False
+                # the slow part runs without blocking bookings
+                try:
+                    self.availability.save(df_avl)
+                    self.appointments.save(df_app)
+                    if df_pat is not None:
+                        self.patients.save(df_pat)
+                except Exception:
+                    self.patients.dirty = self.patients.dirty or df_pat is not None
+                    raise
+                self.journal.discard_rotated()
+            finally:
+                self._compacting = False
+
+    def close(self):
+        """Write the queued journal events, fold them into the snapshot files and release the journal."""
+        self.writer.close()
+        try:
+            if self._uncompacted or os.path.exists(self.journal.compacting_path):
+                self.compact()
+        finally:
+            self.journal.close()
+
+    # ---- availability ----
+    def get_slot(self, doctor_name, start):
+        return self.availability.get_slot(doctor_name, start)
+
+    def doctor_day(self, doctor_name, day):
+        return self.availability.doctor_day(doctor_name, day)
+
+    def specialization_day(self, specialization, day, available_only=True):
+        return self.availability.specialization_day(specialization, day, available_only)
+
+    def free_starts(self, doctor_name, day):
+        return self.availability.free_starts(doctor_name, day)
+
+    def count_free(self, doctor_name, day):
+        return self.availability.count_free(doctor_name, day)
+
+    def count_booked(self, doctor_name, day):
+        return self.availability.count_booked(doctor_name, day)
+
+    def next_free(self, doctor_name, start, last_day=None):
+        return self.availability.next_free(doctor_name, start, last_day)
+
+    def resolve_doctors(self, doctor_or_specialization):
+        doctor_name = self.availability.doctor_name(doctor_or_specialization)
+        if doctor_name is not None:
+            return [doctor_name]
+        return self.availability.specialization_doctors(doctor_or_specialization)
+
+    @_durable
+    def mark_slot(self, doctor_name, start, is_available, id_patient=None):
+        with self._lock:
+            if self.availability.get_slot(doctor_name, start) is None:
+                return 0
+            self._commit({
+                "op": "mark", "doctor": doctor_name, "start": start,
+                "is_available": is_available, "id_patient": id_patient,
+            })
+            return 1
+
+    # ---- bookings (atomic) ----
+    @_durable
+    def book_slot(self, doctor_name, start, patient_id):
+        # the lock makes check-and-claim a compare-and-set; the single journal
+        # line carrying both the slot and the appointment is the commit point
+        with self._lock:
+            slot = self.availability.get_slot(doctor_name, start)
+            if slot is None:
+                return NO_SLOT, None
+            if not slot.is_available:
+                return ALREADY_BOOKED, slot
+            self._commit({
+                "op": "book", "doctor": doctor_name, "start": start, "patient_id": patient_id,
+                "appointment": self._appointment_row(slot, doctor_name, patient_id),
+            })
+            return BOOKED, slot
+
+    @_durable
+    def book_slots(self, bookings, all_or_nothing=False):
+        with self._lock:
+            results, events, claimed = [], [], set()
+            for doctor_name, start, patient_id in bookings:
+                slot = self.availability.get_slot(doctor_name, start)
+                if slot is None:
+                    results.append((NO_SLOT, None))
+                elif not slot.is_available or (normalize_doctor(doctor_name), start) in claimed:
+                    results.append((ALREADY_BOOKED, slot))
+                else:
+                    claimed.add((normalize_doctor(doctor_name), start))
+                    results.append((BOOKED, slot))
+                    events.append({
+                        "op": "book", "doctor": doctor_name, "start": start, "patient_id": patient_id,
+                        "appointment": self._appointment_row(slot, doctor_name, patient_id),
+                    })
+            if all_or_nothing and len(events) < len(bookings):
+                return [(NOT_BOOKED if status == BOOKED else status, slot) for status, slot in results]
+            # every booking of the batch in one journal write (one fsync)
+            if events:
+                self._commit(*events)
+            return results
+
+    def _holds(self, doctor_name, start, patient_id) -> bool:
+        """
+        Whether the patient has an appointment with this doctor at `start` and
+        holds the doctor's slot (appointments older than the availability file
+        have no slot: the appointment alone counts then).
+        """
+        slot = self.availability.get_slot(doctor_name, start)
+        if slot is not None and slot.id_patient != patient_id:
+            return False
+        return bool(self.appointments.find(patient_id, start, self.doctor_id(doctor_name) or 0))
+
+    @_durable
+    def cancel_booking(self, doctor_name, start, patient_id):
+        with self._lock:
+            if not self._holds(doctor_name, start, patient_id):
+                return False
+            self._commit({"op": "cancel", "doctor": doctor_name, "start": start, "patient_id": patient_id})
+            return True
+
+    @_durable
+    def move_booking(self, doctor_name, old_start, new_start, patient_id):
+        with self._lock:
+            if not self._holds(doctor_name, old_start, patient_id):
+                return NO_APPOINTMENT
+            if new_start == old_start:
+                return RESCHEDULED
+            slot = self.availability.get_slot(doctor_name, new_start)
+            if slot is None:
+                return NO_SLOT
+            if not slot.is_available:
+                return ALREADY_BOOKED
+            self._commit({
+                "op": "move", "doctor": doctor_name, "patient_id": patient_id,
+                "old_start": old_start, "start": new_start,
+                "appointment": self._appointment_row(slot, doctor_name, patient_id),
+            })
+            return RESCHEDULED
+
+    # ---- appointments ----
+    @_durable
+    def add_appointment(self, appointment):
+        with self._lock:
+            self._commit({"op": "add_appointment", "appointment": appointment})
+
+    @_durable
+    def remove_appointment(self, patient_id, start):
+        with self._lock:
+            if not self.appointments.find(patient_id, start):
+                return False
+            self._commit({"op": "remove_appointment", "patient_id": patient_id, "appointment_start": start})
+            return True
+
+    def patient_appointments(self, patient_id):
+        return self.appointments.for_patient(patient_id)
+
+    # ---- patients ----
+    def get_patient(self, patient_id):
+        return self.patients.get(patient_id)
+
+    def patient_exists(self, patient_id):
+        return patient_id in self.patients
+
+    def all_patients(self):
+        return self.patients.records()
+
+    @_durable
+    def create_patient(self, fields):
+        # allocation, duplicate check and the journal line happen under one lock
+        with self._lock:
+            duplicate = self.patients.find_duplicate(fields)
+            if duplicate is not None:
+                return self._duplicate_status(duplicate)
+            patient_id = self.patients.next_id
+            self._commit({"op": "create_patient", "patient": {**fields, "ID": patient_id}})
+            return CREATED, patient_id
+
+    @_durable
+    def update_patient(self, patient_id, fields):
+        # one journal line with the changed fields, whatever the size of patients.csv
+        fields = {column: value for column, value in fields.items() if column in PATIENT_COLUMNS and column != "ID"}
+        with self._lock:
+            if patient_id not in self.patients:
+                return NO_PATIENT, None
+            if not fields:
+                return NOTHING_TO_UPDATE, patient_id
+            duplicate = self.patients.find_duplicate(fields, patient_id)
+            if duplicate is not None:
+                return self._duplicate_status(duplicate)
+            self._commit({"op": "update_patient", "patient_id": patient_id, "fields": fields})
+            return UPDATED, patient_id
+
+    @staticmethod
+    def _duplicate_status(duplicate: tuple[str, int]) -> tuple[str, int]:
+        field, owner = duplicate
+        return (DUPLICATE_EMAIL if field == "email" else DUPLICATE_TELEPHONE), owner
+
+    # ---- doctors ----
+    def _doctor_directory(self) -> dict[int, dict]:
+        """
+        Doctor directory, indexed by ID and by normalized name (first ID wins).
+        Rebuilt only when the loader hands out a new frame (doctors.csv changed).
+        """
+        df = load_csv(self._path("doctors.csv"))
+        if df is not self._doctors_frame:
+            doctors = {int(record["ID"]): record for record in df.to_dict("records")}
+            doctor_ids = {}
+            for doctor_id in sorted(doctors):
+                doctor_ids.setdefault(normalize_doctor(doctors[doctor_id]["nom"]), doctor_id)
+            self._doctors, self._doctor_ids, self._doctors_frame = doctors, doctor_ids, df
+        return self._doctors
+
+    def get_doctor(self, doctor_id):
+        return self._doctor_directory().get(doctor_id)
+
+    def doctor_id(self, doctor_name):
+        self._doctor_directory()
+        return self._doctor_ids.get(normalize_doctor(doctor_name))
+
+    def doctor_names(self):
+        return {doctor_id: doctor["nom"] for doctor_id, doctor in self._doctor_directory().items()}
+
+
+# -------------------------------------------------------
+# BACKEND SELECTION
+# -------------------------------------------------------
+_storages: dict[str, Storage] = {}
+_storages_lock = threading.Lock()
+
+
+def create_storage(data_path: str, backend: Optional[str] = None) -> Storage:
+    backend = (backend or os.getenv("STORAGE_BACKEND", "csv")).lower()
+    if backend == "csv":
+        return CSVStorage(data_path)
+    if backend == "sqlite":
+        from toolkit.sqlite_storage import SQLiteStorage
+        db_path = os.getenv("SQLITE_DB_PATH") or os.path.join(data_path, "appointments.db")
+        return SQLiteStorage(db_path)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def get_storage(data_path: str) -> Storage:
+    """Return the process-wide storage for a data directory."""
+    key = os.path.abspath(data_path)
+    storage = _storages.get(key)
+    if storage is None:
+        with _storages_lock:
+            storage = _storages.get(key)
+            if storage is None:
+                storage = create_storage(data_path)
+                _storages[key] = storage
+    return storage
+
+
+@atexit.register
+def _close_storages():
+    with _storages_lock:
+        storages = list(_storages.values())
+        _storages.clear()
+    for storage in storages:
+        storage.close()
+
+
+def set_storage(data_path: str, storage: Optional[Storage]):
+    """Install (or with None, drop) the storage used for a data directory."""
+    key = os.path.abspath(data_path)
+    with _storages_lock:
+        if storage is None:
+            _storages.pop(key, None)
+        else:
+            _storages[key] = storage
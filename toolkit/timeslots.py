@@ -0,0 +1,99 @@
+"""
+Integer time keys for slots and appointments.
+
+Internally a slot is identified by its start in minutes since
+1970-01-01 00:00 (clinic local time, no timezone), and a day by its day
+number (start // MINUTES_PER_DAY). Sorting, range scans and joins are
+then plain integer operations.
+
+The string formats ("DD-MM-YYYY HH:MM" in tool arguments and
+doctor_availability.csv, "YYYY-MM-DD" + "HH:MM" in rendez_vous.csv) are
+only parsed and rendered at the boundaries, with the helpers below.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+MINUTES_PER_DAY = 24 * 60
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_EPOCH = pd.Timestamp("1970-01-01")
+_ONE_MINUTE = pd.Timedelta(minutes=1)
+
+
+# -------------------------------------------------------
+# SCALAR PARSING / RENDERING
+# -------------------------------------------------------
+def parse_day(value: str) -> int:
+    """'DD-MM-YYYY' or 'YYYY-MM-DD' -> day number."""
+    value = value.strip()
+    if len(value) == 10 and value[4] == "-":
+        year, month, day = int(value[0:4]), int(value[5:7]), int(value[8:10])
+    else:
+        day, month, year = int(value[0:2]), int(value[3:5]), int(value[6:10])
+    return date(year, month, day).toordinal() - _EPOCH_ORDINAL
+
+
+def parse_time(value: str) -> int:
+    """'HH:MM' (or 'H:MM') -> minute of the day."""
+    hours, minutes = value.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_slot(value: str) -> int:
+    """'DD-MM-YYYY HH:MM' -> epoch-minutes."""
+    day, time = value.strip().split(" ")
+    return parse_day(day) * MINUTES_PER_DAY + parse_time(time)
+
+
+def day_of(start: int) -> int:
+    return start // MINUTES_PER_DAY
+
+
+def to_date(day: int) -> date:
+    return date.fromordinal(day + _EPOCH_ORDINAL)
+
+
+def format_day(day: int, iso: bool = False) -> str:
+    """Day number -> 'DD-MM-YYYY' (or 'YYYY-MM-DD' with iso=True)."""
+    d = to_date(day)
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d}" if iso else f"{d.day:02d}-{d.month:02d}-{d.year:04d}"
+
+
+def format_time(start: int) -> str:
+    """Epoch-minutes (or minute of the day) -> 'HH:MM'."""
+    minute = start % MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def format_slot(start: int) -> str:
+    """Epoch-minutes -> 'DD-MM-YYYY HH:MM'."""
+    return f"{format_day(day_of(start))} {format_time(start)}"
+
+
+# -------------------------------------------------------
+# VECTORIZED PARSING (CSV loading)
+# -------------------------------------------------------
+def parse_slot_column(values: pd.Series) -> np.ndarray:
+    """Series of 'DD-MM-YYYY HH:MM' -> int64 epoch-minutes."""
+    parsed = pd.to_datetime(values.str.strip(), format="%d-%m-%Y %H:%M")
+    return ((parsed - _EPOCH) // _ONE_MINUTE).to_numpy(dtype=np.int64)
+
+
+def parse_day_column(values: pd.Series) -> np.ndarray:
+    """Series of 'DD-MM-YYYY' and/or 'YYYY-MM-DD' -> int64 day numbers."""
+    values = values.str.strip()
+    iso = values.str[4] == "-"
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    if iso.any():
+        parsed[iso] = pd.to_datetime(values[iso], format="%Y-%m-%d")
+    if (~iso).any():
+        parsed[~iso] = pd.to_datetime(values[~iso], format="%d-%m-%Y")
+    return ((parsed - _EPOCH) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+
+
+def parse_time_column(values: pd.Series) -> np.ndarray:
+    """Series of 'HH:MM' -> int64 minute of the day."""
+    parts = values.str.strip().str.split(":", n=1, expand=True)
+    return (parts[0].astype(np.int64) * 60 + parts[1].astype(np.int64)).to_numpy(dtype=np.int64)
@@ -1,75 +1,165 @@
-import pandas as pd
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import attrgetter
+from typing import Optional
+
 from langchain_core.tools import tool
 from data_models.models import (
     DateModel,
+    BookingRequestModel,
     DateTimeModel,
     IdentificationNumberModel,
-    PatientModel
+    NewPatientModel,
+    PatientSearchModel,
+    PatientUpdateModel,
+    SlotSearchModel
+)
+from toolkit.idempotency import operations
+from toolkit.storage import (
+    ALREADY_BOOKED,
+    BOOKED,
+    DUPLICATE_EMAIL,
+    DUPLICATE_TELEPHONE,
+    NO_APPOINTMENT,
+    NO_PATIENT,
+    NO_SLOT,
+    NOTHING_TO_UPDATE,
+    NOT_BOOKED,
+    RESCHEDULED,
+    get_storage,
 )
+from toolkit.timeslots import MINUTES_PER_DAY, day_of, format_day, format_slot, format_time, parse_day, parse_slot
 
 
 DATA_PATH = "data/"   # important ! adapt path if needed
 
 
+# -------------------------------------------------------
+# ASYNC VARIANTS
+# -------------------------------------------------------
+# Every tool is also a coroutine tool (tool.ainvoke / async agents): the
+# blocking body runs on a bounded executor shared by all tools, so the event
+# loop of an async server is never blocked and at most TOOL_WORKERS tool
+# calls touch the storage at the same time.
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="toolkit")
+
+
+def _async_variant(sync_tool):
+    """Register a coroutine running the tool's function on the tool executor."""
+    func = sync_tool.func
+
+    @functools.wraps(func)
+    async def coroutine(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # the request context (e.g. its idempotency key) follows the call into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
+
+    sync_tool.coroutine = coroutine
+    return sync_tool
+
+
+# -------------------------------------------------------
+# IDEMPOTENCY
+# -------------------------------------------------------
+# Tools that change data run once per key derived from the idempotency key of
+# the /execute request being handled and their arguments (request_scope): a
+# replayed request returns the first results without touching the storage
+# again. The key is not a tool argument, so the LLM cannot make one up.
+def _idempotent(scope: str, arguments: dict, operation):
+    return operations.run(scope, None, arguments, operation)
+
+
+# -------------------------------------------------------
+# DATES
+# -------------------------------------------------------
+# The models only check the format of a date: an impossible calendar date
+# (31-02-2025) is reported by the tool like a date without slots.
+def _parse(parser, value: str) -> Optional[int]:
+    """parse_slot / parse_day, or None for an impossible calendar date."""
+    try:
+        return parser(value)
+    except ValueError:
+        return None
+
+
+# -------------------------------------------------------
+# STRUCTURED AVAILABILITY RESULTS
+# -------------------------------------------------------
+# The availability tools first build plain structured results, then render
+# them in a single join (no per-slot string concatenation).
+def _doctor_day_availability(storage, doctor_name: str, day: int) -> tuple[list[str], int]:
+    """(free times in order, number of booked slots) of a doctor on a day."""
+    free_times = [format_time(start) for start in storage.free_starts(doctor_name, day)]
+    return free_times, storage.count_booked(doctor_name, day)
+
+
+def _specialization_day_availability(storage, specialization: str, day: int) -> list[tuple[str, list[str]]]:
+    """(doctor name, free times in order) for each doctor of a specialization on a day."""
+    slots = sorted(storage.specialization_day(specialization, day), key=attrgetter("doctor_name", "start"))
+    return [
+        (doctor_name, [slot.time for slot in doctor_slots])
+        for doctor_name, doctor_slots in groupby(slots, key=attrgetter("doctor_name"))
+    ]
+
+
 # -------------------------------------------------------
 # 1) CHECK AVAILABILITY BY DOCTOR
 # -------------------------------------------------------
+@_async_variant
 @tool
 def check_availability_by_doctor(desired_date: str, doctor_name: str):
     """
     Return all available time slots for a doctor in a given day.
     Date format: DD-MM-YYYY HH:MM (for specific time) or DD-MM-YYYY (for all day slots)
     """
+    storage = get_storage(DATA_PATH)
+
     # Check if date includes time
     if " " in desired_date:
         # Specific time check
         date_model = DateTimeModel(date=desired_date)
-        df = pd.read_csv(DATA_PATH + "doctor_availability.csv")
-        
+
         # Find exact time slot
-        slot = df[
-            (df["date_availability"] == date_model.date) &
-            (df["doctor_name"].str.lower() == doctor_name.lower())
-        ]
-        
-        if len(slot) == 0:
+        start = _parse(parse_slot, date_model.date)
+        slot = storage.get_slot(doctor_name, start) if start is not None else None
+
+        if slot is None:
             return f"No time slot found for Dr {doctor_name} at {date_model.date}"
-        
-        is_available = slot.iloc[0]["is_available"]
-        if is_available:
+
+        if slot.is_available:
             return f"Dr {doctor_name} is available at {date_model.date}"
         else:
             return f"Dr {doctor_name} is NOT available at {date_model.date} (already booked)"
     else:
         # Daily availability check - show all time slots
         date_model = DateModel(date=desired_date)
-        df = pd.read_csv(DATA_PATH + "doctor_availability.csv")
-        
-        # Filter by date (partial match) + doctor
-        day_rows = df[
-            (df["date_availability"].str.startswith(date_model.date)) &
-            (df["doctor_name"].str.lower() == doctor_name.lower())
-        ]
-        
-        if len(day_rows) == 0:
+
+        # free slots and booked count come from the doctor-day bitmap
+        day = _parse(parse_day, date_model.date)
+        if day is None:
+            return f"No availability found for Dr {doctor_name} on {date_model.date}"
+        free_times, booked_count = _doctor_day_availability(storage, doctor_name, day)
+
+        if len(free_times) == 0 and booked_count == 0:
             return f"No availability found for Dr {doctor_name} on {date_model.date}"
-        
-        # Separate available and booked slots
-        available_slots = day_rows[day_rows["is_available"] == True]
-        booked_slots = day_rows[day_rows["is_available"] == False]
-        
-        if len(available_slots) == 0:
+
+        if len(free_times) == 0:
             return f"Dr {doctor_name} has no available slots on {date_model.date}. All slots are booked."
-        
+
         # Format output
-        output = f"Available time slots for Dr {doctor_name} on {date_model.date}:\n"
-        for _, slot in available_slots.iterrows():
-            time = slot["date_availability"].split(" ")[1] if " " in slot["date_availability"] else "Unknown time"
-            output += f"- {time}\n"
-        
-        if len(booked_slots) > 0:
-            output += f"\nBooked slots: {len(booked_slots)} time slots are already taken."
-        
+        lines = [f"Available time slots for Dr {doctor_name} on {date_model.date}:"]
+        lines += [f"- {time}" for time in free_times]
+        output = "\n".join(lines) + "\n"
+
+        if booked_count > 0:
+            output += f"\nBooked slots: {booked_count} time slots are already taken."
+
         return output
 
 
@@ -77,6 +167,7 @@ def check_availability_by_doctor(desired_date: str, doctor_name: str):
 # -------------------------------------------------------
 # 2) CHECK AVAILABILITY BY SPECIALIZATION
 # -------------------------------------------------------
+@_async_variant
 @tool
 def check_availability_by_specialization(desired_date: str, specialization: str):
     """
@@ -84,42 +175,29 @@ def check_availability_by_specialization(desired_date: str, specialization: str)
     Date format: DD-MM-YYYY (shows all time slots for the day)
     """
     date_model = DateModel(date=desired_date)
-    df = pd.read_csv(DATA_PATH + "doctor_availability.csv")
+    storage = get_storage(DATA_PATH)
 
-    # Filter by date (partial match) + specialization + available
-    rows = df[
-        (df["date_availability"].str.startswith(date_model.date)) &
-        (df["specialization"].str.lower() == specialization.lower()) &
-        (df["is_available"] == True)
-    ]
+    # Available slots of the specialization on that day, grouped by doctor
+    day = _parse(parse_day, date_model.date)
+    doctors = _specialization_day_availability(storage, specialization, day) if day is not None else []
 
-    if len(rows) == 0:
+    if len(doctors) == 0:
         return f"No doctors available in {specialization} on {date_model.date}"
 
-    # Group by doctor and collect available time slots
-    doctors_data = {}
-    for _, row in rows.iterrows():
-        doctor_name = row["doctor_name"]
-        time_slot = row["date_availability"].split(" ")[1] if " " in row["date_availability"] else "Unknown"
-        
-        if doctor_name not in doctors_data:
-            doctors_data[doctor_name] = []
-        doctors_data[doctor_name].append(time_slot)
-    
     # Format output
-    output = f"Available {specialization} doctors for {date_model.date}:\n\n"
-    for doctor_name, time_slots in doctors_data.items():
-        output += f"Dr {doctor_name}:\n"
-        for time_slot in sorted(time_slots):
-            output += f"  - {time_slot}\n"
-        output += f"  Total available slots: {len(time_slots)}\n\n"
-    
-    return output
+    lines = [f"Available {specialization} doctors for {date_model.date}:", ""]
+    for doctor_name, time_slots in doctors:
+        lines.append(f"Dr {doctor_name}:")
+        lines += [f"  - {time_slot}" for time_slot in time_slots]
+        lines += [f"  Total available slots: {len(time_slots)}", ""]
+
+    return "\n".join(lines) + "\n"
 
 
 # -------------------------------------------------------
 # 3) SET APPOINTMENT
 # -------------------------------------------------------
+@_async_variant
 @tool
 def set_appointment(desired_date: str, id_number: int, doctor_name: str):
     """
@@ -131,56 +209,134 @@ def set_appointment(desired_date: str, id_number: int, doctor_name: str):
     """
     date_model = DateTimeModel(date=desired_date)
     id_model = IdentificationNumberModel(id=id_number)
-    
-    df = pd.read_csv(DATA_PATH + "doctor_availability.csv")
 
-    # check availability for exact time slot
-    case = df[
-        (df["date_availability"] == date_model.date) &
-        (df["doctor_name"].str.lower() == doctor_name.lower()) &
-        (df["is_available"] == True)
-    ]
+    def book():
+        start = _parse(parse_slot, date_model.date)
+        if start is None:
+            return f"No time slot found for Dr {doctor_name} at {date_model.date}."
 
-    if len(case) == 0:
-        # Check if slot exists but is booked
-        slot_exists = df[
-            (df["date_availability"] == date_model.date) &
-            (df["doctor_name"].str.lower() == doctor_name.lower())
-        ]
-        if len(slot_exists) > 0:
-            return f"Time slot {date_model.date} for Dr {doctor_name} is already booked."
-        else:
+        # claim the slot and record the appointment atomically:
+        # concurrent bookings of the same slot get exactly one winner
+        status, _ = get_storage(DATA_PATH).book_slot(doctor_name, start, id_model.id)
+
+        if status == NO_SLOT:
             return f"No time slot found for Dr {doctor_name} at {date_model.date}."
+        if status == ALREADY_BOOKED:
+            return f"Time slot {date_model.date} for Dr {doctor_name} is already booked."
 
-    # book appointment in rendez_vous.csv
-    df_app = pd.read_csv(DATA_PATH + "rendez_vous.csv")
+        return f"Appointment successfully created for {date_model.date}."
 
-    new_row = {
-        "patient_id": id_model.id,
-        "medecin_id": case.iloc[0].get("id_patient", 0),
-        "date rendez vous": date_model.date.split(" ")[0],  # Date part only
-        "heure rendez-vous": date_model.date.split(" ")[1],  # Time part
-        "service": case.iloc[0]["specialization"]
-    }
+    arguments = {"desired_date": date_model.date, "id_number": id_model.id, "doctor_name": doctor_name}
+    return _idempotent("set_appointment", arguments, book)
+
+
+# -------------------------------------------------------
+# 3b) BULK BOOKING (tool + POST /appointments/bulk)
+# -------------------------------------------------------
+INVALID = "invalid"
+
+
+def book_appointments(appointments: list[dict], all_or_nothing: bool = False) -> list[dict]:
+    """
+    Validate every requested appointment, then book the valid ones in one
+    atomic storage write. An item with an old_date moves the patient's
+    appointment with that doctor from old_date to desired_date instead
+    (move_booking: each move is atomic on its own, and runs after the
+    bookings). Returns one result per request, in order:
+    {"desired_date", "old_date", "id_number", "doctor_name", "status", "message"}.
+    With all_or_nothing, nothing is booked unless every booking succeeds, and
+    the moves only run if it did; a failed move does not undo the bookings.
+    """
+    results, bookings, moves = [], [], []
+    for request in appointments:
+        request = request if isinstance(request, dict) else {}
+        try:
+            booking = BookingRequestModel(**request)
+            start = parse_slot(booking.desired_date)      # the model only checks the format (31-02-2025)
+            old_start = parse_slot(booking.old_date) if booking.old_date else None
+        except Exception as e:
+            results.append({
+                "desired_date": request.get("desired_date"),
+                "old_date": request.get("old_date"),
+                "id_number": request.get("id_number"),
+                "doctor_name": request.get("doctor_name"),
+                "status": INVALID,
+                "message": f"Validation error: {str(e)}",
+            })
+            continue
+        results.append({
+            "desired_date": booking.desired_date,
+            "old_date": booking.old_date,
+            "id_number": booking.id_number,
+            "doctor_name": booking.doctor_name,
+        })
+        (moves if old_start is not None else bookings).append((len(results) - 1, booking, start, old_start))
+
+    storage = get_storage(DATA_PATH)
+    all_valid = len(bookings) + len(moves) == len(appointments)
+    if all_or_nothing and not all_valid:
+        outcomes = [NOT_BOOKED] * len(bookings)
+    else:
+        outcomes = [status for status, _ in storage.book_slots(
+            [(booking.doctor_name, start, booking.id_number) for _, booking, start, _ in bookings],
+            all_or_nothing=all_or_nothing,
+        )]
+    if all_or_nothing and not (all_valid and all(status == BOOKED for status in outcomes)):
+        outcomes += [NOT_BOOKED] * len(moves)
+    else:
+        outcomes += [
+            storage.move_booking(booking.doctor_name, old_start, start, booking.id_number)
+            for _, booking, start, old_start in moves
+        ]
 
-    df_app.loc[len(df_app)] = new_row
-    df_app.to_csv(DATA_PATH + "rendez_vous.csv", index=False)
+    messages = {
+        BOOKED: "Appointment successfully created for {date}.",
+        RESCHEDULED: "Appointment moved from {old_date} to {date}.",
+        ALREADY_BOOKED: "Time slot {date} for Dr {doctor} is already booked.",
+        NO_SLOT: "No time slot found for Dr {doctor} at {date}.",
+        NO_APPOINTMENT: "No appointment found for patient {patient} with Dr {doctor} at {old_date}.",
+        NOT_BOOKED: "Not booked: another appointment of the batch could not be booked.",
+    }
+    for (position, booking, _, _), status in zip(bookings + moves, outcomes):
+        results[position]["status"] = status
+        results[position]["message"] = messages[status].format(
+            date=booking.desired_date, old_date=booking.old_date, doctor=booking.doctor_name, patient=booking.id_number,
+        )
+    return results
 
-    # update availability for exact time slot
-    df.loc[
-        (df["date_availability"] == date_model.date) &
-        (df["doctor_name"].str.lower() == doctor_name.lower()),
-        ["is_available", "id_patient"]
-    ] = [False, id_model.id]
 
-    df.to_csv(DATA_PATH + "doctor_availability.csv", index=False)
+@_async_variant
+@tool
+def set_appointments_bulk(appointments: list[dict], all_or_nothing: bool = False):
+    """
+    Book or move several appointments in one call (e.g. a family, or the sessions of a treatment plan).
+    appointments: list of {"desired_date": "DD-MM-YYYY HH:MM", "id_number": patient ID, "doctor_name": doctor},
+    plus "old_date": "DD-MM-YYYY HH:MM" to move the patient's appointment from old_date to desired_date
+    all_or_nothing: if true, nothing is booked unless every appointment can be booked
+    (moves then run only if every booking succeeded)
+    Returns one result line per appointment.
+    """
+    results = book_appointments(appointments, all_or_nothing)
+    booked = sum(result["status"] == BOOKED for result in results)
+    moved = sum(result["status"] == RESCHEDULED for result in results)
 
-    return f"Appointment successfully created for {date_model.date}."
+    if any(result["old_date"] for result in results):
+        lines = [f"Booked {booked} and moved {moved} of {len(results)} appointments:"]
+    else:
+        lines = [f"Booked {booked} of {len(results)} appointments:"]
+    lines += [
+        f"- {result['desired_date']}"
+        + (f" (from {result['old_date']})" if result["old_date"] else "")
+        + f" | Dr {result['doctor_name']} | patient {result['id_number']}: {result['message']}"
+        for result in results
+    ]
+    return "\n".join(lines) + "\n"
 
 
 # -------------------------------------------------------
 # 4) CANCEL APPOINTMENT
 # -------------------------------------------------------
+@_async_variant
 @tool
 def cancel_appointment(date: str, id_number: int, doctor_name: str):
     """
@@ -192,57 +348,49 @@ def cancel_appointment(date: str, id_number: int, doctor_name: str):
     """
     date_model = DateTimeModel(date=date)
     id_model = IdentificationNumberModel(id=id_number)
-    
-    df_app = pd.read_csv(DATA_PATH + "rendez_vous.csv")
-    df_avl = pd.read_csv(DATA_PATH + "doctor_availability.csv")
-
-    day = date_model.date.split(" ")[0]
-    time = date_model.date.split(" ")[1]
-
-    # Find appointment in rendez_vous.csv
-    case = df_app[
-        (df_app["patient_id"] == id_model.id) &
-        (df_app["date rendez vous"] == day) &
-        (df_app["heure rendez-vous"] == time) &
-        (df_app["medecin_id"].notna())
-    ]
-
-    if len(case) == 0:
-        return f"No appointment found for patient {id_model.id} with Dr {doctor_name} at {date_model.date}."
 
-    # remove row
-    df_app = df_app.drop(case.index)
-    df_app.to_csv(DATA_PATH + "rendez_vous.csv", index=False)
+    def cancel():
+        # remove the appointment and re-enable the time slot atomically
+        start = _parse(parse_slot, date_model.date)
+        if start is None or not get_storage(DATA_PATH).cancel_booking(doctor_name, start, id_model.id):
+            return f"No appointment found for patient {id_model.id} with Dr {doctor_name} at {date_model.date}."
 
-    # re-enable availability for exact time slot
-    df_avl.loc[
-        (df_avl["date_availability"] == date_model.date) &
-        (df_avl["doctor_name"].str.lower() == doctor_name.lower()),
-        ["is_available", "id_patient"]
-    ] = [True, None]
+        return f"Appointment successfully cancelled for {date_model.date}."
 
-    df_avl.to_csv(DATA_PATH + "doctor_availability.csv", index=False)
-
-    return f"Appointment successfully cancelled for {date_model.date}."
+    arguments = {"date": date_model.date, "id_number": id_model.id, "doctor_name": doctor_name}
+    return _idempotent("cancel_appointment", arguments, cancel)
 
 
 # -------------------------------------------------------
 # 5) RESCHEDULE APPOINTMENT
 # -------------------------------------------------------
+@_async_variant
 @tool
 def reschedule_appointment(old_date: str, new_date: str, id_number: int, doctor_name: str):
     """
-    Reschedule = cancel old + set new
+    Reschedule = move the appointment from old slot to new slot in one operation
+    (nothing changes if the new slot is not free)
     Date format: DD-MM-YYYY HH:MM
     ID number: integer (7-8 digits)
     """
-    cancel_msg = cancel_appointment(old_date, id_number, doctor_name)
-    if "successfully" not in cancel_msg.lower():
-        return "Cannot reschedule because cancellation failed."
+    old_date_model = DateTimeModel(date=old_date)
+    new_date_model = DateTimeModel(date=new_date)
+    id_model = IdentificationNumberModel(id=id_number)
 
-    create_msg = set_appointment(new_date, id_number, doctor_name)
-    if "successfully" not in create_msg.lower():
-        return "Cannot reschedule because new booking failed."
+    old_start, new_start = _parse(parse_slot, old_date_model.date), _parse(parse_slot, new_date_model.date)
+    if old_start is None:
+        status = NO_APPOINTMENT
+    elif new_start is None:
+        status = NO_SLOT
+    else:
+        status = get_storage(DATA_PATH).move_booking(doctor_name, old_start, new_start, id_model.id)
+
+    if status == NO_APPOINTMENT:
+        return f"Cannot reschedule because no appointment was found for patient {id_model.id} at {old_date_model.date}."
+    if status == NO_SLOT:
+        return f"Cannot reschedule because no time slot exists for Dr {doctor_name} at {new_date_model.date}. The appointment at {old_date_model.date} is unchanged."
+    if status == ALREADY_BOOKED:
+        return f"Cannot reschedule because {new_date_model.date} for Dr {doctor_name} is already booked. The appointment at {old_date_model.date} is unchanged."
 
     return "Appointment successfully rescheduled!"
 
@@ -251,6 +399,7 @@ def reschedule_appointment(old_date: str, new_date: str, id_number: int, doctor_
 # 6) PATIENT MANAGEMENT TOOLS
 # -------------------------------------------------------
 
+@_async_variant
 @tool
 def create_patient(
     nom: str,
@@ -266,15 +415,8 @@ def create_patient(
     Telephone: 8-15 digits
     Sexe: M or F
     """
-    # Read existing patients
-    df = pd.read_csv(DATA_PATH + "patients.csv")
-    
-    # Generate new ID (max existing ID + 1)
-    new_id = df["ID"].max() + 1 if len(df) > 0 else 1
-    
-    # Create patient data
+    # Create patient data (the ID is allocated by the storage)
     patient_data = {
-        "ID": new_id,
         "nom": nom,
         "email": email,
         "telephone": telephone,
@@ -283,19 +425,26 @@ def create_patient(
         "addresse": addresse
     }
     
-    # Validate using PatientModel
+    # Validate using NewPatientModel
     try:
-        patient = PatientModel(**patient_data)
+        NewPatientModel(**patient_data)
     except Exception as e:
         return f"Validation error: {str(e)}"
     
-    # Add to dataframe
-    df.loc[len(df)] = patient_data
-    df.to_csv(DATA_PATH + "patients.csv", index=False)
-    
-    return f"Patient created successfully with ID: {new_id}"
+    def create():
+        # Allocate the ID and insert atomically (rejects a duplicate email or telephone)
+        status, patient_id = get_storage(DATA_PATH).create_patient(patient_data)
+        if status == DUPLICATE_EMAIL:
+            return f"A patient with the email {email} is already registered (ID: {patient_id})."
+        if status == DUPLICATE_TELEPHONE:
+            return f"A patient with the telephone {telephone} is already registered (ID: {patient_id})."
+
+        return f"Patient created successfully with ID: {patient_id}"
+
+    return _idempotent("create_patient", patient_data, create)
 
 
+@_async_variant
 @tool
 def get_patient(id_number: int):
     """
@@ -305,16 +454,12 @@ def get_patient(id_number: int):
     # Validate ID format
     id_model = IdentificationNumberModel(id=id_number)
     
-    df = pd.read_csv(DATA_PATH + "patients.csv")
-    
     # Find patient
-    patient = df[df["ID"] == id_model.id]
+    patient_info = get_storage(DATA_PATH).get_patient(id_model.id)
     
-    if len(patient) == 0:
+    if patient_info is None:
         return f"No patient found with ID: {id_model.id}"
     
-    patient_info = patient.iloc[0]
-    
     return (
         f"Patient ID: {patient_info['ID']}\n"
         f"Name: {patient_info['nom']}\n"
@@ -326,6 +471,7 @@ def get_patient(id_number: int):
     )
 
 
+@_async_variant
 @tool
 def update_patient(
     id_number: int,
@@ -344,47 +490,34 @@ def update_patient(
     # Validate ID format
     id_model = IdentificationNumberModel(id=id_number)
     
-    df = pd.read_csv(DATA_PATH + "patients.csv")
-    
-    # Find patient
-    patient_idx = df[df["ID"] == id_model.id].index
-    
-    if len(patient_idx) == 0:
-        return f"No patient found with ID: {id_model.id}"
-    
-    idx = patient_idx[0]
-    
-    # Update only provided fields
-    update_data = {}
-    if nom is not None:
-        update_data["nom"] = nom
-    if email is not None:
-        update_data["email"] = email
-    if telephone is not None:
-        update_data["telephone"] = telephone
-    if date_naissance is not None:
-        update_data["date_naissance"] = date_naissance
-    if sexe is not None:
-        update_data["sexe"] = sexe
-    if addresse is not None:
-        update_data["addresse"] = addresse
-    
-    # Apply updates
-    for key, value in update_data.items():
-        df.at[idx, key] = value
-    
-    # Validate the updated record
+    # Validate only the provided fields (the stored record is not re-validated)
     try:
-        patient_data = df.iloc[idx].to_dict()
-        PatientModel(**patient_data)
+        update_data = PatientUpdateModel(
+            nom=nom,
+            email=email,
+            telephone=telephone,
+            date_naissance=date_naissance,
+            sexe=sexe,
+            addresse=addresse
+        ).changes()
     except Exception as e:
-        return f"Validation error after update: {str(e)}"
+        return f"Validation error: {str(e)}"
     
-    df.to_csv(DATA_PATH + "patients.csv", index=False)
+    # Apply updates to that one record
+    status, patient_id = get_storage(DATA_PATH).update_patient(id_model.id, update_data)
+    if status == NO_PATIENT:
+        return f"No patient found with ID: {id_model.id}"
+    if status == NOTHING_TO_UPDATE:
+        return f"Nothing to update for patient ID {id_model.id}: provide at least one field to change."
+    if status == DUPLICATE_EMAIL:
+        return f"The email {email} is already used by patient ID: {patient_id}."
+    if status == DUPLICATE_TELEPHONE:
+        return f"The telephone {telephone} is already used by patient ID: {patient_id}."
     
     return f"Patient ID {id_model.id} updated successfully."
 
 
+@_async_variant
 @tool
 def check_patient_id(id_number: int):
     """
@@ -395,9 +528,7 @@ def check_patient_id(id_number: int):
     # Validate ID format
     id_model = IdentificationNumberModel(id=id_number)
     
-    df = pd.read_csv(DATA_PATH + "patients.csv")
-    
-    exists = id_model.id in df["ID"].values
+    exists = get_storage(DATA_PATH).patient_exists(id_model.id)
     
     return f"Patient ID {id_model.id} exists: {exists}"
 
@@ -405,6 +536,7 @@ def check_patient_id(id_number: int):
 # -------------------------------------------------------
 # 7) GET PATIENT APPOINTMENTS
 # -------------------------------------------------------
+@_async_variant
 @tool
 def get_patient_appointments(id_number: int):
     """
@@ -415,34 +547,103 @@ def get_patient_appointments(id_number: int):
     # Validate ID format
     id_model = IdentificationNumberModel(id=id_number)
     
+    storage = get_storage(DATA_PATH)
+
     # Check if patient exists
-    df_patients = pd.read_csv(DATA_PATH + "patients.csv")
-    if id_model.id not in df_patients["ID"].values:
+    if not storage.patient_exists(id_model.id):
         return f"No patient found with ID: {id_model.id}"
     
     # Get appointments
-    df_appointments = pd.read_csv(DATA_PATH + "rendez_vous.csv")
-    patient_appointments = df_appointments[df_appointments["patient_id"] == id_model.id]
+    patient_appointments = storage.patient_appointments(id_model.id)
     
     if len(patient_appointments) == 0:
         return f"No appointments found for patient ID: {id_model.id}"
     
-    # Get doctor names from doctors.csv
-    df_doctors = pd.read_csv(DATA_PATH + "doctors.csv")
-    
+    # Join with the doctor directory: one ID -> name map, one lookup per appointment
+    doctor_names = storage.doctor_names()
+
     # Format output
-    output = f"Appointments for patient ID {id_model.id}:\n\n"
-    for idx, appointment in patient_appointments.iterrows():
-        # Get doctor name
+    blocks = [f"Appointments for patient ID {id_model.id}:\n\n"]
+    for appointment in patient_appointments:
+        idx = appointment["appointment_id"]
         doctor_id = appointment["medecin_id"]
-        doctor_info = df_doctors[df_doctors["ID"] == doctor_id]
-        doctor_name = doctor_info.iloc[0]["nom"] if len(doctor_info) > 0 else f"Doctor ID {doctor_id}"
-        
-        output += f"Appointment {idx + 1}:\n"
-        output += f"  Doctor: {doctor_name}\n"
-        output += f"  Date: {appointment['date rendez vous']}\n"
-        output += f"  Time: {appointment['heure rendez-vous']}\n"
-        output += f"  Service: {appointment['service']}\n"
-        output += f"  Appointment ID: {idx}\n\n"
-    
-    return output
+        doctor_name = doctor_names.get(doctor_id, f"Doctor ID {doctor_id}")
+
+        blocks.append(
+            f"Appointment {idx + 1}:\n"
+            f"  Doctor: {doctor_name}\n"
+            f"  Date: {format_day(day_of(appointment['start']))}\n"
+            f"  Time: {format_time(appointment['start'])}\n"
+            f"  Service: {appointment['service']}\n"
+            f"  Appointment ID: {idx}\n\n"
+        )
+
+    return "".join(blocks)
+
+
+# -------------------------------------------------------
+# 8) FIND NEXT AVAILABLE SLOTS
+# -------------------------------------------------------
+@_async_variant
+@tool
+def find_next_available(doctor_or_specialization: str, from_date: str, n: int = 5, horizon_days: int = 30):
+    """
+    Find the earliest free slots of a doctor, or of all doctors of a specialization,
+    over several days in one call.
+    doctor_or_specialization: doctor name (e.g. Dr.Mohamed Tajmouati) or specialization (e.g. general_dentist)
+    from_date: DD-MM-YYYY or DD-MM-YYYY HH:MM (search starts there)
+    n: number of slots to return (1-50), horizon_days: number of days to search (1-365)
+    """
+    if " " in from_date:
+        date_model = DateTimeModel(date=from_date)
+        start = _parse(parse_slot, date_model.date)
+    else:
+        date_model = DateModel(date=from_date)
+        day = _parse(parse_day, date_model.date)
+        start = day * MINUTES_PER_DAY if day is not None else None
+    if start is None:
+        return f"{date_model.date} is not a valid date."
+    search = SlotSearchModel(n=n, horizon_days=horizon_days)
+    storage = get_storage(DATA_PATH)
+
+    doctor_names = storage.resolve_doctors(doctor_or_specialization)
+    if len(doctor_names) == 0:
+        return f"No doctor or specialization found matching '{doctor_or_specialization}'."
+
+    last_day = day_of(start) + search.horizon_days - 1
+    slots = storage.next_free_slots(doctor_names, start, search.n, last_day)
+
+    if len(slots) == 0:
+        return (
+            f"No available slots for {doctor_or_specialization} "
+            f"between {date_model.date} and {format_day(last_day)}."
+        )
+
+    lines = [f"Next available slots for {doctor_or_specialization} from {date_model.date}:"]
+    lines += [f"- {format_slot(slot_start)} with Dr {doctor_name}" for slot_start, doctor_name in slots]
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------------
+# 9) SEARCH PATIENTS
+# -------------------------------------------------------
+@_async_variant
+@tool
+def search_patients(query: str, k: int = 5):
+    """
+    Find patients from part of their name, telephone number or email
+    (e.g. "benali", "0612 34", "sara.b"), best matches first.
+    k: number of patients to return (1-50)
+    """
+    search = PatientSearchModel(query=query, k=k)
+
+    patients = get_storage(DATA_PATH).search_patients(search.query, search.k)
+    if len(patients) == 0:
+        return f"No patient found matching '{search.query}'."
+
+    lines = [f"Patients matching '{search.query}':"]
+    lines += [
+        f"- ID {patient['ID']}: {patient['nom']} | Tel: {patient['telephone']} | Email: {patient['email']}"
+        for patient in patients
+    ]
+    return "\n".join(lines) + "\n"